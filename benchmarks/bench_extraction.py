@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    benchmarks.bench_extraction
+    ~~~~~~~~~~~~~
+
+    Measures the throughput of Extractor.extract() on synthetic target and
+    definition files. The size of the definition, the depth of its
+    'relative_to' chains, the proportion of string parameters, the size and
+    the number of the target files can be configured. The files are
+    generated from a seed, so runs with the same options read the same bytes.
+
+    The results are written as JSON, and can be compared with the results
+    of a previous run, e.g. of another commit:
+
+        python benchmarks/bench_extraction.py -o before.json
+        git checkout other-branch
+        python benchmarks/bench_extraction.py --compare before.json
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bindex import metadata
+from bindex.extractor import Extractor
+from bindex.files import DefinitionFile
+
+# Struct formats of the numeric parameters and their sizes.
+NUMERIC_TYPES = [("B", 1), ("H", 2), ("I", 4), ("Q", 8), ("f", 4), ("d", 8)]
+STRING_TYPES = ["ascii", "utf-8"]
+MAGIC = "BENCH"
+# Maps every byte to a printable ASCII character, so that string parameters
+# can be decoded whatever their encoding.
+PRINTABLE = bytes(0x20 + b % 95 for b in range(256))
+
+
+def generate_definition(_rng, _parameters, _depth, _strings):
+    """
+    Generates a definition file with the given number of parameters.
+
+    Parameters are laid out one after the other with small random gaps.
+    Every parameter is relative to the previous one, except one in _depth,
+    which starts a new chain at an absolute offset.
+
+    :param _rng: The random.Random object used to generate the parameters.
+    :param _parameters: The number of parameters.
+    :param _depth: The length of the 'relative_to' chains.
+    :param _strings: The proportion of string parameters, from 0 to 1.
+    :return: A (definition, extent) tuple, where extent is the number of
+    bytes covered by the parameters.
+    """
+    params = []
+    end = len(MAGIC)
+    previous = None
+    for i in range(_parameters):
+        if _rng.random() < _strings:
+            ptype = _rng.choice(STRING_TYPES)
+            size = _rng.randint(8, 32)
+        else:
+            ptype, size = _rng.choice(NUMERIC_TYPES)
+        gap = _rng.randint(0, 8)
+        param = {"name": "p{:06d}".format(i), "size": size, "type": ptype}
+        if previous is not None and i % _depth != 0:
+            param["offset"] = gap
+            param["relative_to"] = previous
+        else:
+            param["offset"] = end + gap
+        params.append(param)
+        previous = param["name"]
+        end += gap + size
+
+    definition = {
+        "description": "Synthetic definition generated by bench_extraction.py",
+        "byte_order": "little",
+        "compatibility": [
+            {"name": "magic", "offset": 0, "size": len(MAGIC), "type": "ascii",
+             "compatible_with": [MAGIC]}
+        ],
+        "parameters": params
+    }
+    return definition, end
+
+
+def generate_target(_rng, _path, _size):
+    """
+    Writes a target file of random printable bytes starting with the magic
+    value.
+
+    :param _rng: The random.Random object used to generate the bytes.
+    :param _path: The path of the target file.
+    :param _size: The size of the target file in bytes.
+    :return: None
+    """
+    with open(_path, "wb") as fp:
+        fp.write(MAGIC.encode("ascii"))
+        remaining = _size - len(MAGIC)
+        while remaining > 0:
+            count = min(remaining, 1 << 20)
+            fp.write(_rng.randbytes(count).translate(PRINTABLE))
+            remaining -= count
+
+
+def measure(_function, _repeat):
+    """
+    Returns the shortest of several measures of the duration of a call.
+
+    :param _function: The function to call.
+    :param _repeat: The number of measures.
+    :return: The shortest duration in seconds.
+    """
+    best = None
+    for _ in range(_repeat):
+        start = time.perf_counter()
+        _function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(_args):
+    """
+    Generates the files and runs the measures.
+
+    :param _args: The parsed command-line arguments.
+    :return: A dictionary of results.
+    """
+    rng = random.Random(_args.seed)
+    directory = tempfile.mkdtemp(prefix="bindex-bench-")
+    try:
+        definition, extent = generate_definition(
+            rng, _args.parameters, max(1, _args.depth), _args.strings)
+        definition_file = os.path.join(directory, "definition.json")
+        with open(definition_file, "w") as fp:
+            json.dump(definition, fp)
+
+        file_size = max(_args.file_size, extent)
+        targets = []
+        for i in range(_args.files):
+            path = os.path.join(directory, "target{:05d}.bin".format(i))
+            generate_target(rng, path, file_size)
+            targets.append(path)
+
+        options = {
+            "_use_mmap": _args.mmap,
+            "_gap_tolerance": _args.gap,
+            "_hashes": [] if _args.no_hash else ["sha1"]
+        }
+
+        load_s = measure(lambda: DefinitionFile(definition_file), _args.repeat)
+        loaded = DefinitionFile(definition_file)
+        setup_s = measure(
+            lambda: [Extractor(t, loaded, **options) for t in targets], _args.repeat) / len(targets)
+
+        def extract_all():
+            for target in targets:
+                Extractor(target, loaded, **options).extract()
+
+        extract_s = measure(extract_all, _args.repeat)
+
+        return {
+            "config": {
+                "parameters": _args.parameters,
+                "depth": _args.depth,
+                "strings": _args.strings,
+                "file_size": file_size,
+                "files": _args.files,
+                "seed": _args.seed,
+                "repeat": _args.repeat,
+                "mmap": _args.mmap,
+                "gap": _args.gap,
+                "hash": not _args.no_hash
+            },
+            "environment": {
+                "bindex": metadata.version,
+                "python": platform.python_version(),
+                "implementation": platform.python_implementation(),
+                "platform": platform.platform()
+            },
+            "results": {
+                "definition_load_s": load_s,
+                "file_setup_s": setup_s,
+                "extract_s": extract_s,
+                "files_per_s": len(targets) / extract_s,
+                "parameters_per_s": len(targets) * _args.parameters / extract_s
+            }
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def compare(_results, _baseline):
+    """
+    Adds the ratio of each result to the result of a previous run. Ratios
+    above 1 mean the current run is faster for rates and slower for times.
+
+    :param _results: The dictionary of results of the current run.
+    :param _baseline: The dictionary of results of a previous run.
+    :return: None
+    """
+    if _baseline.get("config") != _results["config"]:
+        sys.stderr.write("Warning: the baseline was run with other options.\n")
+    _results["compared_to_baseline"] = {
+        key: value / _baseline["results"][key]
+        for key, value in _results["results"].items()
+        if _baseline["results"].get(key)
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog=argv[0], description="Benchmark of Extractor.extract().")
+    parser.add_argument("--parameters", type=int, default=200, help="Number of parameters.")
+    parser.add_argument("--depth", type=int, default=8, help="Length of the 'relative_to' chains.")
+    parser.add_argument("--strings", type=float, default=0.25, help="Proportion of string parameters.")
+    parser.add_argument("--file-size", type=int, default=64 * 1024, help="Size of each target file.")
+    parser.add_argument("--files", type=int, default=50, help="Number of target files.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of measures, the best is kept.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated files.")
+    parser.add_argument("--mmap", action="store_true", help="Map the target files into memory.")
+    parser.add_argument("--gap", type=int, default=0, help="Gap tolerance of the extractor.")
+    parser.add_argument("--no-hash", action="store_true", help="Do not hash the target files.")
+    parser.add_argument("--compare", help="Results of a previous run to compare with.")
+    parser.add_argument("-o", "--output", help="File receiving the results. Defaults to stdout.")
+    args = parser.parse_args(argv[1:])
+
+    results = run(args)
+    if args.compare is not None:
+        with open(args.compare, "r") as fp:
+            compare(results, json.load(fp))
+
+    if args.output is not None:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=4, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=4, sort_keys=True)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    benchmarks.bench_target_setup
+    ~~~~~~~~~~~~~
+
+    Measures the cost of creating TargetFile objects and of decoding string
+    parameters. The cost of building the control character table by scanning
+    every Unicode code point, as TargetFile used to do for each file, is
+    reported for comparison.
+
+    Run from the root of the repository:
+
+        python benchmarks/bench_target_setup.py
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import json
+import os
+import sys
+import timeit
+import unicodedata
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bindex import codec
+from bindex.files import TargetFile
+
+
+def legacy_control_table():
+    all_chars = (chr(i) for i in range(0x110000))
+    return ''.join(c for c in all_chars if unicodedata.category(c) == 'Cc')
+
+
+def main():
+    target = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "input.bin")
+    number = 1000
+    sample = b"Test Comment Parameter\x00\x00"
+
+    results = {
+        "legacy_table_build_s": min(timeit.repeat(legacy_control_table, number=1, repeat=3)),
+        "target_file_init_s": min(timeit.repeat(lambda: TargetFile(target), number=number, repeat=3)) / number,
+        "decode_ascii_s": min(timeit.repeat(
+            lambda: codec.decode_string(sample, "ascii"), number=number, repeat=3)) / number,
+        "decode_utf16_s": min(timeit.repeat(
+            lambda: codec.decode_string(sample.decode("ascii").encode("utf-16"), "utf-16"),
+            number=number, repeat=3)) / number
+    }
+    json.dump(results, sys.stdout, indent=4, sort_keys=True)
+    print()
+
+
+if __name__ == '__main__':
+    main()
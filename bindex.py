@@ -17,8 +17,22 @@ import logging
 import os
 import sys
 
+from bindex import batch
+from bindex import carve
+from bindex import digest
+from bindex import predicate
+from bindex import writers
+from bindex.cache import DefinitionCache
+from bindex.cache import ResultCache
+from bindex.cache import is_filtered_again
 from bindex.const import *
 from bindex.extractor import Extractor
+from bindex.files import DefinitionFile
+from bindex.index import ResultIndex
+from bindex.registry import DefinitionRegistry
+from bindex.stats import NULL_STATS
+from bindex.stats import Stats
+from bindex.stream import StreamExtractor
 
 __author__ = metadata.authors[0]
 __copyright__ = metadata.copyright
@@ -53,34 +67,189 @@ URL: <{url}>
         authors='\n'.join(author_strings),
         url=metadata.url)
 
+    # The index of a corpus is built and queried by commands of their own.
+    if len(argv) > 1 and argv[1] == COMMAND_INDEX:
+        return main_index(argv, epilog)
+    if len(argv) > 1 and argv[1] == COMMAND_QUERY:
+        return main_query(argv, epilog)
+
     # =-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=
     # Argparse parameters.
     #
+    description = metadata.description + (
+        " Use '{p} {i} -h' and '{p} {q} -h' to build and query an index of the values "
+        "extracted from many target files.").format(p=os.path.basename(argv[0]), i=COMMAND_INDEX, q=COMMAND_QUERY)
     arg_parser = argparse.ArgumentParser(
         prog=argv[0],
         formatter_class=argparse.RawDescriptionHelpFormatter,
-        description=metadata.description,
+        description=description,
         epilog=epilog)
 
-    arg_parser.add_argument(
+    input_group = arg_parser.add_mutually_exclusive_group(required=True)
+
+    input_group.add_argument(
         '-i', '--input-file',
         dest='input_file',
-        required=True,
-        help="Target file from which data will be extracted."
+        help="Target file from which data will be extracted, or '-' to read the target "
+             "from the standard input in a single forward pass."
+    )
+
+    input_group.add_argument(
+        '-b', '--batch',
+        dest='batch_inputs',
+        nargs='+',
+        help="Directories, glob patterns or files from which data will be extracted "
+             "in batch mode. One JSON line is written per target file."
+    )
+
+    input_group.add_argument(
+        '-l', '--file-list',
+        dest='file_list',
+        help="File containing one target file per line, or '-' to read the list "
+             "from the standard input. Extracts the target files in batch mode."
     )
 
     arg_parser.add_argument(
         '-d', '--definition-file',
         dest='definition_file',
         required=True,
-        help="File definition the items to extract along with their positions."
+        help="File definition the items to extract along with their positions. If a "
+             "directory is given, the compatible definition file is selected for each target."
     )
 
     arg_parser.add_argument(
         '-o', '--output-file',
         dest='output_file',
-        default="output.json",
-        help="Name of the file to contain the JSON-formatted results."
+        default=None,
+        help="Name of the file to contain the JSON-formatted results. Defaults to "
+             "'output.json', or to the standard output ('-') in batch mode."
+    )
+
+    arg_parser.add_argument(
+        '--format',
+        dest='output_format',
+        choices=OUTPUT_FORMATS,
+        default=None,
+        help="Format of the results. Defaults to 'pretty', indented JSON, or to 'jsonl', one "
+             "compact JSON document per line, in batch mode."
+    )
+
+    arg_parser.add_argument(
+        '-f', '--force',
+        dest='force',
+        action="store_true",
+        default=False,
+        help="Overwrite the output file if it already exists."
+    )
+
+    arg_parser.add_argument(
+        '-j', '--jobs',
+        dest='jobs',
+        type=int,
+        default=1,
+        help="Number of worker processes used in batch and carving modes."
+    )
+
+    arg_parser.add_argument(
+        '--carve',
+        dest='carve',
+        action="store_true",
+        default=False,
+        help="Extract the definition at every offset of the input file where its compatibility "
+             "parameters match, e.g. in a memory dump. One JSON line is written per occurrence."
+    )
+
+    arg_parser.add_argument(
+        '-w', '--where',
+        dest='where',
+        default=None,
+        help="Only output the results of the target files whose values match this predicate, "
+             "e.g. 'TestParam1 > 0xFFFF and TestParam2 != null'. The parameters it compares are "
+             "read first and the extraction of a target file stops as soon as it does not match."
+    )
+
+    arg_parser.add_argument(
+        '--fields',
+        dest='fields',
+        default=None,
+        help="Comma-separated list of the parameters to extract. The other parameters are "
+             "neither read nor decoded. Defaults to all of them."
+    )
+
+    arg_parser.add_argument(
+        '-m', '--mmap',
+        dest='use_mmap',
+        action="store_true",
+        default=False,
+        help="Map the target file into memory instead of reading it with file operations."
+    )
+
+    arg_parser.add_argument(
+        '-g', '--gap',
+        dest='gap_tolerance',
+        type=int,
+        default=0,
+        help="Maximum number of unused bytes between two parameters read with the same read call."
+    )
+
+    arg_parser.add_argument(
+        '--hash',
+        dest='hashes',
+        default=','.join(DEFAULT_HASHES),
+        help="Comma-separated list of hash algorithms to compute over the target file, "
+             "e.g. sha1,sha256,md5,blake2."
+    )
+
+    arg_parser.add_argument(
+        '--no-hash',
+        dest='no_hash',
+        action="store_true",
+        default=False,
+        help="Do not hash the target file."
+    )
+
+    arg_parser.add_argument(
+        '--cache-dir',
+        dest='cache_dir',
+        default=None,
+        help="Directory of the cache of compiled definition files. Defaults to "
+             "$BINDEX_CACHE_DIR or ~/.cache/bindex."
+    )
+
+    arg_parser.add_argument(
+        '--no-cache',
+        dest='no_cache',
+        action="store_true",
+        default=False,
+        help="Do not use the cache of compiled definition files."
+    )
+
+    arg_parser.add_argument(
+        '--no-result-cache',
+        dest='no_result_cache',
+        action="store_true",
+        default=False,
+        help="Extract every target file again instead of reusing the results stored for "
+             "unchanged target files."
+    )
+
+    arg_parser.add_argument(
+        '--result-cache-size',
+        dest='result_cache_size',
+        type=int,
+        default=RESULT_CACHE_MAX_SIZE // (1024 * 1024),
+        help="Maximum size of the cache of results, in MiB. The least recently used results "
+             "are evicted. Defaults to {n:d}.".format(n=RESULT_CACHE_MAX_SIZE // (1024 * 1024))
+    )
+
+    arg_parser.add_argument(
+        '--stats',
+        dest='stats',
+        action="store_true",
+        default=False,
+        help="Log the time spent in each phase of the extraction and I/O "
+             "counters once done. The stats of each target are also added "
+             "to the metadata of its results."
     )
 
     arg_parser.add_argument(
@@ -100,15 +269,41 @@ URL: <{url}>
     #
     # =-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=
 
-    print(epilog)
-
     # =-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=
     # Basic Settings and argument validation
     #
     input_file = args.input_file
     definition_file = args.definition_file
+    is_batch = args.batch_inputs is not None or args.file_list is not None
+    is_stream = input_file == STANDARD_STREAM
+    is_carve = args.carve
     output_file = args.output_file
+    if output_file is None:
+        output_file = STANDARD_STREAM if is_batch or is_carve else DEFAULT_OUTPUT_FILE
+    output_format = args.output_format
+    if output_format is None:
+        output_format = FORMAT_JSONL if is_batch or is_carve else FORMAT_PRETTY
+    jobs = max(1, args.jobs)
+    cache = None
+    if not args.no_cache:
+        cache = DefinitionCache(args.cache_dir)
+    use_mmap = args.use_mmap
+    gap_tolerance = args.gap_tolerance
+    hashes = [h.strip() for h in args.hashes.split(',') if h.strip()]
+    if args.no_hash:
+        hashes = []
+    # Unknown hash algorithms are usage errors, reported before anything
+    # is extracted rather than once per target file.
+    try:
+        digest.new_digests(hashes)
+    except Exception as e:
+        arg_parser.error(str(e))
     is_verbose = args.is_verbose
+    stats = Stats() if args.stats else NULL_STATS
+    where = None
+    fields = None
+    if args.fields is not None:
+        fields = [f.strip() for f in args.fields.split(',') if f.strip()]
 
     # Setup logging configuration
     logging_level = logging.INFO
@@ -118,18 +313,43 @@ URL: <{url}>
     logging.basicConfig(format=LOG_FORMAT,
                         level=logging_level)
 
+    # Results written to the standard output must not be mixed with
+    # anything else.
+    if output_file != STANDARD_STREAM:
+        print(epilog)
+
     logger.debug(os.getcwd())
     # Verify that the input file exists
-    if not os.path.isfile(input_file):
+    if not is_batch and not is_stream and not os.path.isfile(input_file):
         logger.error(MSG_ERROR_INPUT_FILE_NOT_FOUND.format(f=input_file))
         sys.exit(1)
     # Verify that the definition file exists
-    if not os.path.isfile(definition_file):
+    if not os.path.isfile(definition_file) and not os.path.isdir(definition_file):
         logger.error(MSG_ERROR_DEF_FILE_NOT_FOUND.format(f=definition_file))
         sys.exit(1)
-    # Verify if the output file already exists
-    if os.path.isfile(output_file):
-        overwrite = input(ASK_OUTPUT_OVERWRITE)
+    # A stream cannot be read twice, so its definition cannot be selected
+    # from a directory.
+    if is_stream and os.path.isdir(definition_file):
+        logger.error(MSG_ERROR_STREAM_DEFINITION_DIR)
+        sys.exit(1)
+    # Parse the predicate once, before anything is extracted.
+    if args.where is not None:
+        if is_stream:
+            logger.error(MSG_ERROR_STREAM_WHERE)
+            sys.exit(1)
+        try:
+            where = predicate.parse(args.where)
+        except Exception as e:
+            logger.error(str(e))
+            sys.exit(1)
+    # Carving searches a single target file for a single definition.
+    if is_carve and (is_batch or is_stream or os.path.isdir(definition_file)):
+        logger.error(MSG_ERROR_CARVE_INPUT)
+        sys.exit(1)
+    # Verify if the output file already exists. Never prompt in batch
+    # or carving modes, which are meant to run unattended.
+    if output_file != STANDARD_STREAM and os.path.isfile(output_file) and not args.force:
+        overwrite = "n" if is_batch or is_carve else input(ASK_OUTPUT_OVERWRITE)
         if overwrite != "Y":
             logger.warning(MSG_ERROR_OUTPUT_FILE_EXISTS)
             sys.exit(1)
@@ -139,28 +359,485 @@ URL: <{url}>
     # =-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=
     # Program Execution
     #
+    options = {
+        "_use_mmap": use_mmap,
+        "_gap_tolerance": gap_tolerance,
+        "_hashes": hashes,
+        "_stats": stats.enabled
+    }
+    if where is not None:
+        options["_where"] = where
+    if fields is not None:
+        options["_fields"] = fields
+
+    if is_carve:
+        return run_carve(input_file, definition_file, output_file, output_format, jobs, options,
+                         cache, stats)
+
+    # Streams cannot be identified without reading them, so their results
+    # are never stored.
+    results = None
+    if not args.no_result_cache and not is_stream:
+        try:
+            results = ResultCache(args.cache_dir, args.result_cache_size * 1024 * 1024)
+        except Exception as e:
+            logger.warning(MSG_ERROR_RESULT_CACHE_OPEN.format(err=str(e)))
+
+    if is_batch:
+        try:
+            return run_batch(args, definition_file, output_file, output_format, jobs, options,
+                             cache, stats, results)
+        finally:
+            if results is not None:
+                results.close()
+
     try:
-        extractor = Extractor(
-            _target_file=input_file,
-            _definition_file=definition_file
-        )
-        result = extractor.extract()
+        with stats.phase(PHASE_DEFINITION):
+            definition = load_definitions(definition_file, cache)
+        check_fields(definition, options)
+        result = NO_VALUE
+        # Set if the target file is known not to match the predicate.
+        filtered = False
+        if results is not None:
+            # Examined before the extraction, so that the result of a target
+            # file modified in the meantime is not stored.
+            target_stat = os.stat(input_file)
+            filtered = where is not None and results.is_filtered(input_file, definition, options)
+            if not filtered:
+                result = results.get(input_file, definition, options)
+            if result is not NO_VALUE and is_filtered_again(options) and \
+                    not where.matches(result[PARAM_OTHER_PARAMS]):
+                result = NO_VALUE
+                filtered = True
+        if is_stream:
+            extractor = StreamExtractor(
+                _stream=sys.stdin.buffer,
+                _definition_file=definition,
+                _gap_tolerance=gap_tolerance,
+                _hashes=hashes,
+                _fields=fields
+            )
+            result = extractor.extract()
+        elif result is NO_VALUE and not filtered:
+            extractor = Extractor(
+                _target_file=input_file,
+                _definition_file=batch.select_definition(definition, input_file),
+                **options
+            )
+            result = extractor.extract()
+            if result is NO_VALUE:
+                # The stats of a filtered target file are not part of a result.
+                stats.merge(extractor.stats)
+                if results is not None:
+                    results.put_filtered(input_file, definition, options, target_stat)
+            elif results is not None:
+                results.put(input_file, definition, options, result, target_stat)
 
         if result is not None:
-            with open(output_file, "w+") as fp:
-                json.dump(result, fp, indent=4, sort_keys=True)
-            logger.info(MSG_INFO_FILE_SAVED.format(f=output_file))
+            stats.merge(result[PARAM_METADATA].get(PARAM_STATS, {}))
+            with writers.open_output(output_file, output_format) as fp:
+                with writers.new_writer(output_format, fp, _single=True) as writer:
+                    with stats.phase(PHASE_SERIALIZATION):
+                        writer.write(result)
+            if output_file != STANDARD_STREAM:
+                logger.info(MSG_INFO_FILE_SAVED.format(f=output_file))
+        elif where is not None:
+            logger.info(MSG_INFO_FILTERED.format(f=input_file))
         else:
             logger.info("No data extracted from '{f:s}'.".format(f=input_file))
     except Exception as e:
         logger.error(str(e))
         sys.exit(1)
+    finally:
+        if results is not None:
+            results.close()
 
+    log_stats(stats, cache, results)
     logging.info(MSG_INFO_EXTRACTION_COMPLETE)
 
     return 0
 
 
+def load_definitions(definition_file, cache=None):
+    """Loads the definition file, or the registry of definition files if a
+    directory is given.
+
+    :param definition_file: path of a definition file or of a directory
+    :param cache: cache of compiled definitions, or None
+    :type cache: :class:`DefinitionCache`
+    :return: a :class:`DefinitionFile` or :class:`DefinitionRegistry` object
+    """
+    if os.path.isdir(definition_file):
+        return DefinitionRegistry(definition_file, cache)
+    if cache is not None:
+        return cache.load(definition_file)
+    return DefinitionFile(definition_file)
+
+
+def check_fields(definition, options):
+    """Warns about the fields of the filter predicate and of the projection
+    which are not parameters of the definition, and therefore never match
+    nor are extracted.
+
+    :param definition: a :class:`DefinitionFile` or :class:`DefinitionRegistry` object
+    :param options: keyword arguments given to each Extractor
+    """
+    definitions = [definition] if isinstance(definition, DefinitionFile) else definition.definitions
+    known = set()
+    for item in definitions:
+        known.update(item.parameters)
+    if "_where" in options:
+        for field in sorted(options["_where"].fields - known):
+            logger.warning(MSG_WARNING_PREDICATE_FIELD.format(f=field))
+    for field in sorted(set(options.get("_fields", [])) - known):
+        logger.warning(MSG_WARNING_UNKNOWN_FIELD.format(f=field))
+
+
+def log_stats(stats, cache=None, results=None):
+    """Logs the stats collected during the execution, if enabled.
+
+    :param stats: stats of the execution
+    :type stats: :class:`Stats`
+    :param cache: cache of compiled definitions, or None
+    :type cache: :class:`DefinitionCache`
+    :param results: cache of results, or None
+    :type results: :class:`ResultCache`
+    """
+    if not stats.enabled:
+        return
+    if cache is not None:
+        stats.count(COUNTER_CACHE_HITS, cache.hits)
+        stats.count(COUNTER_CACHE_MISSES, cache.misses)
+    if results is not None:
+        stats.count(COUNTER_RESULT_CACHE_HITS, results.hits)
+        stats.count(COUNTER_RESULT_CACHE_MISSES, results.misses)
+    logger.info(MSG_INFO_STATS.format(s=json.dumps(stats.to_dict(), sort_keys=True)))
+
+
+def run_batch(args, definition_file, output_file, output_format, jobs, options, cache=None,
+              stats=NULL_STATS, results=None):
+    """Extracts the target files given in batch mode.
+
+    The definition file is loaded once and the results are written as soon
+    as each target file is extracted. Failures are recorded in the results
+    and do not abort the run.
+
+    :param args: parsed command-line arguments
+    :param definition_file: path of the definition file
+    :param output_file: path of the output file, or '-' for the standard output
+    :param output_format: format of the results, one of OUTPUT_FORMATS
+    :param jobs: number of worker processes
+    :param options: keyword arguments given to each Extractor
+    :param cache: cache of compiled definitions, or None
+    :param stats: stats of the execution, completed with those of each target
+    :param results: cache of results, or None
+    :return: exit code
+    """
+    targets = batch.expand_targets(args.batch_inputs, args.file_list)
+    if len(targets) == 0:
+        logger.error(MSG_ERROR_NO_TARGETS)
+        return 1
+
+    try:
+        with stats.phase(PHASE_DEFINITION):
+            definition = load_definitions(definition_file, cache)
+        check_fields(definition, options)
+        with writers.open_output(output_file, output_format) as fp:
+            count, failures = batch.run(
+                definition, targets, fp, jobs, options, output_format, stats, results)
+        if output_file != STANDARD_STREAM:
+            logger.info(MSG_INFO_FILE_SAVED.format(f=output_file))
+    except Exception as e:
+        logger.error(str(e))
+        return 1
+
+    logger.info(MSG_INFO_BATCH_COMPLETE.format(n=count, f=failures))
+    if "_where" in options:
+        logger.info(MSG_INFO_BATCH_FILTERED.format(n=len(targets) - count))
+    log_stats(stats, cache, results)
+    return 0
+
+
+def run_carve(input_file, definition_file, output_file, output_format, jobs, options, cache=None,
+              stats=NULL_STATS):
+    """Extracts every occurrence of the definition found in the input file.
+
+    :param input_file: path of the target file
+    :param definition_file: path of the definition file
+    :param output_file: path of the output file, or '-' for the standard output
+    :param output_format: format of the results, one of OUTPUT_FORMATS
+    :param jobs: number of worker processes
+    :param options: keyword arguments given to each Extractor
+    :param cache: cache of compiled definitions, or None
+    :param stats: stats of the execution, completed with those of each occurrence
+    :return: exit code
+    """
+    try:
+        with stats.phase(PHASE_DEFINITION):
+            definition = load_definitions(definition_file, cache)
+        check_fields(definition, options)
+        with writers.open_output(output_file, output_format) as fp:
+            count = carve.run(definition, input_file, fp, jobs, options, output_format, stats)
+        if output_file != STANDARD_STREAM:
+            logger.info(MSG_INFO_FILE_SAVED.format(f=output_file))
+    except Exception as e:
+        logger.error(str(e))
+        return 1
+
+    logger.info(MSG_INFO_CARVE_COMPLETE.format(n=count, df=definition_file, f=input_file))
+    log_stats(stats, cache)
+    return 0
+
+
+def main_index(argv, epilog):
+    """Entry point of the 'index' command, which extracts many target files
+    and stores their results in an index.
+
+    :param argv: command-line arguments, the command being the second one
+    :type argv: :class:`list`
+    :param epilog: description of the project
+    :return: exit code
+    """
+    arg_parser = argparse.ArgumentParser(
+        prog='{0} {1}'.format(argv[0], COMMAND_INDEX),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Extracts many target files and stores the values of their parameters in "
+                    "an index, which can then be queried with the '{q}' command.".format(
+                        q=COMMAND_QUERY),
+        epilog=epilog)
+
+    input_group = arg_parser.add_mutually_exclusive_group(required=True)
+
+    input_group.add_argument(
+        '-b', '--batch',
+        dest='batch_inputs',
+        nargs='+',
+        help="Directories, glob patterns or files from which data will be extracted."
+    )
+
+    input_group.add_argument(
+        '-l', '--file-list',
+        dest='file_list',
+        help="File containing one target file per line, or '-' to read the list "
+             "from the standard input."
+    )
+
+    arg_parser.add_argument(
+        '-d', '--definition-file',
+        dest='definition_file',
+        required=True,
+        help="File definition the items to extract along with their positions. If a "
+             "directory is given, the compatible definition file is selected for each target."
+    )
+
+    arg_parser.add_argument(
+        '-x', '--index',
+        dest='index_file',
+        default=INDEX_DEFAULT_FILE,
+        help="SQLite database of the index, created if needed. Target files already "
+             "indexed are replaced. Defaults to '{f:s}'.".format(f=INDEX_DEFAULT_FILE)
+    )
+
+    arg_parser.add_argument(
+        '-j', '--jobs',
+        dest='jobs',
+        type=int,
+        default=1,
+        help="Number of worker processes."
+    )
+
+    arg_parser.add_argument(
+        '--cache-dir',
+        dest='cache_dir',
+        default=None,
+        help="Directory of the cache of compiled definition files. Defaults to "
+             "$BINDEX_CACHE_DIR or ~/.cache/bindex."
+    )
+
+    arg_parser.add_argument(
+        '--no-cache',
+        dest='no_cache',
+        action="store_true",
+        default=False,
+        help="Do not use the cache of compiled definition files."
+    )
+
+    arg_parser.add_argument(
+        '--no-result-cache',
+        dest='no_result_cache',
+        action="store_true",
+        default=False,
+        help="Extract every target file again instead of reusing the results stored for "
+             "unchanged target files."
+    )
+
+    arg_parser.add_argument(
+        '-v', '--verbose',
+        dest='is_verbose',
+        action="store_true",
+        default=False,
+        help="Display additional information about execution."
+    )
+
+    args = arg_parser.parse_args(args=argv[2:])
+
+    logging.basicConfig(format=LOG_FORMAT,
+                        level=logging.DEBUG if args.is_verbose else logging.INFO)
+    print(epilog)
+
+    if not os.path.isfile(args.definition_file) and not os.path.isdir(args.definition_file):
+        logger.error(MSG_ERROR_DEF_FILE_NOT_FOUND.format(f=args.definition_file))
+        return 1
+    targets = batch.expand_targets(args.batch_inputs, args.file_list)
+    if len(targets) == 0:
+        logger.error(MSG_ERROR_NO_TARGETS)
+        return 1
+
+    cache = None if args.no_cache else DefinitionCache(args.cache_dir)
+    results = None
+    if not args.no_result_cache:
+        try:
+            results = ResultCache(args.cache_dir)
+        except Exception as e:
+            logger.warning(MSG_ERROR_RESULT_CACHE_OPEN.format(err=str(e)))
+
+    failures = 0
+    try:
+        definition = load_definitions(args.definition_file, cache)
+        with ResultIndex(args.index_file) as index:
+            index.add_definition(definition)
+            for result in batch.extract_many(definition, targets, max(1, args.jobs), {}, results):
+                if PARAM_ERROR in result:
+                    failures += 1
+                index.add(result)
+    except Exception as e:
+        logger.error(str(e))
+        return 1
+    finally:
+        if results is not None:
+            results.close()
+
+    logger.info(MSG_INFO_INDEX_COMPLETE.format(n=len(targets), f=failures, i=args.index_file))
+    return 0
+
+
+def main_query(argv, epilog):
+    """Entry point of the 'query' command, which filters and aggregates the
+    results stored in an index.
+
+    :param argv: command-line arguments, the command being the second one
+    :type argv: :class:`list`
+    :param epilog: description of the project
+    :return: exit code
+    """
+    arg_parser = argparse.ArgumentParser(
+        prog='{0} {1}'.format(argv[0], COMMAND_QUERY),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Filters and aggregates the results stored in an index by the '{i}' "
+                    "command.".format(i=COMMAND_INDEX),
+        epilog=epilog)
+
+    arg_parser.add_argument(
+        '-x', '--index',
+        dest='index_file',
+        default=INDEX_DEFAULT_FILE,
+        help="SQLite database of the index. Defaults to '{f:s}'.".format(f=INDEX_DEFAULT_FILE)
+    )
+
+    arg_parser.add_argument(
+        '-w', '--where',
+        dest='where',
+        default=None,
+        help="Predicate selecting the results, e.g. 'version == \"1.09.145\" and "
+             "TestParam1 > 0xFFFF'. Comparisons of parameters or metadata fields, such as "
+             "meta.sha1, can be combined with and, or, not and parentheses."
+    )
+
+    arg_parser.add_argument(
+        '-s', '--select',
+        dest='select',
+        default=None,
+        help="Comma-separated list of the parameters to output. Defaults to all of them."
+    )
+
+    arg_parser.add_argument(
+        '-a', '--aggregate',
+        dest='aggregates',
+        nargs='+',
+        default=None,
+        help="Aggregates to compute instead of listing the results: count, or one of "
+             "{fn:s} applied to a field, e.g. 'max(TestParam1)'.".format(
+                 fn=', '.join(INDEX_AGGREGATES))
+    )
+
+    arg_parser.add_argument(
+        '-g', '--group-by',
+        dest='group_by',
+        default=None,
+        help="Field whose distinct values define the groups of the aggregates."
+    )
+
+    arg_parser.add_argument(
+        '-n', '--limit',
+        dest='limit',
+        type=int,
+        default=None,
+        help="Maximum number of results to output."
+    )
+
+    arg_parser.add_argument(
+        '-o', '--output-file',
+        dest='output_file',
+        default=STANDARD_STREAM,
+        help="Name of the file to contain the results. Defaults to the standard output ('-')."
+    )
+
+    arg_parser.add_argument(
+        '--format',
+        dest='output_format',
+        choices=OUTPUT_FORMATS,
+        default=FORMAT_JSONL,
+        help="Format of the results. Defaults to 'jsonl', one compact JSON document per line."
+    )
+
+    arg_parser.add_argument(
+        '-v', '--verbose',
+        dest='is_verbose',
+        action="store_true",
+        default=False,
+        help="Display additional information about execution."
+    )
+
+    args = arg_parser.parse_args(args=argv[2:])
+
+    logging.basicConfig(format=LOG_FORMAT,
+                        level=logging.DEBUG if args.is_verbose else logging.INFO)
+    if args.output_file != STANDARD_STREAM:
+        print(epilog)
+
+    if not os.path.isfile(args.index_file):
+        logger.error(MSG_ERROR_INPUT_FILE_NOT_FOUND.format(f=args.index_file))
+        return 1
+
+    try:
+        with ResultIndex(args.index_file) as index:
+            if args.aggregates is not None:
+                rows = index.aggregate(args.aggregates, args.where, args.group_by)
+            else:
+                fields = None
+                if args.select is not None:
+                    fields = [f.strip() for f in args.select.split(',') if f.strip()]
+                rows = index.query(args.where, fields, args.limit)
+            with writers.open_output(args.output_file, args.output_format) as fp:
+                with writers.new_writer(args.output_format, fp) as writer:
+                    for row in rows:
+                        writer.write(row)
+    except Exception as e:
+        logger.error(str(e))
+        return 1
+    return 0
+
+
 # =-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=
 
 def entry_point():
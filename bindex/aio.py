@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.aio
+    ~~~~~~~~~~~~~
+
+    The aio module exposes the extraction to asyncio applications. The
+    blocking reads of an extraction are run in a bounded pool of threads so
+    that the event loop is never blocked, and a single compiled definition is
+    shared by all the concurrent extractions.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import asyncio
+import concurrent.futures
+import logging
+
+from bindex import batch
+from bindex.const import *
+from bindex.files import DefinitionFile
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+logger = logging.getLogger(__name__)
+
+
+async def extract_async(_definition, _target, _options=None, _executor=None):
+    """
+    Extracts the parameters of the definition from a single target file
+    without blocking the event loop.
+
+    Like bindex.batch.extract_one, errors are returned as an error record.
+
+    :param _definition: A DefinitionFile or DefinitionRegistry object.
+    :param _target: The path of the target file.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :param _executor: The concurrent.futures.Executor running the blocking
+    calls. The default executor of the loop is used if None.
+    :return: The result dictionary of the extraction or an error record.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor, batch.extract_one, _definition, _target, _options)
+
+
+def __prepare(_definition, _options):
+    """
+    Compiles the spans of the definition before it is shared between
+    threads, so that they are not computed by several of them at once.
+
+    :param _definition: A DefinitionFile or DefinitionRegistry object.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :return: None
+    """
+    if isinstance(_definition, DefinitionFile):
+        _definition.plan.precompute(_options.get("_gap_tolerance", 0))
+
+
+async def iter_extract_async(_definition, _targets, _concurrency=ASYNC_DEFAULT_CONCURRENCY,
+                             _options=None, _executor=None):
+    """
+    Extracts many target files concurrently and yields the results as they
+    complete.
+
+    At most _concurrency extractions are in progress at any time, so the
+    number of pending tasks does not depend on the number of targets.
+
+    :param _definition: A DefinitionFile or DefinitionRegistry object.
+    :param _targets: An iterable of paths of target files.
+    :param _concurrency: The maximum number of extractions in progress.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :param _executor: The concurrent.futures.Executor running the blocking
+    calls. If None, a pool of _concurrency threads is created for the call.
+    :return: An asynchronous generator of (target, result) tuples.
+    """
+    assert _concurrency >= 1
+    options = _options or {}
+    __prepare(_definition, options)
+
+    executor = _executor
+    if executor is None:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=_concurrency)
+
+    pending = {}
+    targets = iter(_targets)
+    try:
+        while True:
+            for target in targets:
+                task = asyncio.ensure_future(
+                    extract_async(_definition, target, options, executor))
+                pending[task] = target
+                if len(pending) >= _concurrency:
+                    break
+            if len(pending) == 0:
+                break
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield pending.pop(task), task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if _executor is None:
+            executor.shutdown(wait=False)
+
+
+async def extract_many_async(_definition, _targets, _concurrency=ASYNC_DEFAULT_CONCURRENCY,
+                             _options=None, _executor=None):
+    """
+    Extracts many target files concurrently.
+
+    :param _definition: A DefinitionFile or DefinitionRegistry object.
+    :param _targets: A list of paths of target files.
+    :param _concurrency: The maximum number of extractions in progress.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :param _executor: The concurrent.futures.Executor running the blocking
+    calls. If None, a pool of _concurrency threads is created for the call.
+    :return: The list of result dictionaries, in the order of the targets.
+    """
+    results = {}
+    async for target, result in iter_extract_async(
+            _definition, _targets, _concurrency, _options, _executor):
+        results.setdefault(target, result)
+    return [results[target] for target in _targets]
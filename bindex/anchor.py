@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.anchor
+    ~~~~~~~~~~~~~
+
+    The anchor module locates structures whose position in the target file
+    is not known in advance, such as in memory dumps. An anchor is a byte
+    pattern or a regular expression searched for in the target file, from
+    which parameters are then located with relative offsets.
+
+    All the anchors of a definition are searched for in a single pass over
+    the target file, one window at a time, so every window is read from the
+    disk only once. Byte patterns are searched for with the find method of
+    the buffer, which is much faster than a regular expression.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import re
+
+from bindex.const import *
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+
+class Anchor(object):
+    """
+    The Anchor object describes a byte pattern or a regular expression to
+    search for in the target file. Parameters relative to an anchor are
+    located from the first byte of its first match.
+    """
+
+    def __init__(self, _name, _pattern=NO_VALUE, _regex=NO_VALUE, _start=0, _end=NO_VALUE,
+                 _max_size=ANCHOR_DEFAULT_MAX_SIZE):
+        """
+        Initializes a new Anchor object. Either a pattern or a regular
+        expression must be given.
+
+        :param _name: The name of the anchor, referred to by the 'relative_to'
+        field of the parameters.
+        :param _pattern: The bytes to search for, as a hexadecimal string,
+        e.g. "4D5A9000". Spaces are ignored. Can be None.
+        :param _regex: A regular expression matching bytes, in which each
+        character stands for the byte of the same code, e.g. "MZ\\x90\\x00".
+        Can be None.
+        :param _start: The offset from which the anchor is searched for.
+        :param _end: The offset at which the search stops. The whole match
+        must be located before it. Can be None to search up to the end of
+        the target file.
+        :param _max_size: The maximum length of a match of the regular
+        expression. Longer matches may not be found.
+        """
+        assert _name is not None and len(_name.strip()) > 0
+        if (_pattern is NO_VALUE) == (_regex is NO_VALUE):
+            raise Exception(MSG_ERROR_ANCHOR_PATTERN.format(a=_name))
+        if not isinstance(_start, int) or _start < 0 or \
+                (_end is not NO_VALUE and (not isinstance(_end, int) or _end < _start)):
+            raise Exception(MSG_ERROR_ANCHOR_RANGE.format(a=_name))
+
+        self.__name = _name
+        self.__pattern = NO_VALUE
+        self.__regex = NO_VALUE
+        try:
+            if _pattern is not NO_VALUE:
+                self.__pattern = bytes.fromhex(_pattern)
+                if len(self.__pattern) == 0:
+                    raise ValueError(MSG_ERROR_ANCHOR_EMPTY)
+            else:
+                self.__regex = re.compile(_regex.encode("latin-1"), re.DOTALL)
+        except (ValueError, TypeError, AttributeError, UnicodeError, re.error) as e:
+            raise Exception(MSG_ERROR_ANCHOR_INVALID.format(a=_name, err=str(e)))
+        self.__start = _start
+        self.__end = _end
+        self.__max_size = _max_size
+
+    def __repr__(self):
+        """
+        Returns a string representation of the Anchor object.
+        :return: A string representation of the Anchor object.
+        """
+        return ANCHOR_REPR.format(
+            n=self.__name,
+            p=self.__pattern.hex() if self.__regex is NO_VALUE else str(self.__regex.pattern)
+        )
+
+    @property
+    def name(self):
+        """
+        Returns the name of the anchor.
+        :return: The name of the anchor.
+        """
+        return self.__name
+
+    @property
+    def pattern(self):
+        """
+        Returns the bytes searched for.
+        :return: A bytes object, or None if the anchor is a regular expression.
+        """
+        return self.__pattern
+
+    @property
+    def regex(self):
+        """
+        Returns the compiled regular expression searched for.
+        :return: A compiled pattern, or None if the anchor is a byte pattern.
+        """
+        return self.__regex
+
+    @property
+    def start(self):
+        """
+        Returns the offset from which the anchor is searched for.
+        :return: The offset from which the anchor is searched for.
+        """
+        return self.__start
+
+    @property
+    def end(self):
+        """
+        Returns the offset at which the search stops.
+        :return: The offset at which the search stops, or None.
+        """
+        return self.__end
+
+    @property
+    def overlap(self):
+        """
+        Returns the number of bytes a match can extend past the window in
+        which it starts.
+        :return: The number of bytes read past the end of each window.
+        """
+        if self.__regex is NO_VALUE:
+            return len(self.__pattern) - 1
+        return self.__max_size
+
+    def find(self, _buffer, _start, _end):
+        """
+        Searches for the first match of the anchor located within the given
+        range of the buffer.
+
+        :param _buffer: A bytes or mmap object.
+        :param _start: The offset from which to search.
+        :param _end: The offset before which the match must end.
+        :return: The offset of the first byte of the match, or -1 if the
+        anchor was not found.
+        """
+        if self.__regex is NO_VALUE:
+            return _buffer.find(self.__pattern, _start, _end)
+        match = self.__regex.search(_buffer, _start, _end)
+        return -1 if match is None else match.start()
+
+
+def scan(_buffer, _anchors, _window=ANCHOR_SCAN_WINDOW, _base=0):
+    """
+    Searches for the first match of each anchor in a single pass over the
+    buffer.
+
+    The buffer is searched one window at a time, and every anchor not found
+    yet is searched for in each window before moving to the next one. On a
+    mapped file, each window is therefore read from the disk only once,
+    however many anchors are searched for. The scan stops as soon as every
+    anchor has been found.
+
+    :param _buffer: A bytes or mmap object.
+    :param _anchors: A list of Anchor objects.
+    :param _window: The number of bytes searched at once.
+    :param _base: The offset in the buffer from which the search ranges of
+    the anchors and the offsets returned are computed.
+    :return: A dictionary of the offsets of the anchors, indexed by name.
+    The offset of an anchor which was not found is None.
+    """
+    assert _window > 0 and _base >= 0
+    size = len(_buffer)
+    positions = {a.name: NO_VALUE for a in _anchors}
+    pending = list(_anchors)
+    if len(pending) == 0:
+        return positions
+
+    start = _base + min(a.start for a in pending)
+    while len(pending) > 0 and start < size:
+        stop = start + _window
+        for anchor in list(pending):
+            end = size if anchor.end is NO_VALUE else min(_base + anchor.end, size)
+            if end <= start:
+                # The range of the anchor was searched entirely.
+                pending.remove(anchor)
+                continue
+            if _base + anchor.start >= stop:
+                continue
+            # Matches starting in this window may end in the next one.
+            position = anchor.find(
+                _buffer, max(start, _base + anchor.start), min(stop + anchor.overlap, end))
+            if 0 <= position < stop:
+                positions[anchor.name] = position - _base
+                pending.remove(anchor)
+        start = stop
+
+    return positions
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.batch
+    ~~~~~~~~~~~~~
+
+    The batch module runs a single definition file against many target files.
+    The definition is loaded and compiled once, then the targets are spread
+    across a pool of worker processes. Results are written as JSON lines in
+    the order of the targets, as soon as they are available.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import concurrent.futures
+import glob
+import logging
+import os
+import sys
+
+from bindex import predicate
+from bindex import writers
+from bindex.cache import is_filtered_again
+from bindex.const import *
+from bindex.extractor import Extractor
+from bindex.registry import DefinitionRegistry
+from bindex.stats import NULL_STATS
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+logger = logging.getLogger(__name__)
+
+# Definition and extraction options of the current worker process.
+__worker_definition = None
+__worker_options = {}
+
+
+def expand_targets(_inputs, _file_list=None):
+    """
+    Expands the given inputs into a list of target files.
+
+    Each input can be a file, a directory, which is walked recursively, or a
+    glob pattern. The files of a directory or matched by a pattern are sorted
+    so the resulting list is deterministic. Duplicates are removed.
+
+    :param _inputs: A list of files, directories or glob patterns.
+    :param _file_list: The path of a file containing one target per line, or
+    "-" to read the list from the standard input. Can be None.
+    :return: The list of target files.
+    """
+    candidates = []
+    for item in _inputs or []:
+        if os.path.isdir(item):
+            for top, subdirs, files in os.walk(item):
+                subdirs.sort()
+                candidates.extend(os.path.join(top, f) for f in sorted(files))
+        elif glob.has_magic(item):
+            candidates.extend(sorted(glob.glob(item, recursive=True)))
+        else:
+            candidates.append(item)
+
+    if _file_list is not None:
+        if _file_list == STANDARD_STREAM:
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(_file_list, "r") as fp:
+                lines = fp.read().splitlines()
+        candidates.extend(line.strip() for line in lines if line.strip())
+
+    targets = []
+    seen = set()
+    for candidate in candidates:
+        if candidate not in seen and os.path.isfile(candidate):
+            seen.add(candidate)
+            targets.append(candidate)
+    return targets
+
+
+def select_definition(_definition, _target):
+    """
+    Returns the definition file to use for the given target file.
+
+    :param _definition: A DefinitionFile object, or a DefinitionRegistry from
+    which the first compatible definition is selected.
+    :param _target: The path of the target file.
+    :return: A DefinitionFile object.
+    """
+    if not isinstance(_definition, DefinitionRegistry):
+        return _definition
+
+    matches = _definition.match(_target)
+    if len(matches) == 0:
+        raise Exception(MSG_ERROR_NO_MATCHING_DEFINITION.format(f=_target))
+    logger.info(MSG_INFO_DEFINITION_SELECTED.format(df=matches[0].file, f=_target))
+    return matches[0]
+
+
+def extract_one(_definition, _target, _options=None):
+    """
+    Extracts the parameters of the definition from a single target file.
+
+    Errors do not propagate: a record containing the error message is
+    returned instead, so a failing target does not abort a batch.
+
+    :param _definition: A DefinitionFile object, or a DefinitionRegistry from
+    which the first compatible definition is selected.
+    :param _target: The path of the target file.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :return: The result dictionary of the extraction or an error record, or
+    None if the target file does not match the filter predicate of the
+    options.
+    """
+    try:
+        definition = select_definition(_definition, _target)
+        extractor = Extractor(
+            _target_file=_target,
+            _definition_file=definition,
+            **(_options or {})
+        )
+        return extractor.extract()
+    except Exception as e:
+        logger.error(MSG_ERROR_BATCH_TARGET.format(f=_target, err=str(e) or type(e).__name__))
+        return {
+            PARAM_METADATA: {
+                PARAM_DEF_FILE: str(_definition),
+                PARAM_ORIGINAL_FILE: _target
+            },
+            PARAM_ERROR: str(e) or type(e).__name__
+        }
+
+
+def __init_worker(_definition, _options):
+    """
+    Stores the definition and the options in the worker process.
+
+    :param _definition: A DefinitionFile or DefinitionRegistry object.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :return: None
+    """
+    global __worker_definition, __worker_options
+    __worker_definition = _definition
+    __worker_options = _options
+
+
+def __worker_extract(_target):
+    """
+    Extracts a target file using the definition of the worker process.
+
+    :param _target: The path of the target file.
+    :return: The result dictionary of the extraction or an error record.
+    """
+    return extract_one(__worker_definition, _target, __worker_options)
+
+
+def extract_many(_definition, _targets, _jobs=1, _options=None, _cache=None):
+    """
+    Extracts the parameters of the definition from many target files.
+
+    With more than one job, the targets are processed by a pool of worker
+    processes which receive the compiled definition once. Results are
+    yielded in the order of the targets.
+
+    If the options hold a filter predicate, "_where", only the results of
+    the target files matching it are yielded, along with the error records.
+
+    :param _definition: A DefinitionFile or DefinitionRegistry object.
+    :param _targets: A list of paths of target files.
+    :param _jobs: The number of worker processes.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :param _cache: A ResultCache object. The stored results of unchanged
+    target files are reused, and the other results are stored. Can be None.
+    :return: A generator of result dictionaries.
+    """
+    assert _jobs >= 1
+    options = dict(_options or {})
+    # The predicate is parsed once instead of once per target file.
+    if isinstance(options.get("_where"), str):
+        options["_where"] = predicate.parse(options["_where"])
+
+    if _cache is not None:
+        results = __extract_cached(_definition, _targets, _jobs, options, _cache)
+    else:
+        results = __extract_all(_definition, _targets, _jobs, options)
+    for result in results:
+        if result is not NO_VALUE:
+            yield result
+
+
+def __extract_all(_definition, _targets, _jobs, _options):
+    """
+    Extracts every target file, in the worker processes if more than one job
+    is requested.
+
+    :param _definition: A DefinitionFile or DefinitionRegistry object.
+    :param _targets: A list of paths of target files.
+    :param _jobs: The number of worker processes.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :return: A generator of result dictionaries, in the order of the
+    targets. None is yielded for the targets not matching the filter
+    predicate.
+    """
+    if _jobs == 1 or len(_targets) <= 1:
+        for target in _targets:
+            yield extract_one(_definition, target, _options)
+        return
+
+    chunk_size = max(1, min(BATCH_MAX_CHUNK_SIZE, len(_targets) // (_jobs * 4)))
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=_jobs,
+            initializer=__init_worker,
+            initargs=(_definition, _options)) as executor:
+        for result in executor.map(__worker_extract, _targets, chunksize=chunk_size):
+            yield result
+
+
+def __extract_cached(_definition, _targets, _jobs, _options, _cache):
+    """
+    Extracts the target files whose results are not in the cache, and reads
+    the results of the others from the cache. The filter predicate is
+    applied again to the complete results read from it, see
+    bindex.cache.is_filtered_again.
+    The target files which do not match the predicate are recorded as such.
+
+    :param _definition: A DefinitionFile or DefinitionRegistry object.
+    :param _targets: A list of paths of target files.
+    :param _jobs: The number of worker processes.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :param _cache: A ResultCache object.
+    :return: A generator of result dictionaries, in the order of the targets.
+    None is yielded for the targets not matching the filter predicate.
+    """
+    where = _options.get("_where", NO_VALUE)
+    # Target files known not to match the predicate are neither extracted
+    # nor read from the cache.
+    filtered = set()
+    if where is not NO_VALUE:
+        filtered = set(t for t in _targets if _cache.is_filtered(t, _definition, _options))
+    misses = [t for t in _targets
+              if t not in filtered and not _cache.contains(t, _definition, _options)]
+    # The targets are examined before they are extracted, so that the
+    # results of targets modified in the meantime are not stored.
+    stats = {t: os.stat(t) for t in misses}
+    extracted = __extract_all(_definition, misses, _jobs, _options)
+    missing = set(misses)
+
+    for target in _targets:
+        if target in filtered:
+            result = NO_VALUE
+        elif target in missing:
+            result = next(extracted)
+            if result is NO_VALUE:
+                _cache.put_filtered(target, _definition, _options, stats[target])
+            else:
+                _cache.put(target, _definition, _options, result, stats[target])
+        else:
+            result = _cache.get(target, _definition, _options)
+            if result is NO_VALUE:
+                result = extract_one(_definition, target, _options)
+            elif is_filtered_again(_options) and not where.matches(result[PARAM_OTHER_PARAMS]):
+                result = NO_VALUE
+        yield result
+
+
+def run(_definition, _targets, _fp, _jobs=1, _options=None, _format=FORMAT_JSONL,
+        _stats=NULL_STATS, _cache=None):
+    """
+    Extracts many target files and writes each result as soon as it is
+    available, one JSON line per target by default.
+
+    :param _definition: A DefinitionFile or DefinitionRegistry object.
+    :param _targets: A list of paths of target files.
+    :param _fp: A file object receiving the results, opened in binary mode
+    for binary formats.
+    :param _jobs: The number of worker processes.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :param _format: The output format, one of bindex.const.OUTPUT_FORMATS.
+    :param _stats: A Stats object receiving the stats of every result, if
+    the extractors collect them, and the time spent writing the results.
+    :param _cache: A ResultCache object, see extract_many. Can be None.
+    :return: A (number of targets, number of failures) tuple.
+    """
+    failures = 0
+    with writers.new_writer(_format, _fp) as writer:
+        for result in extract_many(_definition, _targets, _jobs, _options, _cache):
+            if PARAM_ERROR in result:
+                failures += 1
+            _stats.merge(result.get(PARAM_METADATA, {}).get(PARAM_STATS, {}))
+            with _stats.phase(PHASE_SERIALIZATION):
+                writer.write(result)
+    return writer.count, failures
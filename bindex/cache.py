@@ -0,0 +1,583 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.cache
+    ~~~~~~~~~~~~~
+
+    The cache module stores compiled definition files in a local directory.
+    Entries are keyed by the hash of the content of the definition file and
+    by the version of bindex, so an entry is reused as long as the file is
+    unchanged and ignored as soon as the file or bindex changes.
+
+    The results of extractions are also stored, in a SQLite database of the
+    same directory, keyed by the target file and by the definition used.
+    Unchanged target files are then not extracted again.
+
+    The cache directory must only be writable by trusted users, since its
+    entries are Python pickles.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+
+from bindex import digest
+from bindex import predicate
+from bindex.const import *
+from bindex.files import DefinitionFile
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_directory():
+    """
+    Returns the default directory of the bindex caches.
+
+    The directory is taken from the BINDEX_CACHE_DIR environment variable,
+    or defaults to a 'bindex' directory in the user cache directory.
+
+    :return: The path of the cache directory.
+    """
+    directory = os.environ.get(ENV_CACHE_DIR)
+    if directory:
+        return directory
+    base = os.environ.get(ENV_XDG_CACHE_HOME) or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, metadata.package)
+
+
+def definition_key(_content):
+    """
+    Returns the cache key of a definition file.
+
+    :param _content: The raw content of the definition file.
+    :return: The hex digest identifying the compiled definition.
+    """
+    key = hashlib.sha256()
+    key.update(metadata.version.encode("utf-8"))
+    key.update(b"\x00")
+    key.update(str(DEFINITION_CACHE_FORMAT).encode("utf-8"))
+    key.update(b"\x00")
+    key.update(_content)
+    return key.hexdigest()
+
+
+class DefinitionCache(object):
+    """
+    The DefinitionCache object loads definition files, reusing the compiled
+    definitions stored in the cache directory when the files are unchanged.
+    """
+
+    def __init__(self, _directory=None):
+        """
+        Initializes the cache using the given directory.
+
+        :param _directory: The path of the cache directory. If None, the
+        default cache directory is used.
+        """
+        if _directory is None:
+            _directory = default_cache_directory()
+        self.__directory = os.path.join(_directory, DEFINITION_CACHE_SUBDIR)
+        self.__hits = 0
+        self.__misses = 0
+
+    def __repr__(self):
+        """
+        Returns a string representation of the DefinitionCache object.
+        :return: A string representation of the DefinitionCache object.
+        """
+        return DEFINITION_CACHE_REPR.format(d=self.__directory)
+
+    @property
+    def directory(self):
+        """
+        Returns the directory containing the compiled definitions.
+        :return: The path of the directory.
+        """
+        return self.__directory
+
+    @property
+    def hits(self):
+        """
+        Returns the number of definitions loaded from the cache.
+        :return: The number of cache hits.
+        """
+        return self.__hits
+
+    @property
+    def misses(self):
+        """
+        Returns the number of definitions which had to be compiled.
+        :return: The number of cache misses.
+        """
+        return self.__misses
+
+    def load(self, _file):
+        """
+        Loads a definition file, from the cache if possible.
+
+        If the compiled definition is not in the cache, or cannot be read,
+        the file is parsed and compiled, then stored in the cache.
+
+        :param _file: The path of the definition file.
+        :return: A DefinitionFile object.
+        """
+        with open(_file, "rb") as fp:
+            content = fp.read()
+        key = definition_key(content)
+        entry = os.path.join(self.__directory, key + DEFINITION_CACHE_EXTENSION)
+
+        if os.path.isfile(entry):
+            try:
+                with open(entry, "rb") as fp:
+                    definition = pickle.load(fp)
+                if isinstance(definition, DefinitionFile):
+                    if definition.file != _file:
+                        definition.relocate(_file)
+                    self.__hits += 1
+                    logger.debug(MSG_INFO_DEFINITION_CACHE_HIT.format(f=_file))
+                    return definition
+            except Exception as e:
+                logger.warning(MSG_ERROR_DEFINITION_CACHE_READ.format(f=entry, err=str(e)))
+
+        self.__misses += 1
+        definition = DefinitionFile(_file, _content=content)
+        self.__store(entry, definition)
+        return definition
+
+    def __store(self, _entry, _definition):
+        """
+        Stores a compiled definition in the cache. The entry is written to a
+        temporary file first, then renamed, so concurrent readers never see
+        a partial entry. Failures are logged and otherwise ignored.
+
+        :param _entry: The path of the cache entry.
+        :param _definition: The DefinitionFile object to store.
+        :return: None
+        """
+        _definition.plan.precompute()
+        try:
+            os.makedirs(self.__directory, exist_ok=True)
+            fd, temp = tempfile.mkstemp(dir=self.__directory)
+            try:
+                with os.fdopen(fd, "wb") as fp:
+                    pickle.dump(_definition, fp, pickle.HIGHEST_PROTOCOL)
+                os.replace(temp, _entry)
+            except Exception:
+                os.remove(temp)
+                raise
+        except Exception as e:
+            logger.warning(MSG_ERROR_DEFINITION_CACHE_WRITE.format(f=_entry, err=str(e)))
+
+    def clear(self):
+        """
+        Removes every compiled definition from the cache.
+        :return: None
+        """
+        if not os.path.isdir(self.__directory):
+            return
+        for name in os.listdir(self.__directory):
+            if name.endswith(DEFINITION_CACHE_EXTENSION):
+                os.remove(os.path.join(self.__directory, name))
+
+
+def result_definition_key(_definition):
+    """
+    Returns the key identifying the definition used to extract a result.
+
+    The key depends on the content of the definition files and on the
+    version of bindex, so results are extracted again whenever either
+    changes. The key of a registry covers all of its definitions.
+
+    :param _definition: A DefinitionFile or DefinitionRegistry object.
+    :return: The hex digest identifying the definition.
+    """
+    if isinstance(_definition, DefinitionFile):
+        hashes = [_definition.content_hash]
+    else:
+        hashes = sorted(d.content_hash for d in _definition.definitions)
+    key = hashlib.sha256()
+    key.update(metadata.version.encode("utf-8"))
+    for content_hash in hashes:
+        key.update(b"\x00")
+        key.update(content_hash.encode("utf-8"))
+    return key.hexdigest()
+
+
+def is_filtered_again(_options):
+    """
+    Indicates if the filter predicate of the extraction options must be
+    applied to the results read from the cache.
+
+    Complete results are shared by every predicate, and filtered again when
+    they are reused. Results limited to some fields may not hold the fields
+    read by the predicate, so they are stored under the key of the
+    predicate they matched instead.
+
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :return: True if the cached results must be filtered again, False
+    otherwise.
+    """
+    options = _options or {}
+    return options.get("_where", NO_VALUE) is not NO_VALUE and options.get("_fields", NO_VALUE) is NO_VALUE
+
+
+def result_options_key(_options, _filtered=False):
+    """
+    Returns the key of the extraction options which change the results.
+
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :param _filtered: If True, the key identifies the target files which do
+    not match the filter predicate of the options, and includes it.
+    :return: A string identifying the options.
+    """
+    options = _options or {}
+    fields = options.get("_fields", NO_VALUE)
+    where = options.get("_where", NO_VALUE)
+    key = {
+        RESULT_CACHE_VERSION: RESULT_CACHE_FORMAT,
+        RESULT_CACHE_HASHES: sorted(options.get("_hashes", DEFAULT_HASHES) or []),
+        RESULT_CACHE_BASE: options.get("_base", 0),
+        RESULT_CACHE_FIELDS: NO_VALUE if fields is NO_VALUE else sorted(fields)
+    }
+    if _filtered or (where is not NO_VALUE and fields is not NO_VALUE):
+        if isinstance(where, str):
+            where = predicate.parse(where)
+        assert where is not NO_VALUE
+        key[RESULT_CACHE_WHERE] = where.to_sql(lambda f: f)
+        key[RESULT_CACHE_FILTERED] = _filtered
+    return json.dumps(key, sort_keys=True)
+
+
+class ResultCache(object):
+    """
+    The ResultCache object stores the results of extractions in a SQLite
+    database, so unchanged target files are not extracted again.
+
+    A result is reused if the size and the modification time of the target
+    file are unchanged. If only the modification time changed and the
+    extraction computed the SHA1 digest of the file, the digest of the
+    content decides, so a file which was copied or touched is still not
+    extracted again. Once the database grows past its maximum size, the
+    least recently used results are evicted.
+    """
+
+    def __init__(self, _directory=None, _max_size=RESULT_CACHE_MAX_SIZE):
+        """
+        Opens the database of results in the given directory.
+
+        :param _directory: The path of the cache directory. If None, the
+        default cache directory is used.
+        :param _max_size: The maximum number of bytes of results stored.
+        """
+        if _directory is None:
+            _directory = default_cache_directory()
+        os.makedirs(_directory, exist_ok=True)
+        self.__file = os.path.join(_directory, RESULT_CACHE_FILE)
+        self.__max_size = _max_size
+        self.__hits = 0
+        self.__misses = 0
+        self.__pending = 0
+
+        self.__db = sqlite3.connect(self.__file)
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        self.__db.execute("PRAGMA synchronous=NORMAL")
+        self.__db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "target TEXT NOT NULL, definition TEXT NOT NULL, options TEXT NOT NULL, "
+            "size INTEGER NOT NULL, mtime INTEGER NOT NULL, digest TEXT NOT NULL, "
+            "result BLOB NOT NULL, length INTEGER NOT NULL, accessed REAL NOT NULL, "
+            "PRIMARY KEY (target, definition, options))")
+        self.__db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self.__db.commit()
+        self.__size = self.__db.execute(
+            "SELECT COALESCE(SUM(length), 0) FROM results").fetchone()[0]
+
+    def __repr__(self):
+        """
+        Returns a string representation of the ResultCache object.
+        :return: A string representation of the ResultCache object.
+        """
+        return RESULT_CACHE_REPR.format(f=self.__file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        self.close()
+
+    @property
+    def file(self):
+        """
+        Returns the path of the database of results.
+        :return: The path of the database.
+        """
+        return self.__file
+
+    @property
+    def size(self):
+        """
+        Returns the number of bytes of results stored.
+        :return: The size of the stored results in bytes.
+        """
+        return self.__size
+
+    @property
+    def hits(self):
+        """
+        Returns the number of results read from the cache.
+        :return: The number of cache hits.
+        """
+        return self.__hits
+
+    @property
+    def misses(self):
+        """
+        Returns the number of results which were not in the cache.
+        :return: The number of cache misses.
+        """
+        return self.__misses
+
+    def contains(self, _target, _definition, _options=None):
+        """
+        Indicates if the result of the given target file is stored, without
+        reading it. A result which cannot be reused is counted as a miss.
+
+        :param _target: The path of the target file.
+        :param _definition: A DefinitionFile or DefinitionRegistry object.
+        :param _options: A dictionary of keyword arguments given to the Extractor.
+        :return: True if the stored result can be reused, False otherwise.
+        """
+        if self.__lookup(_target, _definition, _options) is NO_VALUE:
+            self.__misses += 1
+            return False
+        return True
+
+    def get(self, _target, _definition, _options=None):
+        """
+        Returns the stored result of the given target file, if it can be
+        reused. The target file is not opened unless its modification time
+        changed.
+
+        :param _target: The path of the target file.
+        :param _definition: A DefinitionFile or DefinitionRegistry object.
+        :param _options: A dictionary of keyword arguments given to the Extractor.
+        :return: The result dictionary, or None.
+        """
+        rowid = self.__lookup(_target, _definition, _options)
+        if rowid is NO_VALUE:
+            self.__misses += 1
+            return NO_VALUE
+        row = self.__db.execute("SELECT result FROM results WHERE rowid = ?", (rowid,)).fetchone()
+        try:
+            result = pickle.loads(row[0])
+        except Exception as e:
+            logger.warning(MSG_ERROR_RESULT_CACHE_READ.format(f=_target, err=str(e)))
+            self.__misses += 1
+            return NO_VALUE
+        self.__db.execute("UPDATE results SET accessed = ? WHERE rowid = ?", (time.time(), rowid))
+        self.__changed()
+        self.__hits += 1
+        # The same definition may be stored at another location.
+        if isinstance(_definition, DefinitionFile):
+            result[PARAM_METADATA][PARAM_DEF_FILE] = str(_definition)
+        return result
+
+    def is_filtered(self, _target, _definition, _options):
+        """
+        Indicates if the given target file is known not to match the filter
+        predicate of the options, see ResultCache.put_filtered.
+
+        :param _target: The path of the target file.
+        :param _definition: A DefinitionFile or DefinitionRegistry object.
+        :param _options: A dictionary of keyword arguments given to the
+        Extractor, holding a filter predicate.
+        :return: True if the target file does not match the predicate, False
+        if it does or if it is unknown.
+        """
+        if self.__lookup(_target, _definition, _options, True) is NO_VALUE:
+            return False
+        self.__hits += 1
+        return True
+
+    def put_filtered(self, _target, _definition, _options, _stat=None):
+        """
+        Records that the given target file does not match the filter
+        predicate of the options, so it is not extracted again by later runs
+        using the same predicate.
+
+        The target file is not hashed, so the record is only reused while
+        the size and the modification time of the file are unchanged.
+
+        :param _target: The path of the target file.
+        :param _definition: A DefinitionFile or DefinitionRegistry object.
+        :param _options: A dictionary of keyword arguments given to the
+        Extractor, holding a filter predicate.
+        :param _stat: The os.stat_result of the target file taken before the
+        extraction. Nothing is stored if the file changed since.
+        :return: None
+        """
+        path = os.path.abspath(_target)
+        stat = os.stat(path)
+        if _stat is not None and \
+                (_stat.st_size, _stat.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            return
+        key = (path, result_definition_key(_definition), result_options_key(_options, True))
+        self.__insert(key, stat, EMPTY_STRING, pickle.dumps(NO_VALUE, pickle.HIGHEST_PROTOCOL))
+
+    def put(self, _target, _definition, _options, _result, _stat=None):
+        """
+        Stores the result of an extraction. Failed extractions are not stored.
+
+        :param _target: The path of the target file.
+        :param _definition: A DefinitionFile or DefinitionRegistry object.
+        :param _options: A dictionary of keyword arguments given to the Extractor.
+        :param _result: The result dictionary of the extraction.
+        :param _stat: The os.stat_result of the target file taken before the
+        extraction. The result is not stored if the file changed since.
+        :return: None
+        """
+        if _result is None or PARAM_ERROR in _result:
+            return
+        path = os.path.abspath(_target)
+        stat = os.stat(path)
+        if _stat is not None and \
+                (_stat.st_size, _stat.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            return
+
+        # The stats describe the extraction, not the target file.
+        result = dict(_result)
+        result[PARAM_METADATA] = dict(result[PARAM_METADATA])
+        result[PARAM_METADATA].pop(PARAM_STATS, None)
+        # The target file is not read again only to hash it: without the
+        # digest of the extraction, the result is only reused while the size
+        # and the modification time of the file are unchanged.
+        hexdigest = result[PARAM_METADATA].get(HASH_SHA1, EMPTY_STRING)
+        blob = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+
+        key = (path, result_definition_key(_definition), result_options_key(_options))
+        self.__insert(key, stat, hexdigest, blob)
+
+    def __insert(self, _key, _stat, _hexdigest, _blob):
+        """
+        Stores a row of the cache, replacing the previous one.
+
+        :param _key: The (target, definition, options) key of the row.
+        :param _stat: The os.stat_result of the target file.
+        :param _hexdigest: The SHA1 digest of the target file, or an empty
+        string if it was not computed.
+        :param _blob: The pickled result.
+        :return: None
+        """
+        row = self.__db.execute(
+            "SELECT length FROM results WHERE target = ? AND definition = ? AND options = ?",
+            _key).fetchone()
+        if row is not None:
+            self.__size -= row[0]
+        self.__db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            _key + (_stat.st_size, _stat.st_mtime_ns, _hexdigest, _blob, len(_blob), time.time()))
+        self.__size += len(_blob)
+        if self.__size > self.__max_size:
+            self.__evict()
+        self.__changed()
+
+    def clear(self):
+        """
+        Removes every result from the cache.
+        :return: None
+        """
+        self.__db.execute("DELETE FROM results")
+        self.__db.commit()
+        self.__pending = 0
+        self.__size = 0
+
+    def close(self):
+        """
+        Writes the pending changes and closes the database.
+        :return: None
+        """
+        if self.__db is not None:
+            self.__db.commit()
+            self.__db.close()
+            self.__db = None
+
+    def __lookup(self, _target, _definition, _options, _filtered=False):
+        """
+        Finds the stored result of the given target file and verifies that
+        the file is unchanged.
+
+        :param _target: The path of the target file.
+        :param _definition: A DefinitionFile or DefinitionRegistry object.
+        :param _options: A dictionary of keyword arguments given to the Extractor.
+        :param _filtered: If True, finds the record of a target file which
+        does not match the filter predicate instead.
+        :return: The rowid of the stored result, or None.
+        """
+        path = os.path.abspath(_target)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return NO_VALUE
+        row = self.__db.execute(
+            "SELECT rowid, size, mtime, digest FROM results "
+            "WHERE target = ? AND definition = ? AND options = ?",
+            (path, result_definition_key(_definition),
+             result_options_key(_options, _filtered))).fetchone()
+        if row is None or row[1] != stat.st_size:
+            return NO_VALUE
+        rowid, _, mtime, hexdigest = row
+        if mtime == stat.st_mtime_ns:
+            return rowid
+        if len(hexdigest) == 0:
+            return NO_VALUE
+
+        # The content of the file decides if only its modification time
+        # changed.
+        if digest.hash_file(path, [HASH_SHA1])[HASH_SHA1] != hexdigest:
+            return NO_VALUE
+        self.__db.execute("UPDATE results SET mtime = ? WHERE rowid = ?", (stat.st_mtime_ns, rowid))
+        self.__changed()
+        return rowid
+
+    def __evict(self):
+        """
+        Removes the least recently used results until the stored results fit
+        in the maximum size of the cache, with some room left.
+        :return: None
+        """
+        target = self.__max_size * RESULT_CACHE_EVICTION_RATIO
+        rows = self.__db.execute("SELECT rowid, length FROM results ORDER BY accessed")
+        evicted = []
+        for rowid, length in rows:
+            if self.__size <= target:
+                break
+            evicted.append((rowid,))
+            self.__size -= length
+        self.__db.executemany("DELETE FROM results WHERE rowid = ?", evicted)
+        logger.debug(MSG_INFO_RESULT_CACHE_EVICTED.format(n=len(evicted)))
+
+    def __changed(self):
+        """
+        Commits the changes once enough of them are pending.
+        :return: None
+        """
+        self.__pending += 1
+        if self.__pending >= RESULT_CACHE_COMMIT_INTERVAL:
+            self.__db.commit()
+            self.__pending = 0
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.carve
+    ~~~~~~~~~~~~~
+
+    The carve module extracts a definition at every place of a target file
+    where its compatibility parameters match, such as every configuration
+    block found in a memory dump. The target file is split into chunks
+    searched in parallel by worker processes for the raw bytes of a
+    compatibility parameter. Each candidate is then verified and extracted
+    with the offsets of the definition computed from the candidate. Each
+    worker opens the target file once and reuses it for every candidate.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import concurrent.futures
+import logging
+import mmap
+import os
+
+from bindex import codec
+from bindex import writers
+from bindex.const import *
+from bindex.extractor import Extractor
+from bindex.files import TargetFile
+from bindex.stats import NULL_STATS
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+logger = logging.getLogger(__name__)
+
+# Definition, opened TargetFile object and options of the current worker
+# process.
+__worker_definition = None
+__worker_target = None
+__worker_options = {}
+
+
+def signature(_definition):
+    """
+    Returns the compatibility parameter searched for in the target file.
+
+    Only parameters whose compatible values can be compared to raw bytes
+    can be searched for. The longest one is the most selective, so it is
+    preferred.
+
+    :param _definition: A DefinitionFile object.
+    :return: A (CompatibilityParameter, offset) tuple, where offset is the
+    absolute offset of the parameter in an occurrence of the definition.
+    """
+    candidates = [(p, offset) for p, offset in _definition.plan.compatibility
+                  if p.compatible_bytes]
+    if len(candidates) == 0:
+        raise Exception(MSG_ERROR_CARVE_SIGNATURE.format(df=str(_definition)))
+    return min(candidates, key=lambda item: (-item[0].size, item[1]))
+
+
+def chunks(_size, _chunk_size=CARVE_CHUNK_SIZE):
+    """
+    Splits a target file into the ranges searched by the workers.
+
+    :param _size: The size of the target file in bytes.
+    :param _chunk_size: The number of bytes of each chunk.
+    :return: A list of (start, end) tuples.
+    """
+    assert _chunk_size > 0
+    return [(start, min(start + _chunk_size, _size)) for start in range(0, _size, _chunk_size)]
+
+
+def open_target(_target, _options=None):
+    """
+    Creates the TargetFile object shared by the extractions of the
+    occurrences found in a target file.
+
+    :param _target: The path of the target file.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :return: A TargetFile object, which is not opened yet.
+    """
+    return TargetFile(_target, _use_mmap=(_options or {}).get("_use_mmap", False))
+
+
+def is_candidate(_definition, _mapping, _base):
+    """
+    Verifies the compatibility parameters of a candidate occurrence, comparing
+    raw bytes when possible.
+
+    :param _definition: A DefinitionFile object.
+    :param _mapping: The mapping of the target file.
+    :param _base: The offset of the candidate in the target file.
+    :return: True if the candidate is compatible with the definition, False
+    otherwise.
+    """
+    for parameter, offset in _definition.plan.compatibility:
+        start = _base + offset
+        if start + parameter.size > len(_mapping):
+            return False
+        if parameter.compatible_bytes is not None:
+            if _mapping[start:start + parameter.size] not in parameter.compatible_bytes:
+                return False
+            continue
+        try:
+            if not parameter.is_compatible(codec.decode(parameter, _mapping, start)):
+                return False
+        except Exception:
+            return False
+    return True
+
+
+def carve_chunk(_definition, _target, _start, _end, _options=None):
+    """
+    Extracts the occurrences of the definition whose signature starts in the
+    given chunk of the target file.
+
+    The signature may end past the chunk, so the search reads a few bytes
+    of the next chunk. The compatibility parameters of each candidate are
+    verified before extracting it, so false positives are skipped without
+    creating an Extractor. The occurrences are extracted through the same
+    TargetFile object, which is only opened once.
+
+    :param _definition: A DefinitionFile object.
+    :param _target: The path of the target file, or a TargetFile object
+    created by open_target.
+    :param _start: The offset of the first byte of the chunk.
+    :param _end: The offset following the last byte of the chunk.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :return: The list of the results of the occurrences, sorted by offset.
+    """
+    key, key_offset = signature(_definition)
+    target = _target if isinstance(_target, TargetFile) else open_target(_target, _options)
+    options = dict(_options or {})
+    # The base and the mapping are those of the shared target file, and the
+    # whole target file would be hashed for every occurrence.
+    options.pop("_base", None)
+    options.pop("_use_mmap", None)
+    options["_hashes"] = []
+
+    results = []
+    size = os.path.getsize(target.file)
+    if size == 0:
+        return results
+    with target, open(target.file, "rb") as fp:
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+            hits = set()
+            stop = min(_end + key.size - 1, size)
+            for value in key.compatible_bytes:
+                position = mapping.find(value, _start, stop)
+                while 0 <= position < _end:
+                    hits.add(position)
+                    position = mapping.find(value, position + 1, stop)
+
+            for hit in sorted(hits):
+                base = hit - key_offset
+                if base < 0 or base >= size:
+                    continue
+                if not is_candidate(_definition, mapping, base):
+                    logger.debug(MSG_ERROR_CARVE_REJECTED.format(o=base, err=MSG_ERROR_NOT_COMPATIBLE))
+                    continue
+                target.rebase(base)
+                try:
+                    result = Extractor(target, _definition, **options).extract()
+                except Exception as e:
+                    logger.debug(MSG_ERROR_CARVE_REJECTED.format(o=base, err=str(e)))
+                    continue
+                # The occurrence does not match the filter predicate.
+                if result is NO_VALUE:
+                    continue
+                result[PARAM_METADATA][PARAM_BASE_OFFSET] = base
+                results.append(result)
+    return results
+
+
+def __init_worker(_definition, _target, _options):
+    """
+    Stores the definition, the target file and the options in the worker
+    process. The target file is opened once and stays open until the
+    worker process exits.
+
+    :param _definition: A DefinitionFile object.
+    :param _target: The path of the target file.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :return: None
+    """
+    global __worker_definition, __worker_target, __worker_options
+    __worker_definition = _definition
+    __worker_target = open_target(_target, _options)
+    __worker_target.open()
+    __worker_options = _options
+
+
+def __worker_carve(_chunk):
+    """
+    Carves a chunk of the target file of the worker process.
+
+    :param _chunk: A (start, end) tuple.
+    :return: The list of the results of the occurrences found.
+    """
+    return carve_chunk(__worker_definition, __worker_target, _chunk[0], _chunk[1], __worker_options)
+
+
+def carve(_definition, _target, _jobs=1, _options=None, _chunk_size=CARVE_CHUNK_SIZE):
+    """
+    Extracts the definition at every offset of the target file where its
+    compatibility parameters match.
+
+    With more than one job, the chunks of the target file are searched by a
+    pool of worker processes which receive the compiled definition once.
+    Results are yielded by increasing offset, as soon as the chunk in which
+    they were found has been searched. Each result holds the offset of the
+    occurrence in the "base_offset" field of its metadata. The target file
+    is not hashed.
+
+    :param _definition: A DefinitionFile object.
+    :param _target: The path of the target file.
+    :param _jobs: The number of worker processes.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :param _chunk_size: The number of bytes searched by each task.
+    :return: A generator of result dictionaries.
+    """
+    assert _jobs >= 1
+    # Fail early if the definition cannot be searched for.
+    signature(_definition)
+    ranges = chunks(os.path.getsize(_target), _chunk_size)
+
+    if _jobs == 1 or len(ranges) <= 1:
+        with open_target(_target, _options) as target:
+            for start, end in ranges:
+                yield from carve_chunk(_definition, target, start, end, _options)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=_jobs,
+            initializer=__init_worker,
+            initargs=(_definition, _target, _options or {})) as executor:
+        for results in executor.map(__worker_carve, ranges):
+            yield from results
+
+
+def run(_definition, _target, _fp, _jobs=1, _options=None, _format=FORMAT_JSONL,
+        _stats=NULL_STATS, _chunk_size=CARVE_CHUNK_SIZE):
+    """
+    Carves the target file and writes the result of each occurrence as soon
+    as it is available, one JSON line per occurrence by default.
+
+    :param _definition: A DefinitionFile object.
+    :param _target: The path of the target file.
+    :param _fp: A file object receiving the results, opened in binary mode
+    for binary formats.
+    :param _jobs: The number of worker processes.
+    :param _options: A dictionary of keyword arguments given to the Extractor.
+    :param _format: The output format, one of bindex.const.OUTPUT_FORMATS.
+    :param _stats: A Stats object receiving the stats of every result, if
+    the extractors collect them, and the time spent writing the results.
+    :param _chunk_size: The number of bytes searched by each task.
+    :return: The number of occurrences found.
+    """
+    with writers.new_writer(_format, _fp) as writer:
+        for result in carve(_definition, _target, _jobs, _options, _chunk_size):
+            _stats.merge(result[PARAM_METADATA].get(PARAM_STATS, {}))
+            with _stats.phase(PHASE_SERIALIZATION):
+                writer.write(result)
+    return writer.count
@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.codec
+    ~~~~~~~~~~~~~
+
+    The codec module converts the bytes of parameters into values. Struct
+    formats of numeric parameters are compiled only once per process and runs
+    of adjacent numeric parameters can be fused into a single Struct so that
+    their values are unpacked with a single call. String parameters are
+    cleaned using precomputed translation tables.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import struct
+
+from bindex.const import *
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+# Compiled Struct objects, indexed by their format string.
+__structs = {}
+
+# Number of values produced by each compiled format.
+__value_counts = {}
+
+# Code points of the Unicode "Cc" (control) category. The category is frozen
+# by the Unicode standard and only contains the C0 and C1 control codes.
+CONTROL_CODE_POINTS = tuple(range(0x00, 0x20)) + tuple(range(0x7F, 0xA0))
+
+# Table used by str.translate to remove the control characters.
+__control_table = dict.fromkeys(CONTROL_CODE_POINTS)
+
+# Table used by bytes.translate to remove the ASCII control characters.
+__ascii_control_bytes = bytes(c for c in CONTROL_CODE_POINTS if c < 0x80)
+
+# ASCII characters removed by str.strip(), including the information
+# separators 0x1C to 0x1F.
+__ascii_whitespace = b" \t\n\x0b\x0c\r\x1c\x1d\x1e\x1f"
+
+# Encodings which decode ASCII bytes to the same characters.
+__ascii_compatible = frozenset([TYPE_ASCII, TYPE_UTF8])
+
+
+def decode_string(_buffer, _encoding, _remove_control=True):
+    """
+    Decodes the bytes of a string parameter.
+
+    Surrounding whitespace is stripped and, if requested, the control
+    characters are removed from the string. ASCII content is cleaned at the
+    bytes level before being decoded, which avoids working on each character
+    of the decoded string.
+
+    :param _buffer: The bytes of the string. Any object supporting the buffer
+    protocol is accepted.
+    :param _encoding: The encoding of the string.
+    :param _remove_control: If True, the control characters are removed.
+    :return: The decoded string.
+    """
+    if _remove_control and _encoding in __ascii_compatible:
+        raw = bytes(_buffer)
+        if raw.isascii():
+            raw = raw.strip(__ascii_whitespace).translate(None, __ascii_control_bytes)
+            return raw.decode(TYPE_ASCII)
+
+    value = str(_buffer, _encoding).strip()
+    if _remove_control:
+        value = value.translate(__control_table)
+    return value
+
+
+def decode(_parameter, _buffer, _position=0, _remove_control=True, _count=NO_VALUE):
+    """
+    Converts the bytes of the given parameter to its value.
+
+    The buffer can be any object supporting the buffer protocol, such as
+    bytes or a memoryview of a mapped file. No copy of the buffer is made to
+    decode numeric values.
+
+    :param _parameter: A Parameter object
+    :param _buffer: The buffer containing the bytes of the parameter.
+    :param _position: The position of the parameter within the buffer.
+    :param _remove_control: If True, the control characters are removed
+    from string values.
+    :param _count: The number of elements of an array whose count is read
+    from another parameter. Can be None.
+    :return: The value of the parameter.
+    """
+    if _parameter.is_array:
+        count = _parameter.count if _count is NO_VALUE else _count
+        return decode_array(_parameter, _buffer, _position, count, _remove_control)
+    # Convert string values
+    if _parameter.is_string:
+        raw = _buffer[_position:_position + _parameter.size]
+        return decode_string(raw, _parameter.type, _remove_control)
+    # Convert numeric values. The format must cover the parameter exactly,
+    # otherwise the bytes of the neighbouring parameters would be decoded.
+    compiled = _parameter.codec
+    if compiled.size != _parameter.size:
+        raise Exception(MSG_ERROR_FORMAT_SIZE.format(
+            param=_parameter.name,
+            fs=compiled.size,
+            s=_parameter.size))
+    return compiled.unpack_from(_buffer, _position)[0]
+
+
+def decode_array(_parameter, _buffer, _position, _count, _remove_control=True):
+    """
+    Converts the bytes of the elements of an array parameter to a list.
+
+    Numeric elements producing a single value are unpacked with a single
+    call using a repeated format, e.g. "<100I". Other elements, including
+    the bytes of "s" and "p" elements, are
+    unpacked with Struct.iter_unpack. Elements producing several values are
+    returned as tuples.
+
+    :param _parameter: A Parameter object.
+    :param _buffer: The buffer containing the bytes of the array.
+    :param _position: The position of the first element within the buffer.
+    :param _count: The number of elements of the array.
+    :param _remove_control: If True, the control characters are removed
+    from string elements.
+    :return: The list of the values of the elements.
+    """
+    size = _parameter.element_size
+    if _parameter.is_string:
+        return [decode_string(_buffer[p:p + size], _parameter.type, _remove_control)
+                for p in range(_position, _position + size * _count, size)]
+
+    compiled = _parameter.codec
+    fusable = None
+    if compiled.size == size:
+        fusable = __fusable(compiled)
+    # The count of a "s" or "p" code is the length of a single string, so
+    # these elements cannot be repeated.
+    if fusable is not None and len(fusable[1]) == 1 and fusable[1] not in "sp":
+        # Repeated formats are not kept in the cache of compiled formats
+        # since the number of elements may vary with every target file.
+        fmt = "{p:s}{n:d}{c:s}".format(p=fusable[0], n=_count, c=fusable[1])
+        return list(struct.unpack_from(fmt, _buffer, _position))
+
+    end = _position + size * _count
+    if compiled.size == size:
+        with memoryview(_buffer) as view, view[_position:end] as elements:
+            values = list(compiled.iter_unpack(elements))
+    else:
+        # The elements are padded: unpack each one at its own position.
+        values = [compiled.unpack_from(_buffer, p) for p in range(_position, end, size)]
+    if value_count(compiled) == 1:
+        return [value for value, in values]
+    return values
+
+
+def byte_order_prefix(_byte_order):
+    """
+    Returns the struct prefix character of the given byte order.
+
+    The byte order can either be one of the names defined in
+    bindex.const.BYTE_ORDERS, e.g. "little" or "big", or directly one of
+    the prefix characters of the struct module.
+
+    :param _byte_order: The name or prefix of the byte order. Can be None.
+    :return: The struct prefix character, or an empty string if no byte
+    order was given.
+    """
+    if _byte_order is NO_VALUE:
+        return EMPTY_STRING
+    if _byte_order in BYTE_ORDERS:
+        return BYTE_ORDERS[_byte_order]
+    if _byte_order in BYTE_ORDERS.values():
+        return _byte_order
+    raise Exception(MSG_ERROR_INVALID_BYTE_ORDER.format(bo=str(_byte_order)))
+
+
+def compile_format(_type, _byte_order=NO_VALUE):
+    """
+    Returns the compiled struct.Struct object of the given format.
+
+    If the format does not specify its own byte order, the given byte order
+    is applied to it. Compiled objects are cached for the whole process.
+
+    :param _type: The struct format of the parameter.
+    :param _byte_order: The default byte order of the definition. Can be None.
+    :return: A struct.Struct object.
+    """
+    fmt = _type
+    if fmt[:1] not in BYTE_ORDERS.values():
+        fmt = byte_order_prefix(_byte_order) + fmt
+    compiled = __structs.get(fmt)
+    if compiled is None:
+        compiled = struct.Struct(fmt)
+        __structs[fmt] = compiled
+    return compiled
+
+
+def value_count(_struct):
+    """
+    Returns the number of values unpacked by the given Struct.
+
+    :param _struct: A struct.Struct object.
+    :return: The number of values produced when unpacking.
+    """
+    count = __value_counts.get(_struct.format)
+    if count is None:
+        count = len(_struct.unpack(bytes(_struct.size)))
+        __value_counts[_struct.format] = count
+    return count
+
+
+def __fusable(_struct):
+    """
+    Returns the prefix and the format codes to use for the given Struct when
+    fused with other Structs, or None if it cannot be fused.
+
+    Only formats producing a single value are fused. Native formats are
+    fused using the standard sizes, which is only possible if they are
+    identical to the native sizes.
+
+    :param _struct: A struct.Struct object.
+    :return: A (prefix, codes) tuple or None.
+    """
+    if value_count(_struct) != 1:
+        return None
+    fmt = _struct.format
+    prefix = fmt[:1]
+    codes = fmt[1:]
+    if prefix not in BYTE_ORDERS.values():
+        prefix = BYTE_ORDER_NATIVE
+        codes = fmt
+    if prefix == BYTE_ORDER_NETWORK:
+        prefix = BYTE_ORDER_BIG
+    elif prefix == BYTE_ORDER_NATIVE:
+        try:
+            if struct.calcsize(BYTE_ORDER_STANDARD + codes) != _struct.size:
+                return None
+        except struct.error:
+            return None
+        prefix = BYTE_ORDER_STANDARD
+    return prefix, codes
+
+
+def fuse(_parameters):
+    """
+    Splits the given parameters into groups decoded with a single Struct.
+
+    Consecutive numeric parameters which are exactly adjacent, produce a
+    single value and share the same byte order are fused into a composite
+    format. All other parameters are left in groups of their own.
+
+    :param _parameters: A list of (parameter, absolute offset) tuples, sorted
+    by offset.
+    :return: A list of (format, parameters) tuples, where format is the
+    composite struct format of the group or None if the group holds a single
+    parameter to decode on its own.
+    """
+    groups = []
+    run = []
+    run_prefix = None
+    run_codes = []
+    run_end = None
+
+    def flush():
+        if len(run) > 1:
+            groups.append((run_prefix + EMPTY_STRING.join(run_codes), list(run)))
+        else:
+            groups.extend((None, [item]) for item in run)
+
+    for parameter, offset in _parameters:
+        fusable = None
+        codec = parameter.codec
+        if codec is not None and codec.size == parameter.size and not parameter.is_array:
+            fusable = __fusable(codec)
+
+        if fusable is not None and run and offset == run_end and fusable[0] == run_prefix:
+            run.append((parameter, offset))
+            run_codes.append(fusable[1])
+            run_end = offset + parameter.size
+            continue
+
+        flush()
+        run = []
+        run_codes = []
+        if fusable is not None:
+            run = [(parameter, offset)]
+            run_prefix, codes = fusable
+            run_codes = [codes]
+            run_end = offset + parameter.size
+        else:
+            groups.append((None, [(parameter, offset)]))
+
+    flush()
+    return groups
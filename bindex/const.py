@@ -40,16 +40,20 @@ PARAM_META_AUTHOR = "author"
 PARAM_META_DESC = "description"
 PARAM_META_VERSION = "version"
 PARAM_META_DATE = "creation_date"
+PARAM_META_BYTE_ORDER = "byte_order"
 PARAM_COMPATIBILITY_PARAMS = "compatibility"
 PARAM_OTHER_PARAMS = "parameters"
+PARAM_ANCHORS = "anchors"
 
 METADATA = [
     PARAM_META_AUTHOR,
     PARAM_META_DESC,
     PARAM_META_VERSION,
     PARAM_META_DATE,
+    PARAM_META_BYTE_ORDER,
     PARAM_COMPATIBILITY_PARAMS,
-    PARAM_OTHER_PARAMS
+    PARAM_OTHER_PARAMS,
+    PARAM_ANCHORS
 ]
 
 PARAM_NAME = "name"
@@ -57,12 +61,123 @@ PARAM_SIZE = "size"
 PARAM_OFFSET = "offset"
 PARAM_RELATIVE = "relative_to"
 PARAM_TYPE = "type"
+PARAM_COUNT = "count"
 PARAM_VALUE = "value"
 PARAM_COMPATIBLE_WITH = "compatible_with"
+PARAM_PATTERN = "pattern"
+PARAM_REGEX = "regex"
+PARAM_START = "start"
+PARAM_END = "end"
+PARAM_MAX_SIZE = "max_size"
 PARAM_ORIGINAL_FILE = "target"
 PARAM_DEF_FILE = "definition"
 PARAM_ANALYSIS_DATE = "analyzed_on"
 PARAM_ORIGINAL_FILE_HASH = "sha1"
+PARAM_ERROR = "error"
+PARAM_STATS = "stats"
+PARAM_BASE_OFFSET = "base_offset"
+
+STATS_TIMINGS = "timings"
+STATS_COUNTERS = "counters"
+PHASE_DEFINITION = "definition"
+PHASE_SETUP = "setup"
+PHASE_HASHING = "hashing"
+PHASE_SCAN = "scan"
+PHASE_COMPATIBILITY = "compatibility"
+PHASE_READ = "read"
+PHASE_DECODE = "decode"
+PHASE_FILTER = "filter"
+PHASE_SERIALIZATION = "serialization"
+COUNTER_BYTES_READ = "bytes_read"
+COUNTER_READ_CALLS = "read_calls"
+COUNTER_PARAMETERS = "parameters_decoded"
+COUNTER_DECODE_ERRORS = "decode_errors"
+COUNTER_CACHE_HITS = "cache_hits"
+COUNTER_CACHE_MISSES = "cache_misses"
+COUNTER_RESULT_CACHE_HITS = "result_cache_hits"
+COUNTER_RESULT_CACHE_MISSES = "result_cache_misses"
+
+HASH_SHA1 = "sha1"
+HASH_SHA256 = "sha256"
+HASH_MD5 = "md5"
+HASH_BLAKE2 = "blake2"
+HASH_ALIASES = {
+    HASH_BLAKE2: "blake2b"
+}
+DEFAULT_HASHES = [HASH_SHA1]
+HASH_CHUNK_SIZE = 1024 * 1024
+
+DEFINITION_EXTENSIONS = [".json", ".config"]
+
+ENV_CACHE_DIR = "BINDEX_CACHE_DIR"
+ENV_XDG_CACHE_HOME = "XDG_CACHE_HOME"
+DEFINITION_CACHE_SUBDIR = "definitions"
+DEFINITION_CACHE_EXTENSION = ".pickle"
+# Incremented whenever the layout of the compiled definitions changes.
+DEFINITION_CACHE_FORMAT = 4
+RESULT_CACHE_FILE = "results.sqlite3"
+RESULT_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+# Fraction of the maximum size left once results are evicted.
+RESULT_CACHE_EVICTION_RATIO = 0.9
+RESULT_CACHE_COMMIT_INTERVAL = 100
+# Version of the results stored in the cache, part of the key of the
+# extraction options.
+RESULT_CACHE_FORMAT = 2
+RESULT_CACHE_VERSION = "format"
+RESULT_CACHE_HASHES = "hashes"
+RESULT_CACHE_BASE = "base"
+RESULT_CACHE_FIELDS = "fields"
+RESULT_CACHE_WHERE = "where"
+RESULT_CACHE_FILTERED = "filtered"
+
+# Keywords and comparison operators of the filter predicates.
+PREDICATE_AND = "and"
+PREDICATE_OR = "or"
+PREDICATE_NOT = "not"
+PREDICATE_IN = "in"
+PREDICATE_NULL = "null"
+PREDICATE_TRUE = "true"
+PREDICATE_FALSE = "false"
+PREDICATE_KEYWORDS = [PREDICATE_AND, PREDICATE_OR, PREDICATE_NOT, PREDICATE_IN,
+                      PREDICATE_NULL, PREDICATE_TRUE, PREDICATE_FALSE]
+PREDICATE_END = "end of predicate"
+
+# Index of extracted values queried by the 'index' and 'query' commands.
+COMMAND_INDEX = "index"
+COMMAND_QUERY = "query"
+INDEX_DEFAULT_FILE = "bindex.sqlite3"
+INDEX_COMMIT_INTERVAL = 1000
+INDEX_COLUMN_PREFIX = "p_"
+INDEX_NAME = "index_{c:s}"
+# Metadata stored in their own column, in the order of the columns.
+INDEX_META_FIELDS = [PARAM_ORIGINAL_FILE, PARAM_DEF_FILE, PARAM_ORIGINAL_FILE_HASH,
+                     PARAM_ANALYSIS_DATE]
+INDEX_INTEGER = "INTEGER"
+INDEX_REAL = "REAL"
+INDEX_TEXT = "TEXT"
+INDEX_BLOB = "BLOB"
+# Lists and tuples are stored as JSON text and are not indexed.
+INDEX_JSON = "JSON"
+INDEX_COUNT = "count"
+INDEX_AGGREGATES = ["min", "max", "sum", "avg"]
+# Largest integer stored as an INTEGER by SQLite.
+INDEX_MAX_INTEGER = 2 ** 63 - 1
+
+STANDARD_STREAM = "-"
+
+FORMAT_JSON = "json"
+FORMAT_PRETTY = "pretty"
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+FORMAT_MSGPACK = "msgpack"
+OUTPUT_FORMATS = [FORMAT_PRETTY, FORMAT_JSON, FORMAT_JSONL, FORMAT_CSV, FORMAT_MSGPACK]
+CSV_META_COLUMN = "meta.{k:s}"
+DEFAULT_OUTPUT_FILE = "output.json"
+BATCH_MAX_CHUNK_SIZE = 64
+ASYNC_DEFAULT_CONCURRENCY = 32
+ANCHOR_SCAN_WINDOW = 16 * 1024 * 1024
+ANCHOR_DEFAULT_MAX_SIZE = 4096
+CARVE_CHUNK_SIZE = 64 * 1024 * 1024
 
 NAME_UNKNOWN = "unknown"
 UNKNOWN_PARAM_FORMAT = "{prefix:s}{idx:03d}"
@@ -79,9 +194,21 @@ PARAMETER_STR = "Parameter '{pn:s}', {type:s} of {sz:d} byte(s) at 0x{off:08X} b
 PARAMETER_REPR = "<Parameter Name='{n:s}', Offset=0x{off:08X}, Size={sz:d} byte(s), RelativeTo:{rn:s}, Type={type:s}, Value={val:s}"
 EXTRACTOR_REPR = "<Extractor definition='{df:s}', target='{tf:s}'>"
 TARGET_FILE_REPR = "<TargetFile file='{f:s}'.>"
+STREAM_FILE_REPR = "<StreamFile stream='{f:s}'.>"
 
 ABSTRACT_FILE_REPR = "<AbstractFile File='{f:s}'>"
 DEFINITION_FILE_REPR = "<DefinitionFile File='{f:s}'>"
+SPAN_REPR = "<Span Start=0x{start:08X}, End=0x{end:08X}, Parameters={np:d}>"
+DEFINITION_CACHE_REPR = "<DefinitionCache Directory='{d:s}'>"
+RESULT_CACHE_REPR = "<ResultCache File='{f:s}'>"
+RESULT_INDEX_REPR = "<ResultIndex File='{f:s}', Columns={nc:d}>"
+PREDICATE_REPR = "<Predicate '{p:s}'>"
+DEFINITION_REGISTRY_REPR = "<DefinitionRegistry Definitions={nd:d}, Probes={np:d}>"
+ANCHOR_REPR = "<Anchor Name='{n:s}', Pattern={p:s}>"
+STATS_REPR = "<Stats Phases={nt:d}, Counters={nc:d}>"
+LAZY_VALUES_REPR = "<LazyValues Parameters={np:d}, Decoded={nd:d}, Closed={c:s}>"
+RECORD_LAYOUT_REPR = "<RecordLayout definition='{df:s}', Fields={nf:d}, Stride={s:d} byte(s)>"
+EXTRACTION_PLAN_REPR = "<ExtractionPlan Compatibility={nc:d} parameter(s), Parameters={np:d} parameter(s)>"
 
 TYPE_ASCII = "ascii"
 TYPE_UTF8 = "utf-8"
@@ -89,16 +216,91 @@ TYPE_UTF16 = "utf-16"
 
 TYPE_STRING = [TYPE_ASCII, TYPE_UTF8, TYPE_UTF16]
 
+# String encodings and struct format codes for which compatible values
+# can be compared to the raw bytes of the target file.
+RAW_COMPATIBLE_ENCODINGS = [TYPE_ASCII, TYPE_UTF8]
+RAW_COMPATIBLE_FORMATS = "bBhHiIlLqQnN"
+COMPATIBILITY_GAP = 4096
+
+BYTE_ORDER_NATIVE = "@"
+BYTE_ORDER_STANDARD = "="
+BYTE_ORDER_LITTLE = "<"
+BYTE_ORDER_BIG = ">"
+BYTE_ORDER_NETWORK = "!"
+
+BYTE_ORDERS = {
+    "native": BYTE_ORDER_NATIVE,
+    "standard": BYTE_ORDER_STANDARD,
+    "little": BYTE_ORDER_LITTLE,
+    "big": BYTE_ORDER_BIG,
+    "network": BYTE_ORDER_NETWORK
+}
+
 ASK_OUTPUT_OVERWRITE = "The chosen output file already exists, overwrite it? [Y/n]"
 MSG_INFO_FILE_SAVED = "Saved extracted data to '{f:s}'."
 MSG_INFO_LOADING_DEF_FILE = "Loading definition file from '{f:s}'..."
 MSG_INFO_EXTRACTION_COMPLETE = "Extraction completed."
+MSG_INFO_DEFINITION_SELECTED = "Selected definition file '{df:s}' for '{f:s}'."
+MSG_INFO_DEFINITION_CACHE_HIT = "Loaded compiled definition of '{f:s}' from the cache."
+MSG_INFO_RESULT_CACHE_EVICTED = "Evicted {n:d} result(s) from the cache."
+MSG_INFO_STATS = "Statistics: {s:s}"
+MSG_INFO_BATCH_COMPLETE = "Processed {n:d} target file(s), {f:d} failure(s)."
+MSG_INFO_INDEX_COMPLETE = "Indexed {n:d} target file(s), {f:d} failure(s), into '{i:s}'."
+MSG_INFO_BATCH_FILTERED = "Skipped {n:d} target file(s) which do not match the filter predicate."
+MSG_INFO_FILTERED = "Skipped '{f:s}', which does not match the filter predicate."
+MSG_INFO_CARVE_COMPLETE = "Found {n:d} occurrence(s) of '{df:s}' in '{f:s}'."
+MSG_INFO_COALESCED_READS = "Read {np:d} parameter(s) using {ns:d} read call(s) instead of {np:d}."
 MSG_ERROR_FAILED_READ_PARAM = "Failed to extract parameter '{param:s}': {err:s}"
 MSG_ERROR_INCOMPLETE_PARAM = "Missing mandatory properties in parameters. Cannot parse into object."
 MSG_ERROR_READ_PARAM = "Failed to read parameter '{param:s}'."
+MSG_ERROR_FORMAT_SIZE = "The format of parameter '{param:s}' unpacks {fs:d} byte(s) instead of its size of {s:d} byte(s)."
 MSG_ERROR_INPUT_FILE_NOT_FOUND = "Could not find the input file: '{f:s}'."
 MSG_ERROR_DEF_FILE_NOT_FOUND = "Could not find the definition file: '{f:s}'."
+MSG_ERROR_STREAM_DEFINITION_DIR = "A definition file, not a directory, is required to read from the standard input."
+MSG_ERROR_INVALID_COUNT = "Invalid element count for parameter '{param:s}': {c:s}."
+MSG_ERROR_COUNT_REFERENCE = "The element count of parameter '{param:s}' must be read from an integer parameter, not '{rn:s}'."
+MSG_ERROR_RELATIVE_TO_ARRAY = "Parameter '{param:s}' cannot be relative to '{rn:s}', an array whose size is only known when extracting."
+MSG_ERROR_ANCHOR_PATTERN = "Anchor '{a:s}' must have either a 'pattern' or a 'regex'."
+MSG_ERROR_ANCHOR_RANGE = "Invalid search range for anchor '{a:s}'."
+MSG_ERROR_ANCHOR_EMPTY = "the pattern is empty"
+MSG_ERROR_ANCHOR_INVALID = "Invalid pattern for anchor '{a:s}': {err:s}"
+MSG_ERROR_ANCHOR_NAME = "Anchor '{a:s}' has the name of another anchor or parameter."
+MSG_ERROR_ANCHOR_NOT_FOUND = "Anchor '{a:s}' was not found in '{f:s}'."
+MSG_ERROR_ANCHORED_COMPATIBILITY = "Compatibility parameter '{param:s}' cannot be located from anchor '{a:s}'."
+MSG_ERROR_STREAM_ANCHORS = "Parameters located from anchors cannot be extracted from a stream, which cannot be searched."
+MSG_ERROR_RECORD_ANCHORS = "Parameters located from anchors cannot be decoded as fields of a record."
+MSG_ERROR_CARVE_SIGNATURE = "Definition file '{df:s}' has no compatibility parameter whose raw bytes can be searched for."
+MSG_ERROR_CARVE_INPUT = "Carving requires a single target file and a definition file, not a directory."
+MSG_ERROR_CARVE_REJECTED = "Ignoring candidate at offset {o:d}: {err:s}"
+MSG_ERROR_NUMPY_MISSING = "NumPy is required to decode records. Install it with 'pip install numpy'."
+MSG_ERROR_RECORD_FORMAT = "Parameter '{param:s}' of type '{type:s}' cannot be decoded as a field of a record."
+MSG_ERROR_RECORD_EMPTY = "Definition file '{df:s}' has no parameter to decode as a record."
+MSG_ERROR_RECORD_STRIDE = "The stride of the records ({s:d} byte(s)) is smaller than a record ({n:d} byte(s))."
+MSG_ERROR_UNKNOWN_FORMAT = "Unknown output format: '{f:s}'."
+MSG_ERROR_MODULE_MISSING = "The '{m:s}' package is required to write the '{f:s}' format."
+MSG_WARNING_PREDICATE_FIELD = "The filter predicate compares '{f:s}', which is not a parameter of the definition."
+MSG_WARNING_UNKNOWN_FIELD = "The field '{f:s}' is not a parameter of the definition and is never extracted."
+MSG_WARNING_CSV_COLUMNS = "Some results have fields missing from the first result, which are not written to the CSV file."
+MSG_WARNING_INDEX_INTEGER = "Not indexing the value {v:d} of '{p:s}' in '{f:s}', which does not fit in a SQLite integer."
+MSG_ERROR_LAZY_CLOSED = "Cannot read parameter '{param:s}': the lazy values were closed."
 MSG_ERROR_NOT_COMPATIBLE = "Definition file is not compatible with target file."
 MSG_ERROR_OUTPUT_FILE_EXISTS = "Output file with similar name exists."
+MSG_ERROR_LOAD_DEFINITION = "Failed to load definition file '{f:s}': {err:s}"
+MSG_ERROR_NO_MATCHING_DEFINITION = "No definition file is compatible with '{f:s}'."
+MSG_ERROR_DEFINITION_CACHE_READ = "Ignoring unreadable cache entry '{f:s}': {err:s}"
+MSG_ERROR_DEFINITION_CACHE_WRITE = "Failed to store cache entry '{f:s}': {err:s}"
+MSG_ERROR_RESULT_CACHE_OPEN = "Not using the cache of results, which cannot be opened: {err:s}"
+MSG_ERROR_RESULT_CACHE_READ = "Ignoring unreadable cached result of '{f:s}': {err:s}"
+MSG_ERROR_STREAM_WHERE = "Filter predicates are not supported when reading from a stream."
+MSG_ERROR_PREDICATE_SYNTAX = "Invalid predicate '{e:s}': unexpected {t:s} at position {p:d}."
+MSG_ERROR_PREDICATE_NULL = "Invalid comparison of '{f:s}': null can only be compared with '==' or '!='."
+MSG_ERROR_INDEX_FIELD = "Unknown field '{f:s}' in the index."
+MSG_ERROR_INDEX_AGGREGATE = "Invalid aggregate '{a:s}', expected count or one of {fn:s} applied to a field."
+MSG_ERROR_NO_TARGETS = "No target files found."
+MSG_ERROR_BATCH_TARGET = "Failed to extract '{f:s}': {err:s}"
 MSG_ERROR_NO_DATA_EXTRACTED = "No data was extracted from '{f:s}'."
+MSG_ERROR_UNKNOWN_HASH = "Unknown hash algorithm: '{h:s}'."
+MSG_ERROR_INVALID_BYTE_ORDER = "Unknown byte order: '{bo:s}'."
+MSG_ERROR_MISSING_REFERENCE = "Parameter '{param:s}' is relative to an undefined parameter: '{rn:s}'."
+MSG_ERROR_CYCLIC_REFERENCE = "Parameter '{param:s}' is part of a cycle of relative parameters."
 MSG_ERROR_PARAM_NOT_COMPATIBLE = "Parameter '{param:s}' is not compatible with target file:"
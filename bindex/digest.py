@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.digest
+    ~~~~~~~~~~~~~
+
+    The digest module computes the hashes of target files. Files are hashed
+    in chunks so the memory used does not depend on the size of the file,
+    and several digests are computed in a single pass over the data.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import hashlib
+
+from bindex.const import *
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+
+def new_digests(_algorithms):
+    """
+    Creates a hash object for each of the given algorithms.
+
+    :param _algorithms: A list of algorithm names, e.g. "sha1" or "sha256".
+    "blake2" is accepted as an alias of "blake2b".
+    :return: A dictionary of hash objects indexed by algorithm name.
+    """
+    digests = {}
+    for algorithm in _algorithms:
+        name = HASH_ALIASES.get(algorithm, algorithm)
+        try:
+            digests[algorithm] = hashlib.new(name)
+        except ValueError:
+            raise Exception(MSG_ERROR_UNKNOWN_HASH.format(h=algorithm))
+    return digests
+
+
+def hash_buffer(_buffer, _algorithms, _chunk_size=HASH_CHUNK_SIZE):
+    """
+    Hashes the content of a buffer, such as a memoryview of a mapped file.
+
+    The buffer is fed to the hash objects in chunks of _chunk_size bytes
+    without copying it.
+
+    :param _buffer: An object supporting the buffer protocol.
+    :param _algorithms: A list of algorithm names.
+    :param _chunk_size: The number of bytes given to the hash objects at once.
+    :return: A dictionary of hex digests indexed by algorithm name.
+    """
+    digests = new_digests(_algorithms)
+    view = memoryview(_buffer)
+    try:
+        for position in range(0, len(view), _chunk_size):
+            chunk = view[position:position + _chunk_size]
+            for digest in digests.values():
+                digest.update(chunk)
+            chunk.release()
+    finally:
+        view.release()
+    return {name: digest.hexdigest() for name, digest in digests.items()}
+
+
+def hash_stream(_fp, _algorithms, _chunk_size=HASH_CHUNK_SIZE):
+    """
+    Hashes the remaining content of a binary file object.
+
+    The data is read in chunks of _chunk_size bytes into a single reusable
+    buffer, so the memory used is bounded by the chunk size.
+
+    :param _fp: A file object opened in binary mode.
+    :param _algorithms: A list of algorithm names.
+    :param _chunk_size: The number of bytes read at once.
+    :return: A dictionary of hex digests indexed by algorithm name.
+    """
+    digests = new_digests(_algorithms)
+    buffer = bytearray(_chunk_size)
+    view = memoryview(buffer)
+    try:
+        while True:
+            count = _fp.readinto(buffer)
+            if not count:
+                break
+            chunk = view[:count]
+            for digest in digests.values():
+                digest.update(chunk)
+            chunk.release()
+    finally:
+        view.release()
+    return {name: digest.hexdigest() for name, digest in digests.items()}
+
+
+def hash_file(_file, _algorithms, _chunk_size=HASH_CHUNK_SIZE):
+    """
+    Hashes the content of a file using its own file handle.
+
+    :param _file: The path of the file to hash.
+    :param _algorithms: A list of algorithm names.
+    :param _chunk_size: The number of bytes read at once.
+    :return: A dictionary of hex digests indexed by algorithm name.
+    """
+    with open(_file, "rb") as fp:
+        return hash_stream(fp, _algorithms, _chunk_size)
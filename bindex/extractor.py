@@ -11,14 +11,23 @@
     :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
     :license: MIT, see LICENSE for more details
 """
+import asyncio
+import concurrent.futures
 import datetime
 import logging
 import os
 
+from bindex import codec
+from bindex import predicate
+from bindex import writers
 from bindex.const import *
 from bindex.files import DefinitionFile
 from bindex.files import TargetFile
-from bindex.parameter import Parameter
+from bindex.lazy import LazyValues
+from bindex.plan import Span
+from bindex.plan import coalesce
+from bindex.stats import NULL_STATS
+from bindex.stats import Stats
 
 __author__ = metadata.authors[0]
 __copyright__ = metadata.copyright
@@ -33,21 +42,59 @@ logger = logging.getLogger(__name__)
 
 
 class Extractor(object):
-    def __init__(self, _target_file, _definition_file):
+    def __init__(self, _target_file, _definition_file, _use_mmap=False, _gap_tolerance=0,
+                 _hashes=DEFAULT_HASHES, _stats=False, _base=0, _where=NO_VALUE,
+                 _fields=NO_VALUE):
         """
         Initiates an Extractor object using the given definition and target files.
 
         This function does not initiate the extraction process. It merely creates
         a TargetFile object and a DefinitionFile object, which validates some variables.
 
-        :param _target_file: The path to the target file.
-        :param _definition_file: The path to the definition file.
+        :param _target_file: The path to the target file, or a TargetFile
+        object which can be kept open between extractors. Its own base and
+        mapping are then used instead of _base and _use_mmap.
+        :param _definition_file: The path to the definition file, or an already
+        loaded DefinitionFile object which can be shared between extractors.
+        :param _use_mmap: If True, the target file is mapped into memory
+        instead of being read with file operations.
+        :param _gap_tolerance: The maximum number of unused bytes between two
+        parameters for them to be read with the same read call.
+        :param _hashes: The hash algorithms to compute over the target file
+        during the extraction. Hashing is skipped if the list is empty.
+        :param _stats: If True, the time spent in each phase and I/O counters
+        are collected and added to the metadata of the results.
+        :param _base: The offset in the target file from which the offsets of
+        the definition are computed, e.g. the start of a structure found in
+        a memory dump.
+        :param _where: A filter predicate over the values of the parameters,
+        as a string or a Predicate object. The target file is only extracted
+        if the predicate is true. Can be None.
+        :param _fields: The names of the parameters to extract. The other
+        parameters are neither read nor decoded, except the counts of the
+        requested arrays. Can be None to extract every parameter.
         """
-        assert os.path.isfile(_target_file)
-        assert os.path.isfile(_definition_file)
+        # Stats of the creation of the extractor, reported with every
+        # extraction.
+        self.__setup_stats = Stats() if _stats else NULL_STATS
+        self.__stats = NULL_STATS
 
-        self.__target = TargetFile(_target_file)
-        self.__definition = DefinitionFile(_definition_file)
+        if isinstance(_target_file, TargetFile):
+            self.__target = _target_file
+        else:
+            assert os.path.isfile(_target_file)
+            with self.__setup_stats.phase(PHASE_SETUP):
+                self.__target = TargetFile(_target_file, _base=_base, _use_mmap=_use_mmap)
+        if isinstance(_definition_file, DefinitionFile):
+            self.__definition = _definition_file
+        else:
+            assert os.path.isfile(_definition_file)
+            with self.__setup_stats.phase(PHASE_DEFINITION):
+                self.__definition = DefinitionFile(_definition_file)
+        self.__gap_tolerance = _gap_tolerance
+        self.__hashes = list(_hashes or [])
+        self.__where = predicate.parse(_where) if isinstance(_where, str) else _where
+        self.__fields = NO_VALUE if _fields is NO_VALUE else frozenset(_fields)
         self.__extracted_data = {}
 
     def __str__(self):
@@ -75,6 +122,14 @@ class Extractor(object):
         """
         return str(self.__target)
 
+    @property
+    def stats(self):
+        """
+        Returns the stats collected during the last extraction.
+        :return: A Stats object, or a NullStats object if stats are disabled.
+        """
+        return self.__stats
+
     def is_compatible(self):
         """
         Verifies if the definition file given to the extractor is compatible
@@ -85,30 +140,62 @@ class Extractor(object):
         then compare the values extracted with the values defined in the "compatible_with"
         property.
 
+        The compatibility parameters are read with as few read calls as
+        possible, usually a single one covering the header of the target file.
+        When possible, the raw bytes are compared to the compatible values
+        without being decoded. The verification stops at the first parameter
+        which is not compatible.
+
         :return: True if all the values extracted are compatible with the definition file,
         False otherwise.
         """
-        parameters = self.__definition.compatibility
-
-        for parameter_name in parameters:
-            try:
-                # Obtain the parameter object from the compatibility parameters.
-                parameter = parameters[parameter_name]
-                # Calculates the absolute offset of the parameter within the target file.
-                absolute_offset = self.__get_absolute_offset(parameter)
-                # Reads the value at the given offset.
-                value = self.__target.read(parameter, absolute_offset)
-                # Check if the value is compatible with the definition file
-                if not parameter.is_compatible(value):
-                    logger.error(MSG_ERROR_PARAM_NOT_COMPATIBLE.format(
-                        param=parameter_name))
-                    logger.error("\tValue from target: {vt:s}.".format(vt=str(value)))
-                    logger.error("\tCompatible with: {valid:s}.".format(
-                        valid=', '.join(parameter.compatible_with_list)))
+        with self.__target:
+            return self.__is_compatible(NULL_STATS)
+
+    def __is_compatible(self, _stats, _values=NO_VALUE):
+        """
+        Verifies if the definition file is compatible with the target file.
+
+        :param _stats: The Stats object of the extraction.
+        :param _values: The dictionary receiving the values of the
+        compatibility parameters, indexed by name. Can be None.
+        :return: True if the target file is compatible, False otherwise.
+        """
+        plan = self.__definition.plan
+
+        for span in plan.header:
+            buffer = self.__read(span.start, span.size, _stats)
+            for parameter, absolute_offset in span.parameters:
+                position = absolute_offset - span.start
+                try:
+                    if position + parameter.size > len(buffer):
+                        raise Exception(MSG_ERROR_READ_PARAM.format(
+                            param=str(parameter)))
+                    # Compare the raw bytes if possible, otherwise decode
+                    # the value and check if it is compatible. The value is
+                    # decoded at most once, for the log or the result.
+                    if parameter.compatible_bytes is not None:
+                        compatible = parameter.is_compatible_raw(
+                            buffer[position:position + parameter.size])
+                        value = NO_VALUE
+                        if not compatible or _values is not NO_VALUE:
+                            value = self.__target.decode(parameter, buffer, position)
+                    else:
+                        value = self.__target.decode(parameter, buffer, position)
+                        compatible = parameter.is_compatible(value)
+                    if not compatible:
+                        logger.error(MSG_ERROR_PARAM_NOT_COMPATIBLE.format(
+                            param=parameter.name))
+                        logger.error("\tValue from target: {vt:s}.".format(vt=str(value)))
+                        logger.error("\tCompatible with: {valid:s}.".format(
+                            valid=', '.join(str(v) for v in parameter.compatible_with_list)))
+                        return False
+                    if _values is not NO_VALUE:
+                        _values[parameter.name] = value
+                except Exception as e:
+                    logger.error(str(e))
                     return False
-            except Exception as e:
-                logger.error(str(e))
-                return False
+            buffer = None
 
         return True
 
@@ -116,14 +203,29 @@ class Extractor(object):
         """
         Extract the parameters defined in the definition file from the provided
         target file.
-        :return: A dictionary containing metadata and the values extracted.
+
+        If a filter predicate was given, the parameters it compares are read
+        and decoded first, right after the compatibility parameters. The
+        extraction stops there if the predicate is not true, and the target
+        file is neither hashed nor read any further.
+
+        :return: A dictionary containing metadata and the values extracted,
+        or None if the values do not match the filter predicate.
         """
         assert self.__target is not None
         assert self.__definition is not None
 
+        stats = NULL_STATS
+        if self.__setup_stats.enabled:
+            stats = Stats()
+            stats.merge(self.__setup_stats)
+        self.__stats = stats
+
         # The values dictionary will contain the parameters extracted
-        # from the file.
+        # from the file, and the compatibility dictionary the values of the
+        # compatibility parameters.
         values = {}
+        compatibility = {}
         # Initiate the result dictionary with metadata to identify
         # the analysis.
         now_date = datetime.date.today().strftime(RESULT_DATE_FMT)
@@ -135,72 +237,497 @@ class Extractor(object):
                 PARAM_ANALYSIS_DATE: DATETIME_STAMP.format(
                     cdate=now_date,
                     ctime=now_time
-                ),
-                PARAM_ORIGINAL_FILE_HASH: self.__target.sha1()
+                )
             }
         }
+        if self.__target.base != 0:
+            result[PARAM_METADATA][PARAM_BASE_OFFSET] = self.__target.base
 
         # Open the target file for reading. Don't forget to close it
         # at the end.
         self.__target.open()
 
-        # Check for compatibility between the target and definition
-        # files.
-        if self.is_compatible():
-            # Start iterating the Parameters objects to extract them.
-            parameters = self.__definition.parameters
-            for parameter_name in parameters.keys():
-                parameter = parameters[parameter_name]
-                try:
-                    # Calculate the real offset of the parameter
-                    absolute_offset = self.__get_absolute_offset(parameter)
-                    # Read the value from the file
-                    value = self.__target.read(parameter, absolute_offset)
-                    logger.debug("{param:<16s}:{val:s}".format(
-                        param=parameter_name,
-                        val=str(value)
-                    ))
-                except Exception as e:
-                    value = ERROR_VALUE
-                    logger.error(MSG_ERROR_FAILED_READ_PARAM.format(
-                        param=str(parameter),
-                        err=str(e)))
-                # Store the result into the values parameter.
-                values[parameter.name] = value
-        else:
-            logger.error(MSG_ERROR_NOT_COMPATIBLE)
-            raise Exception(MSG_ERROR_NOT_COMPATIBLE)
+        # Hash the target file in a worker thread while the parameters
+        # are being extracted. With a filter predicate, the hashing starts
+        # once the target file is known to match.
+        hashing = None
+        executor = None
+        if len(self.__hashes) > 0:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            if self.__where is NO_VALUE:
+                hashing = executor.submit(self.__digest, stats)
+
+        try:
+            # Check for compatibility between the target and definition
+            # files.
+            read_time = stats.timings.get(PHASE_READ, 0.0)
+            with stats.phase(PHASE_COMPATIBILITY):
+                compatible = self.__is_compatible(stats, compatibility)
+            stats.add_time(PHASE_COMPATIBILITY, read_time - stats.timings.get(PHASE_READ, 0.0))
+            if compatible:
+                positions = {}
+                known = {}
+                if self.__where is not NO_VALUE:
+                    filtered = self.__filter(stats)
+                    if filtered is False:
+                        logger.debug(MSG_INFO_FILTERED.format(f=self.target))
+                        return NO_VALUE
+                    # The values decoded by the filter are not decoded again.
+                    positions, known = filtered
+                    if executor is not None:
+                        hashing = executor.submit(self.__digest, stats)
+                positions = self.__scan(stats, self.__fields, positions)
+                if len(positions) > 0:
+                    result[PARAM_METADATA][PARAM_ANCHORS] = positions
+                values = self.__extract_values(positions, stats, self.__fields, known)
+                if self.__fields is not NO_VALUE:
+                    # The counts of the arrays were only read to size them.
+                    values = {n: v for n, v in values.items() if n in self.__fields}
+            else:
+                logger.error(MSG_ERROR_NOT_COMPATIBLE)
+                raise Exception(MSG_ERROR_NOT_COMPATIBLE)
+
+            if hashing is not None:
+                result[PARAM_METADATA].update(hashing.result())
+        finally:
+            # Wait for the hashing thread before closing the target file,
+            # since it may be reading its mapping.
+            if executor is not None:
+                executor.shutdown(wait=True)
+            # Close the target file.
+            self.__target.close()
 
         # Add the extracted parameters to the results dictionary
+        result[PARAM_COMPATIBILITY_PARAMS] = compatibility
         result[PARAM_OTHER_PARAMS] = values
-        # Close the target file.
-        self.__target.close()
+        if stats.enabled:
+            result[PARAM_METADATA][PARAM_STATS] = stats.to_dict()
 
         return result
 
-    def __get_absolute_offset(self, _parameter):
+    def lazy_values(self):
         """
-        Calculates the absolute offset of the parameter from the parameters
-        related.
+        Returns a read-only mapping of the values of the parameters, which
+        are only read and decoded when they are first accessed, and then
+        kept. The anchors are searched for when a parameter located from
+        them is first accessed.
+
+        The compatibility of the target file is verified first. The target
+        file then stays open, or mapped, until the mapping is closed, so the
+        mapping should be used as a context manager:
+
+            with extractor.lazy_values() as values:
+                print(values["TestParam1"])
+
+        No metadata, hashes or stats are produced in this mode.
+
+        :return: A LazyValues object holding the requested parameters, or
+        None if the values do not match the filter predicate.
+        """
+        self.__open_compatible()
+        bases = {p.name: name for p, name, _ in self.__definition.plan.anchored}
+        positions = {}
+        values = LazyValues(
+            [n for n in self.__definition.parameters
+             if self.__fields is NO_VALUE or n in self.__fields],
+            lambda _name, _value: self.__load(_name, bases, positions, _value),
+            self.__target.close)
+        if self.__where is not NO_VALUE and not self.__where.matches(
+                {f: values.resolve(f) for f in self.__where.fields if f in self.__definition.parameters}):
+            logger.debug(MSG_INFO_FILTERED.format(f=self.target))
+            values.close()
+            return NO_VALUE
+        return values
+
+    def iter_values(self):
+        """
+        Reads and decodes the parameters in the order of their offsets in
+        the target file, and yields each value as soon as it is decoded, so
+        the values can be processed before the extraction is complete.
+
+        The parameters are still read by spans, as with Extractor.extract.
+        The count of an array located after the array is read ahead of it.
+        Parameters whose anchor was not found are yielded last. No metadata,
+        hashes or stats are produced in this mode.
+
+        :return: A generator of (name, value) tuples. Nothing is yielded if
+        the values do not match the filter predicate.
+        """
+        plan = self.__definition.plan
+        self.__open_compatible()
+        try:
+            positions = {}
+            if self.__where is not NO_VALUE:
+                filtered = self.__filter(NULL_STATS)
+                if filtered is False:
+                    logger.debug(MSG_INFO_FILTERED.format(f=self.target))
+                    return
+                positions = filtered[0]
+            positions = self.__scan(NULL_STATS, self.__fields, positions)
+            if self.__fields is NO_VALUE:
+                spans, arrays, anchored = plan.spans(self.__gap_tolerance), plan.arrays, plan.anchored
+            else:
+                spans, arrays, anchored = plan.select(self.__fields, self.__gap_tolerance)
+
+            # Spans and arrays, sorted by offset.
+            items = [(s.start, s) for s in spans] + [(offset, (p, offset)) for p, offset in arrays]
+            bases = {p.name: name for p, name, _ in plan.anchored}
+            located = []
+            missing = []
+            for parameter, name, distance in anchored:
+                position = positions.get(name, NO_VALUE)
+                if position is NO_VALUE:
+                    missing.append(parameter.name)
+                elif parameter.has_dynamic_count:
+                    items.append((position + distance, (parameter, position + distance)))
+                else:
+                    located.append((parameter, position + distance))
+            items += [(s.start, s) for s in coalesce(located, self.__gap_tolerance)]
+            items.sort(key=lambda item: item[0])
+
+            values = {}
+            for _, item in items:
+                if isinstance(item, Span):
+                    self.__decode_spans([item], values, NULL_STATS)
+                    names = [p.name for p, _ in item.parameters]
+                else:
+                    parameter, offset = item
+                    if parameter.count not in values:
+                        values[parameter.count] = self.__load(
+                            parameter.count, bases, positions, values.__getitem__)
+                    values[parameter.name] = self.__decode_array(
+                        parameter, offset, values[parameter.count], NULL_STATS)
+                    names = [parameter.name]
+                for name in names:
+                    if self.__fields is NO_VALUE or name in self.__fields:
+                        yield name, values[name]
+            for name in missing:
+                if self.__fields is NO_VALUE or name in self.__fields:
+                    yield name, ERROR_VALUE
+        finally:
+            self.__target.close()
+
+    async def extract_async(self, _executor=None):
+        """
+        Extracts the parameters without blocking the event loop. The blocking
+        reads of the extraction are run by the given executor.
+
+        :param _executor: The concurrent.futures.Executor running the
+        extraction. The default executor of the loop is used if None.
+        :return: A dictionary containing metadata and the values extracted.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, self.extract)
+
+    def __open_compatible(self):
+        """
+        Opens the target file and verifies its compatibility with the
+        definition file. The target file is closed if it is not compatible.
+
+        :return: None
+        """
+        self.__target.open()
+        try:
+            compatible = self.__is_compatible(NULL_STATS)
+        except Exception:
+            self.__target.close()
+            raise
+        if not compatible:
+            self.__target.close()
+            logger.error(MSG_ERROR_NOT_COMPATIBLE)
+            raise Exception(MSG_ERROR_NOT_COMPATIBLE)
 
-        :param _parameter: The Parameter from which to calculate the absolute offset.
-        :return: The absolute offset of the parameter.
+    def __load(self, _name, _bases, _positions, _value):
         """
-        assert isinstance(_parameter, Parameter)
+        Reads and decodes a single parameter, wherever it is located.
 
-        if _parameter.relative_to is None:
-            return _parameter.offset
+        :param _name: The name of the parameter.
+        :param _bases: The names of the anchors of the parameters located
+        from an anchor, indexed by the name of the parameters.
+        :param _positions: The offsets of the anchors searched for so far,
+        indexed by name. The anchor of the parameter is searched for and
+        added if it is missing.
+        :param _value: A function returning the value of another parameter,
+        given its name, used to read the number of elements of an array.
+        :return: The value of the parameter or bindex.const.ERROR_VALUE if
+        it could not be decoded.
+        """
+        plan = self.__definition.plan
+        parameter = self.__definition.parameters[_name]
+        offset = plan.offset(parameter)
+        name = _bases.get(_name, NO_VALUE)
+        if name is not NO_VALUE:
+            if name not in _positions:
+                _positions.update(self.__search([a for a in plan.anchors if a.name == name]))
+            if _positions[name] is NO_VALUE:
+                return ERROR_VALUE
+            offset += _positions[name]
+        if parameter.has_dynamic_count:
+            return self.__decode_array(parameter, offset, _value(parameter.count), NULL_STATS)
+        buffer = self.__read(offset, parameter.size, NULL_STATS)
+        return self.__decode(parameter, buffer, 0, NULL_STATS)
+
+    def __digest(self, _stats):
+        """
+        Hashes the target file, in the hashing thread of the extraction.
+
+        :param _stats: The Stats object of the extraction.
+        :return: A dictionary of hex digests indexed by algorithm name.
+        """
+        with _stats.phase(PHASE_HASHING):
+            return self.__target.digest(self.__hashes)
+
+    def __read(self, _offset, _size, _stats):
+        """
+        Reads a span of the target file and accounts for it in the stats.
+
+        :param _offset: The starting position to read.
+        :param _size: The number of bytes to read.
+        :param _stats: The Stats object of the extraction.
+        :return: The bytes read, or a memoryview of the mapped file.
+        """
+        with _stats.phase(PHASE_READ):
+            buffer = self.__target.read_span(_offset, _size)
+        _stats.count(COUNTER_READ_CALLS)
+        _stats.count(COUNTER_BYTES_READ, len(buffer))
+        return buffer
+
+    def __scan(self, _stats, _names=NO_VALUE, _positions=NO_VALUE):
+        """
+        Searches for the anchors of the definition in the target file.
+
+        :param _stats: The Stats object of the extraction.
+        :param _names: The names of the parameters to extract. Only their
+        anchors are searched for. Can be None to search for every anchor.
+        :param _positions: The offsets of the anchors which were already
+        searched for, indexed by name. Can be None.
+        :return: A dictionary of the offsets of the anchors, indexed by name,
+        including the given ones. The offset of an anchor which was not found
+        is None.
+        """
+        plan = self.__definition.plan
+        positions = dict(_positions or {})
+        anchors = [a for a in plan.anchors if a.name not in positions]
+        if _names is not NO_VALUE:
+            needed = set(a for _, a, _ in plan.select(_names, self.__gap_tolerance)[2])
+            anchors = [a for a in anchors if a.name in needed]
+        if len(anchors) == 0:
+            return positions
+        with _stats.phase(PHASE_SCAN):
+            positions.update(self.__search(anchors))
+        return positions
+
+    def __search(self, _anchors):
+        """
+        Searches for the given anchors in the target file.
+
+        :param _anchors: A list of Anchor objects.
+        :return: A dictionary of the offsets of the anchors, indexed by name.
+        The offset of an anchor which was not found is None.
+        """
+        if len(_anchors) == 0:
+            return {}
+        positions = self.__target.scan(_anchors)
+        for name, position in positions.items():
+            if position is NO_VALUE:
+                logger.error(MSG_ERROR_ANCHOR_NOT_FOUND.format(a=name, f=self.target))
+        return positions
+
+    def __filter(self, _stats):
+        """
+        Reads the parameters compared by the filter predicate and evaluates
+        it. The anchors are only searched for if the predicate needs them.
+
+        :param _stats: The Stats object of the extraction.
+        :return: A (positions, values) tuple holding the offsets of the
+        anchors searched for and the values decoded, indexed by name, or
+        False if the target file does not match the predicate.
+        """
+        fields = self.__where.fields
+        positions = self.__scan(_stats, fields)
+        values = self.__extract_values(positions, _stats, fields)
+        with _stats.phase(PHASE_FILTER):
+            matches = self.__where.matches(values)
+        return (positions, values) if matches else False
+
+    def __extract_values(self, _positions, _stats, _names=NO_VALUE, _known=NO_VALUE):
+        """
+        Reads and decodes the parameters of the plan from the target file.
+
+        :param _positions: The offsets of the anchors, indexed by name.
+        :param _stats: The Stats object of the extraction.
+        :param _names: The names of the parameters to extract, see
+        ExtractionPlan.select. Can be None to extract every parameter.
+        :param _known: The values which were already decoded, indexed by the
+        name of the parameters. They are not read again. Can be None.
+        :return: A dictionary of the values extracted, indexed by the name
+        of the parameters.
+        """
+        known = _known or {}
+        # The reads are measured on their own, so their time is removed
+        # from the time spent decoding.
+        read_time = _stats.timings.get(PHASE_READ, 0.0)
+        with _stats.phase(PHASE_DECODE):
+            values = self.__decode_values(_positions, _stats, _names, known)
+        _stats.add_time(PHASE_DECODE, read_time - _stats.timings.get(PHASE_READ, 0.0))
+        _stats.count(COUNTER_PARAMETERS, len(values) - len([n for n in known if n in values]))
+        return values
+
+    def __decode_values(self, _positions, _stats, _names=NO_VALUE, _known=NO_VALUE):
+        """
+        Reads and decodes the parameters of the plan from the target file.
+
+        :param _positions: The offsets of the anchors, indexed by name.
+        :param _stats: The Stats object of the extraction.
+        :param _names: The names of the parameters to extract, see
+        ExtractionPlan.select. Can be None to extract every parameter.
+        :param _known: The values which were already decoded, indexed by the
+        name of the parameters. Can be None.
+        :return: A dictionary of the values extracted, indexed by the name
+        of the parameters.
+        """
+        values = dict(_known or {})
+        plan = self.__definition.plan
+        if _names is NO_VALUE and len(values) == 0:
+            spans = plan.spans(self.__gap_tolerance)
+            arrays = list(plan.arrays)
+            anchored = plan.anchored
         else:
-            related_param = self.__definition.related(_parameter)
-            return _parameter.offset + self.__get_absolute_offset(related_param) + related_param.size
+            names = self.__definition.parameters if _names is NO_VALUE else _names
+            spans, arrays, anchored = plan.select(names, self.__gap_tolerance, values)
+            arrays = list(arrays)
+        self.__decode_spans(spans, values, _stats)
+
+        # Parameters located from an anchor are grouped into spans once
+        # the offset of their anchor is known.
+        if len(anchored) > 0:
+            located = []
+            for parameter, name, distance in anchored:
+                position = _positions.get(name, NO_VALUE)
+                if position is NO_VALUE:
+                    values[parameter.name] = ERROR_VALUE
+                    _stats.count(COUNTER_DECODE_ERRORS)
+                elif parameter.has_dynamic_count:
+                    arrays.append((parameter, position + distance))
+                else:
+                    located.append((parameter, position + distance))
+            anchored_spans = coalesce(located, self.__gap_tolerance)
+            self.__decode_spans(anchored_spans, values, _stats)
+            spans = spans + anchored_spans
+
+        # The size of the remaining arrays depends on the values of the
+        # parameters decoded above.
+        for parameter, absolute_offset in arrays:
+            values[parameter.name] = self.__decode_array(
+                parameter, absolute_offset, values[parameter.count], _stats)
+
+        logger.debug(MSG_INFO_COALESCED_READS.format(
+            np=len(values),
+            ns=len(spans)))
+        # Keep the values in the order of the definition file.
+        return {name: values[name] for name in self.__definition.parameters if name in values}
+
+    def __decode_spans(self, _spans, _values, _stats):
+        """
+        Reads the given spans and decodes their parameters. Each span is read
+        with a single call and its parameters are decoded from the buffer.
+
+        :param _spans: A list of Span objects.
+        :param _values: The dictionary receiving the values, indexed by the
+        name of the parameters.
+        :param _stats: The Stats object of the extraction.
+        :return: None
+        """
+        for span in _spans:
+            buffer = self.__read(span.start, span.size, _stats)
+            for fmt, group in span.groups:
+                # Fused numeric parameters are unpacked with a single call
+                # as long as the buffer covers all of them.
+                if fmt is not None:
+                    position = group[0][1] - span.start
+                    fused = codec.compile_format(fmt)
+                    if position + fused.size <= len(buffer):
+                        unpacked = fused.unpack_from(buffer, position)
+                        for (parameter, _), value in zip(group, unpacked):
+                            _values[parameter.name] = value
+                        continue
 
-    def extract_to_file(self, _output_file):
-        import json
+                for parameter, absolute_offset in group:
+                    _values[parameter.name] = self.__decode(
+                        parameter, buffer, absolute_offset - span.start, _stats)
+            # Release the buffer, which may be a view of the mapped file.
+            buffer = None
+
+    def __decode_array(self, _parameter, _absolute_offset, _count, _stats):
+        """
+        Reads and decodes an array whose number of elements is read from
+        another parameter.
+
+        :param _parameter: The Parameter object of the array.
+        :param _absolute_offset: The absolute offset of the array.
+        :param _count: The value of the parameter holding the number of
+        elements of the array.
+        :param _stats: The Stats object of the extraction.
+        :return: The value of the array or bindex.const.ERROR_VALUE if it
+        could not be decoded.
+        """
+        if not isinstance(_count, int) or isinstance(_count, bool) or _count < 0:
+            logger.error(MSG_ERROR_INVALID_COUNT.format(
+                param=_parameter.name,
+                c=str(_count)))
+            _stats.count(COUNTER_DECODE_ERRORS)
+            return ERROR_VALUE
+        buffer = self.__read(_absolute_offset, _parameter.element_size * _count, _stats)
+        return self.__decode(_parameter, buffer, 0, _stats, _count)
+
+    def __decode(self, _parameter, _buffer, _position, _stats, _count=NO_VALUE):
+        """
+        Decodes the value of a parameter from the buffer of a span.
+
+        :param _parameter: The Parameter object to decode.
+        :param _buffer: The bytes read for the span.
+        :param _position: The position of the parameter within the buffer.
+        :param _stats: The Stats object of the extraction.
+        :param _count: The number of elements of an array whose count is read
+        from another parameter. Can be None.
+        :return: The value of the parameter or bindex.const.ERROR_VALUE if
+        it could not be decoded.
+        """
+        size = _parameter.size
+        if _count is not NO_VALUE:
+            size = _parameter.element_size * _count
+        try:
+            if _position + size > len(_buffer):
+                raise Exception(MSG_ERROR_READ_PARAM.format(
+                    param=str(_parameter)))
+            value = self.__target.decode(_parameter, _buffer, _position, _count)
+            logger.debug("{param:<16s}:{val:s}".format(
+                param=_parameter.name,
+                val=str(value)
+            ))
+        except Exception as e:
+            value = ERROR_VALUE
+            _stats.count(COUNTER_DECODE_ERRORS)
+            logger.error(MSG_ERROR_FAILED_READ_PARAM.format(
+                param=str(_parameter),
+                err=str(e)))
+        return value
+
+    def extract_to_file(self, _output_file, _format=FORMAT_PRETTY):
+        """
+        Extracts the parameters and writes the results to the given file.
+
+        :param _output_file: The path of the output file, or "-" for the
+        standard output.
+        :param _format: The output format, one of bindex.const.OUTPUT_FORMATS.
+        :return: None
+        """
         assert _output_file is not None
         results = self.extract()
 
         if results is not None and len(results) > 0:
-            with open(_output_file, "w") as fp:
-                json.dump(fp, results)
+            with writers.open_output(_output_file, _format) as fp:
+                with writers.new_writer(_format, fp, _single=True) as writer:
+                    writer.write(results)
         else:
-            logging.warning(MSG_ERROR_NO_DATA_EXTRACTED.format(f=self.__target.file))
+            logging.warning(MSG_ERROR_NO_DATA_EXTRACTED.format(f=self.target))
@@ -13,14 +13,17 @@
 import hashlib
 import json
 import logging
+import mmap
 import os
-import re
-import struct
-import unicodedata
+import threading
 
+from bindex import anchor
+from bindex import codec
+from bindex import digest
 from bindex.const import *
 from bindex.parameter import CompatibilityParameter
 from bindex.parameter import Parameter
+from bindex.plan import ExtractionPlan
 
 __author__ = metadata.authors[0]
 __copyright__ = metadata.copyright
@@ -61,6 +64,17 @@ class AbstractFile(object):
         """
         return self.__file
 
+    def relocate(self, _file):
+        """
+        Changes the path of the file encapsulated by the object, e.g. when
+        an object restored from a cache describes a file with identical
+        content at another location.
+        :param _file: The new path of the file.
+        :return: None
+        """
+        assert os.path.isfile(_file)
+        self.__file = _file
+
 
 class DefinitionFile(AbstractFile):
     """
@@ -68,15 +82,21 @@ class DefinitionFile(AbstractFile):
     data about how to extract details from the target file.
     """
 
-    def __init__(self, _file):
+    def __init__(self, _file, _content=None):
         """
         Creates and parses a DefinitionFile object from the given path to a file.
         :param _file: An absolute path to a JSON-formatted file containing the definition.
+        :param _content: The raw content of the file, if it was already read.
+        Can be None.
         """
         super().__init__(_file)
+        self.__content = _content
+        self.__content_hash = NO_VALUE
         self.__meta = {}
         self.__compatibility = {}
         self.__parameters = {}
+        self.__anchors = {}
+        self.__plan = None
 
         self.__load_definition()
 
@@ -132,6 +152,53 @@ class DefinitionFile(AbstractFile):
         """
         return self.__compatibility
 
+    @property
+    def anchors(self):
+        """
+        Returns a dictionary of the anchors searched for in the target file,
+        indexed by name.
+
+        Parameters whose 'relative_to' field holds the name of an anchor are
+        located from the first match of the anchor in the target file.
+
+        :return: A dictionary of Anchor objects.
+        """
+        return self.__anchors
+
+    @property
+    def content_hash(self):
+        """
+        Returns the SHA256 hash of the content of the definition file, as
+        it was when the definition was loaded.
+        :return: The hex digest of the content of the definition file.
+        """
+        return self.__content_hash
+
+    @property
+    def byte_order(self):
+        """
+        Returns the default byte order declared by the definition file.
+
+        The byte order applies to the struct format of every parameter
+        which does not specify its own.
+
+        :return: The default byte order, or None if none was declared.
+        """
+        return self.__meta.get(PARAM_META_BYTE_ORDER, NO_VALUE)
+
+    @property
+    def plan(self):
+        """
+        Returns the extraction plan compiled from the parameters of the
+        definition file.
+
+        The plan is built once when the definition is loaded and holds the
+        absolute offset of every parameter.
+
+        :return: An ExtractionPlan object.
+        """
+        return self.__plan
+
     def related(self, _parameter):
         """
         If the given parameter is related to another parameter, this function will
@@ -161,28 +228,70 @@ class DefinitionFile(AbstractFile):
         assert os.path.isfile(self.file)
         logger.info(MSG_INFO_LOADING_DEF_FILE.format(f=self.file))
 
-        with open(self.file, "r") as fp:
-            # Load the JSON contents of the file.
-            data = json.load(fp)
-
-            # Load the metadata first, if any
-            for meta_item in METADATA:
-                if meta_item in data:
-                    logger.debug("\t{pname:<16s}:{pvalue}".format(
-                        pname=meta_item,
-                        pvalue=data[meta_item]
-                    ))
-                    self.__meta[meta_item] = data[meta_item]
-
-            # Then load the parameters used to check for compatibility
-            # if any
-            if PARAM_COMPATIBILITY_PARAMS in data:
-                self.__load_compatibility_parameters(data)
-
-            # Then load any other remaining paramaters if any and
-            # merge
-            if PARAM_OTHER_PARAMS in data:
-                self.__load_parameters(data)
+        content = self.__content
+        if content is None:
+            with open(self.file, "rb") as fp:
+                content = fp.read()
+        self.__content_hash = hashlib.sha256(content).hexdigest()
+        self.__content = None
+
+        # Load the JSON contents of the file.
+        data = json.loads(content)
+
+        # Load the metadata first, if any
+        for meta_item in METADATA:
+            if meta_item in data:
+                logger.debug("\t{pname:<16s}:{pvalue}".format(
+                    pname=meta_item,
+                    pvalue=data[meta_item]
+                ))
+                self.__meta[meta_item] = data[meta_item]
+
+        # Load the anchors the parameters may be located from, if any
+        if PARAM_ANCHORS in data:
+            self.__load_anchors(data)
+
+        # Then load the parameters used to check for compatibility
+        # if any
+        if PARAM_COMPATIBILITY_PARAMS in data:
+            self.__load_compatibility_parameters(data)
+
+        # Then load any other remaining paramaters if any and
+        # merge
+        if PARAM_OTHER_PARAMS in data:
+            self.__load_parameters(data)
+
+        # Anchors and parameters are referred to by name, so their names
+        # must be distinct.
+        for name in self.__anchors.keys():
+            if name in self.__compatibility or name in self.__parameters:
+                raise Exception(MSG_ERROR_ANCHOR_NAME.format(a=name))
+
+        # Resolve the offsets of all the parameters. This will also
+        # validate the references between the parameters.
+        self.__plan = ExtractionPlan(self)
+
+    def __load_anchors(self, _data):
+        """
+        Loads the anchors searched for in the target file.
+        :param _data: JSON-data read from the definition file.
+        :return: None
+        """
+        assert _data is not None
+        for item in _data[PARAM_ANCHORS]:
+            if PARAM_NAME not in item:
+                raise Exception(MSG_ERROR_INCOMPLETE_PARAM)
+            name = item[PARAM_NAME]
+            if name in self.__anchors:
+                raise Exception(MSG_ERROR_ANCHOR_NAME.format(a=name))
+            self.__anchors[name] = anchor.Anchor(
+                _name=name,
+                _pattern=item.get(PARAM_PATTERN, NO_VALUE),
+                _regex=item.get(PARAM_REGEX, NO_VALUE),
+                _start=item.get(PARAM_START, 0),
+                _end=item.get(PARAM_END, NO_VALUE),
+                _max_size=item.get(PARAM_MAX_SIZE, ANCHOR_DEFAULT_MAX_SIZE)
+            )
 
     def __load_compatibility_parameters(self, _data):
         """
@@ -219,7 +328,8 @@ class DefinitionFile(AbstractFile):
                     _size=psize,
                     _type=ptype,
                     _compatible_with=pcompatible,
-                    _relative_to=prelative
+                    _relative_to=prelative,
+                    _byte_order=self.byte_order
                 )
 
                 # Add the new parameter to the internal dictionary.
@@ -269,6 +379,11 @@ class DefinitionFile(AbstractFile):
                 if PARAM_VALUE in param:
                     pvalue = param[PARAM_VALUE]
 
+                # Get the number of elements of an array, if any
+                pcount = NO_VALUE
+                if PARAM_COUNT in param:
+                    pcount = param[PARAM_COUNT]
+
                 # Create the Parameter object.
                 parameter = Parameter(
                     _name=pname,
@@ -276,7 +391,9 @@ class DefinitionFile(AbstractFile):
                     _size=psize,
                     _type=ptype,
                     _relative_to=prelative,
-                    _value=pvalue
+                    _value=pvalue,
+                    _byte_order=self.byte_order,
+                    _count=pcount
                 )
 
                 self.__parameters[pname] = parameter
@@ -288,27 +405,39 @@ class TargetFile(AbstractFile):
     """
     The TargetFile object encapsulate the binary file from which the program
     will extract data from.
+
+    The file can either be read using positional reads or be mapped into
+    memory. When mapped, parameters are decoded directly from the mapping
+    without copying the bytes read.
+
+    Reads never depend on a shared file position, so a single TargetFile
+    can be read by several threads at once. The file is opened once and
+    stays open until every call to open() has been matched by a call to
+    close(). The object can also be used as a context manager.
     """
 
-    def __init__(self, _file, _base=0x0):
+    def __init__(self, _file, _base=0x0, _use_mmap=False):
         """
         Initializes the TargetFile object using the path to the target
         file.
         :param _file: The absolute path to the binary file to analyze.
-        :param _base: Base address from which the analysis will start.
+        :param _base: Base address from which the analysis will start. The
+        offsets given to the read methods are relative to this address.
+        :param _use_mmap: If True, the file is mapped into memory when opened.
         """
         super().__init__(_file)
-        assert 0 <= _base < self.size()
+        self.__size = os.path.getsize(_file)
+        assert _base == 0 or 0 <= _base < self.__size
         self.__base_offset = _base
-        self.__fp = None
+        self.__use_mmap = _use_mmap
+        self.__fd = None
+        self.__map = None
+        self.__view = None
+        # Number of calls to open() not yet matched by a call to close().
+        self.__users = 0
+        self.__lock = threading.Lock()
 
-        # Build lists of non-printable Unicode characters
-        # Ref. https://stackoverflow.com/questions/92438/stripping-non-printable-characters-from-a-string-in-python
-        # Adapted for Python 3
-        all_chars = (chr(i) for i in range(0x110000))
-        control_chars = ''.join(c for c in all_chars if unicodedata.category(c) == 'Cc')
         self.__remove_non_printable_chars = True
-        self.__re_non_printable_chars = re.compile('[{:s}]'.format(re.escape(control_chars)))
 
     def __repr__(self):
         """
@@ -324,37 +453,120 @@ class TargetFile(AbstractFile):
         """
         return self.file
 
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        self.close()
+
+    @property
+    def is_open(self):
+        """
+        Indicates if the target file is currently open.
+        :return: True if the file is open, False otherwise.
+        """
+        return self.__fd is not None
+
+    @property
+    def is_mapped(self):
+        """
+        Indicates if the target file is currently mapped into memory.
+        :return: True if the file is mapped into memory, False otherwise.
+        """
+        return self.__view is not None
+
     def sha1(self):
         """
         Calculates the SHA1 hash of the file.
         :return: A string with the hex digest of the file.
         """
-        self.open()
-        sha1 = hashlib.sha1()
-        sha1.update(self.__fp.read())
-        self.close()
-        return sha1.hexdigest()
+        return self.digest([HASH_SHA1])[HASH_SHA1]
+
+    def digest(self, _algorithms=DEFAULT_HASHES, _chunk_size=HASH_CHUNK_SIZE):
+        """
+        Calculates the hashes of the file in a single pass.
+
+        The file is hashed in chunks, so the memory used does not depend on
+        the size of the file. If the file is mapped into memory, the mapping
+        is hashed directly, otherwise the file is read through its own
+        handle. In both cases, the method can run in another thread while
+        parameters are being read.
+
+        :param _algorithms: A list of algorithm names, e.g. "sha1" or "sha256".
+        :param _chunk_size: The number of bytes hashed at once.
+        :return: A dictionary of hex digests indexed by algorithm name.
+        """
+        view = self.__view
+        if view is not None:
+            return digest.hash_buffer(view, _algorithms, _chunk_size)
+        return digest.hash_file(self.file, _algorithms, _chunk_size)
 
     def open(self):
         """
-        Opens the target file for reading.
+        Opens the target file for reading. If the object was created
+        with _use_mmap, the file is also mapped into memory.
+
+        Opening a file which is already open does not open it again, but
+        it will only be closed once close() is called as many times.
+
+        :return: None
+        """
+        with self.__lock:
+            self.__users += 1
+            if self.__fd is not None:
+                return
+            fd = os.open(self.file, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            try:
+                self.__size = os.fstat(fd).st_size
+                if self.__use_mmap and self.__size > 0:
+                    self.__map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+                    self.__view = memoryview(self.__map)
+            except Exception:
+                os.close(fd)
+                self.__users -= 1
+                raise
+            self.__fd = fd
+
+    @property
+    def base(self):
+        """
+        Returns the base address from which the analysis starts.
+        :return: The offset in the file of the offsets given to the reads.
+        """
+        return self.__base_offset
+
+    def rebase(self, _base):
+        """
+        Changes the base address from which the analysis starts, without
+        opening the file again, e.g. to extract every occurrence of a
+        structure found in a memory dump. The base must not be changed
+        while the file is being read by other threads.
+
+        :param _base: The new base address.
         :return: None
         """
-        self.__fp = open(self.file, "rb")
+        assert _base == 0 or 0 <= _base < self.__size
+        self.__base_offset = _base
 
     def size(self):
         """
         Returns the size of the file in bytes.
+
+        The size is retrieved when the object is created and refreshed
+        every time the file is opened.
+
         :return: The size of the file in bytes.
         """
-        return os.path.getsize(self.file)
+        return self.__size
 
     def read(self, _parameter, _absolute_offset=None):
         """
         Reads the given parameter from the target file.
 
         :param _parameter: A Parameter object
-        :param _absolute_offset The absolute offset of the parameter in the file.
+        :param _absolute_offset The absolute offset of the parameter, from
+        the base address.
         :return: The value read from the file.
         """
         assert isinstance(_parameter, Parameter)
@@ -363,7 +575,7 @@ class TargetFile(AbstractFile):
             offset = _parameter.offset
         size = _parameter.size
         # Reads the value using the offset and size of the parameter.
-        value = self.__read_at(offset, size)
+        value = self.__read_at(self.__base_offset + offset, size)
 
         # Converts the bytes read to the proper type. If the value
         # is None, we assume an error occurred.
@@ -372,37 +584,305 @@ class TargetFile(AbstractFile):
                 param=str(_parameter)
             ))
         else:
-            # Convert string values
-            if _parameter.type in TYPE_STRING:
-                value = value.decode(_parameter.type).strip()
-                if self.__remove_non_printable_chars:
-                    value = self.__re_non_printable_chars.sub('', value)
-            # Convert numeric values.
-            else:
-                value = struct.unpack(_parameter.type, value)[0]
+            value = self.decode(_parameter, value)
 
         return value
 
+    def read_span(self, _offset, _size):
+        """
+        Reads a contiguous range of bytes from the target file with a
+        single read call.
+
+        The range is truncated if it extends past the end of the file.
+
+        :param _offset: The starting position to read, from the base address.
+        :param _size: The number of bytes to read.
+        :return: The bytes read from the file, or a memoryview of the mapping
+        if the file is mapped into memory.
+        """
+        assert _offset >= 0 and _size >= 0
+        offset = self.__base_offset + _offset
+        if offset >= self.__size:
+            return b''
+        return self.__read_at(offset, min(_size, self.__size - offset))
+
+    def scan(self, _anchors, _window=ANCHOR_SCAN_WINDOW):
+        """
+        Searches for the first match of each of the given anchors in the
+        target file, in a single pass.
+
+        The file is searched through its mapping. If the object was not
+        created with _use_mmap, the file is mapped for the duration of the
+        scan only, so the file is never read into memory. The file is
+        searched from the base address, and the offsets are relative to it.
+
+        :param _anchors: A list of Anchor objects.
+        :param _window: The number of bytes searched at once.
+        :return: A dictionary of the offsets of the anchors, indexed by name.
+        The offset of an anchor which was not found is None.
+        """
+        if self.__fd is None:
+            # Open the file for the duration of the scan only.
+            with self:
+                return self.scan(_anchors, _window)
+        if self.__map is not None:
+            return anchor.scan(self.__map, _anchors, _window, self.__base_offset)
+        if self.__size == 0:
+            return anchor.scan(b'', _anchors, _window)
+        with mmap.mmap(self.__fd, 0, access=mmap.ACCESS_READ) as mapping:
+            return anchor.scan(mapping, _anchors, _window, self.__base_offset)
+
+    def decode(self, _parameter, _buffer, _position=0, _count=NO_VALUE):
+        """
+        Converts the bytes of the given parameter to its value.
+
+        The buffer can be any object supporting the buffer protocol, such as
+        bytes or a memoryview of the mapped file. No copy of the buffer is
+        made to decode numeric values.
+
+        :param _parameter: A Parameter object
+        :param _buffer: The buffer containing the bytes of the parameter.
+        :param _position: The position of the parameter within the buffer.
+        :param _count: The number of elements of an array whose count is read
+        from another parameter. Can be None.
+        :return: The value of the parameter.
+        """
+        return codec.decode(
+            _parameter,
+            _buffer,
+            _position,
+            self.__remove_non_printable_chars,
+            _count)
+
     def __read_at(self, _offset, _size):
         """
         Reads bytes from the target file.
+
+        If the file is mapped into memory, a memoryview of the mapping is
+        returned instead of a copy of the bytes. A file which is not open is
+        opened for the duration of the read only.
+
         :param _offset: The starting position to read.
         :param _size: The number of bytes to read
         :return: The bytes read from the file.
         """
-        assert 0 <= _offset + _size <= self.size()
+        assert 0 <= _offset + _size <= self.__size
+
+        if self.__fd is None:
+            # Open the file for the duration of the read only. The bytes are
+            # copied since the mapping is released when the file is closed.
+            with self:
+                return bytes(self.__read_at(_offset, _size))
+
+        view = self.__view
+        if view is not None:
+            return view[_offset:_offset + _size]
+
+        chunks = []
+        while _size > 0:
+            chunk = self.__pread(_size, _offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            _offset += len(chunk)
+            _size -= len(chunk)
+        if len(chunks) == 1:
+            return chunks[0]
+        return b''.join(chunks)
+
+    if hasattr(os, "pread"):
+        def __pread(self, _size, _offset):
+            """
+            Reads bytes at the given position without moving the position of
+            the file descriptor.
+
+            :param _size: The number of bytes to read.
+            :param _offset: The starting position to read.
+            :return: The bytes read, possibly fewer than requested.
+            """
+            return os.pread(self.__fd, _size, _offset)
+    else:
+        def __pread(self, _size, _offset):
+            """
+            Reads bytes at the given position. Without os.pread, e.g. on
+            Windows, the seek and the read are done under a lock.
+
+            :param _size: The number of bytes to read.
+            :param _offset: The starting position to read.
+            :return: The bytes read, possibly fewer than requested.
+            """
+            with self.__lock:
+                os.lseek(self.__fd, _offset, os.SEEK_SET)
+                return os.read(self.__fd, _size)
 
-        if self.__fp is None:
-            self.open()
+    def close(self):
+        """
+        Closes the file once every call to open() has been matched by a call
+        to close(). Closing a file which is not open does nothing.
 
-        self.__fp.seek(_offset)
-        b = self.__fp.read(_size)
-        return b
+        :return: None
+        """
+        with self.__lock:
+            if self.__fd is None:
+                return
+            self.__users -= 1
+            if self.__users > 0:
+                return
+            self.__users = 0
+            if self.__view is not None:
+                self.__view.release()
+                self.__view = None
+            if self.__map is not None:
+                self.__map.close()
+                self.__map = None
+            os.close(self.__fd)
+            self.__fd = None
+
+
+class StreamFile(object):
+    """
+    The StreamFile object encapsulates a non-seekable binary stream, such as
+    the standard input or a pipe, from which data is read front to back.
 
-    def close(self):
+    Bytes which are skipped are read in bounded chunks and discarded, so the
+    memory used does not depend on the distance skipped. Every byte consumed
+    can also be fed to hash objects.
+    """
+
+    def __init__(self, _stream, _name=STANDARD_STREAM, _hashes=None):
+        """
+        Initializes the StreamFile object.
+
+        :param _stream: A binary file object open for reading.
+        :param _name: The name identifying the stream in the results.
+        :param _hashes: The hash algorithms to compute over the bytes of the
+        stream. Can be None.
+        """
+        assert _stream is not None
+        self.__stream = _stream
+        self.__name = _name
+        self.__position = 0
+        self.__digests = digest.new_digests(_hashes or [])
+        # Bytes of the last range read, up to the current position.
+        self.__last = b''
+        self.__last_offset = 0
+
+    def __repr__(self):
+        """
+        Returns a string representation of the object.
+        :return: A string representation of the object.
+        """
+        return STREAM_FILE_REPR.format(f=self.__name)
+
+    def __str__(self):
+        """
+        Returns the name of the stream.
+        :return: The name of the stream.
+        """
+        return self.__name
+
+    @property
+    def position(self):
+        """
+        Returns the number of bytes consumed from the stream.
+        :return: The current position in the stream.
+        """
+        return self.__position
+
+    def read(self, _size):
+        """
+        Reads the given number of bytes from the stream. Fewer bytes are
+        returned only if the end of the stream is reached.
+
+        :param _size: The number of bytes to read.
+        :return: The bytes read.
+        """
+        assert _size >= 0
+        chunks = []
+        remaining = _size
+        while remaining > 0:
+            chunk = self.__stream.read(remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        data = b''.join(chunks)
+        self.__consume(data)
+        return data
+
+    def read_at(self, _offset, _size):
+        """
+        Reads the given range of bytes of the stream.
+
+        Ranges must be requested by increasing offset, and the stream must
+        not be read by other means in between. A range may overlap the
+        previous one, in which case the bytes already consumed are taken
+        from the previous range instead of the stream.
+
+        :param _offset: The offset of the first byte to read.
+        :param _size: The number of bytes to read.
+        :return: The bytes read, fewer than requested if the end of the
+        stream is reached.
+        """
+        assert _offset >= self.__last_offset
+        end = _offset + _size
+        if _offset >= self.__position:
+            self.skip(_offset - self.__position)
+            data = self.read(_size)
+        elif end <= self.__position:
+            start = _offset - self.__last_offset
+            return self.__last[start:start + _size]
+        else:
+            data = self.__last[_offset - self.__last_offset:] + self.read(end - self.__position)
+        self.__last = data
+        self.__last_offset = _offset
+        return data
+
+    def skip(self, _size):
+        """
+        Consumes and discards the given number of bytes.
+
+        :param _size: The number of bytes to skip.
+        :return: The number of bytes actually skipped.
+        """
+        assert _size >= 0
+        skipped = 0
+        while skipped < _size:
+            chunk = self.__stream.read(min(HASH_CHUNK_SIZE, _size - skipped))
+            if not chunk:
+                break
+            self.__consume(chunk)
+            skipped += len(chunk)
+        return skipped
+
+    def drain(self):
+        """
+        Consumes the remainder of the stream, e.g. to complete its hashes.
+        Nothing is read if no hash is computed.
+
+        :return: None
+        """
+        if len(self.__digests) == 0:
+            return
+        while True:
+            chunk = self.__stream.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            self.__consume(chunk)
+
+    def hexdigests(self):
+        """
+        Returns the hashes of the bytes consumed so far.
+        :return: A dictionary of hex digests indexed by algorithm name.
+        """
+        return {name: d.hexdigest() for name, d in self.__digests.items()}
+
+    def __consume(self, _data):
         """
-        Closes the file if it was opened.
+        Accounts for bytes consumed from the stream.
+        :param _data: The bytes consumed.
         :return: None
         """
-        if self.__fp is not None:
-            self.__fp.close()
+        self.__position += len(_data)
+        for d in self.__digests.values():
+            d.update(_data)
@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.index
+    ~~~~~~~~~~~~~
+
+    The index module stores the results of the extraction of many target
+    files in a SQLite database, so they can be filtered and aggregated
+    without extracting the target files again.
+
+    Each target file is a row of the database and each parameter a column,
+    whose type is derived from the definition: integers, reals, text and
+    bytes are stored as such and indexed, while arrays and parameters
+    producing several values are stored as JSON text. Queries on the value
+    of a parameter therefore use its index instead of reading every row.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+
+from bindex import codec
+from bindex import predicate
+from bindex import writers
+from bindex.const import *
+from bindex.files import DefinitionFile
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+logger = logging.getLogger(__name__)
+
+
+def quote(_name):
+    """
+    Quotes an identifier of the database.
+
+    :param _name: The name of a column, index or table.
+    :return: The quoted identifier.
+    """
+    return '"{n:s}"'.format(n=_name.replace('"', '""'))
+
+
+def column_type(_parameter):
+    """
+    Returns the type of the column storing the values of a parameter.
+
+    :param _parameter: A Parameter object.
+    :return: One of INDEX_INTEGER, INDEX_REAL, INDEX_TEXT, INDEX_BLOB or
+    INDEX_JSON.
+    """
+    if _parameter.is_array:
+        return INDEX_JSON
+    if _parameter.is_string:
+        return INDEX_TEXT
+    compiled = _parameter.codec
+    if codec.value_count(compiled) != 1:
+        return INDEX_JSON
+    code = compiled.format[-1:]
+    if code in "efd":
+        return INDEX_REAL
+    if code in "spc":
+        return INDEX_BLOB
+    return INDEX_INTEGER
+
+
+def value_type(_value):
+    """
+    Returns the type of the column able to store the given value, for
+    parameters which are not described by a definition.
+
+    :param _value: A value extracted from a target file.
+    :return: One of INDEX_INTEGER, INDEX_REAL, INDEX_TEXT, INDEX_BLOB or
+    INDEX_JSON.
+    """
+    if isinstance(_value, (bool, int)):
+        return INDEX_INTEGER
+    if isinstance(_value, float):
+        return INDEX_REAL
+    if isinstance(_value, str):
+        return INDEX_TEXT
+    if isinstance(_value, bytes):
+        return INDEX_BLOB
+    return INDEX_JSON
+
+
+class ResultIndex(object):
+    """
+    The ResultIndex object stores the results of extractions in a SQLite
+    database with a column per parameter, and queries them.
+
+    Rows are keyed by the absolute path of the target file, so indexing a
+    target file again replaces its row. Values which could not be decoded
+    are stored as NULL.
+    """
+
+    def __init__(self, _file=INDEX_DEFAULT_FILE):
+        """
+        Opens the index stored in the given file, creating it if needed.
+
+        :param _file: The path of the SQLite database.
+        """
+        self.__file = _file
+        self.__pending = 0
+        self.__db = sqlite3.connect(_file)
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        self.__db.execute("PRAGMA synchronous=NORMAL")
+        self.__db.execute(
+            "CREATE TABLE IF NOT EXISTS results ({c:s} TEXT PRIMARY KEY, {m:s}, {e:s} TEXT)".format(
+                c=quote(PARAM_ORIGINAL_FILE),
+                m=", ".join(quote(f) + " TEXT" for f in INDEX_META_FIELDS[1:]),
+                e=quote(PARAM_ERROR)))
+        self.__db.execute(
+            "CREATE TABLE IF NOT EXISTS columns (name TEXT PRIMARY KEY, type TEXT NOT NULL)")
+        self.__db.commit()
+        # Types of the parameter columns, in the order they were created.
+        self.__columns = dict(self.__db.execute("SELECT name, type FROM columns ORDER BY rowid"))
+
+    def __repr__(self):
+        """
+        Returns a string representation of the ResultIndex object.
+        :return: A string representation of the ResultIndex object.
+        """
+        return RESULT_INDEX_REPR.format(f=self.__file, nc=len(self.__columns))
+
+    def __len__(self):
+        """
+        Returns the number of target files in the index.
+        :return: The number of rows of the index.
+        """
+        return self.__db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        self.close()
+
+    @property
+    def file(self):
+        """
+        Returns the path of the database.
+        :return: The path of the database.
+        """
+        return self.__file
+
+    @property
+    def columns(self):
+        """
+        Returns the type of the column of each parameter.
+        :return: A dictionary of column types indexed by parameter name.
+        """
+        return dict(self.__columns)
+
+    def add_definition(self, _definition):
+        """
+        Creates the typed and indexed columns of the parameters of a
+        definition. Parameters which already have a column are left as is.
+
+        :param _definition: A DefinitionFile or DefinitionRegistry object.
+        :return: None
+        """
+        definitions = [_definition] if isinstance(_definition, DefinitionFile) \
+            else _definition.definitions
+        for definition in definitions:
+            parameters = list(definition.compatibility.items()) + list(definition.parameters.items())
+            for name, parameter in parameters:
+                if name not in self.__columns:
+                    self.__add_column(name, column_type(parameter))
+
+    def add(self, _result):
+        """
+        Stores the result of the extraction of a target file, replacing its
+        previous result. The values of the compatibility parameters are
+        stored along with the other parameters, and returned with them by
+        ResultIndex.query. Columns are created for the parameters which do
+        not have one yet.
+
+        :param _result: The result dictionary of an extraction, or the error
+        record of a failed extraction.
+        :return: None
+        """
+        meta = _result.get(PARAM_METADATA, {})
+        values = dict(_result.get(PARAM_COMPATIBILITY_PARAMS, {}))
+        values.update(_result.get(PARAM_OTHER_PARAMS, {}))
+        for name, value in values.items():
+            if name not in self.__columns and value is not NO_VALUE and value != ERROR_VALUE:
+                self.__add_column(name, value_type(value))
+
+        names = [n for n in values if n in self.__columns]
+        row = [os.path.abspath(meta[PARAM_ORIGINAL_FILE])]
+        row.extend(meta.get(f, NO_VALUE) for f in INDEX_META_FIELDS[1:])
+        row.append(_result.get(PARAM_ERROR, NO_VALUE))
+        row.extend(self.__store(self.__columns[n], values[n], n, row[0]) for n in names)
+        columns = INDEX_META_FIELDS + [PARAM_ERROR] + [INDEX_COLUMN_PREFIX + n for n in names]
+        self.__db.execute("INSERT OR REPLACE INTO results ({c:s}) VALUES ({v:s})".format(
+            c=", ".join(quote(c) for c in columns),
+            v=", ".join("?" for _ in columns)), row)
+
+        self.__pending += 1
+        if self.__pending >= INDEX_COMMIT_INTERVAL:
+            self.commit()
+
+    def query(self, _where=NO_VALUE, _fields=NO_VALUE, _limit=NO_VALUE):
+        """
+        Returns the results matching a predicate, in the order of the paths
+        of the target files.
+
+        :param _where: A predicate, as a string or a Predicate object. Can be
+        None to return every result.
+        :param _fields: The list of the names of the parameters to return.
+        Can be None to return every parameter.
+        :param _limit: The maximum number of results. Can be None.
+        :return: A generator of result dictionaries. Parameters which were
+        not extracted from a target file are omitted from its result.
+        """
+        names = list(self.__columns) if _fields is NO_VALUE else list(_fields)
+        columns = [quote(f) for f in INDEX_META_FIELDS + [PARAM_ERROR]]
+        columns.extend(self.__column(n) for n in names)
+        where, parameters = self.__where(_where)
+        sql = "SELECT {c:s} FROM results{w:s} ORDER BY {t:s}".format(
+            c=", ".join(columns), w=where, t=quote(PARAM_ORIGINAL_FILE))
+        if _limit is not NO_VALUE:
+            sql += " LIMIT ?"
+            parameters.append(_limit)
+
+        for row in self.__db.execute(sql, parameters):
+            meta = {f: v for f, v in zip(INDEX_META_FIELDS, row) if v is not NO_VALUE}
+            result = {PARAM_METADATA: meta}
+            error = row[len(INDEX_META_FIELDS)]
+            if error is not NO_VALUE:
+                result[PARAM_ERROR] = error
+            else:
+                values = row[len(INDEX_META_FIELDS) + 1:]
+                result[PARAM_OTHER_PARAMS] = {
+                    n: self.__load(n, v) for n, v in zip(names, values) if v is not NO_VALUE}
+            yield result
+
+    def aggregate(self, _aggregates, _where=NO_VALUE, _group_by=NO_VALUE):
+        """
+        Computes aggregates over the results matching a predicate.
+
+        :param _aggregates: A list of aggregates, either "count" or a
+        function applied to a field, such as "max(TestParam1)". The
+        functions are listed in bindex.const.INDEX_AGGREGATES.
+        :param _where: A predicate, as a string or a Predicate object. Can be
+        None to aggregate every result.
+        :param _group_by: The name of the field whose distinct values define
+        the groups. Can be None to aggregate all the results together.
+        :return: A list of dictionaries, one per group, holding the value of
+        the grouping field and of each aggregate, indexed by their text.
+        """
+        expressions = []
+        for aggregate in _aggregates:
+            match = re.match(r"^\s*(\w+)\s*(?:\(\s*(.*?)\s*\))?\s*$", aggregate)
+            function = match.group(1).lower() if match is not None else NO_VALUE
+            if function == INDEX_COUNT and not match.group(2):
+                expressions.append("COUNT(*)")
+            elif function in INDEX_AGGREGATES and match.group(2):
+                expressions.append("{f:s}({c:s})".format(
+                    f=function.upper(), c=self.__column(match.group(2).strip("`"))))
+            else:
+                raise Exception(MSG_ERROR_INDEX_AGGREGATE.format(
+                    a=aggregate, fn=", ".join(INDEX_AGGREGATES)))
+
+        where, parameters = self.__where(_where)
+        if _group_by is NO_VALUE:
+            sql = "SELECT {e:s} FROM results{w:s}".format(e=", ".join(expressions), w=where)
+            keys = list(_aggregates)
+        else:
+            group = self.__column(_group_by)
+            sql = "SELECT {g:s}, {e:s} FROM results{w:s} GROUP BY {g:s} ORDER BY {g:s}".format(
+                g=group, e=", ".join(expressions), w=where)
+            keys = [_group_by] + list(_aggregates)
+        return [dict(zip(keys, row)) for row in self.__db.execute(sql, parameters)]
+
+    def count(self, _where=NO_VALUE):
+        """
+        Returns the number of results matching a predicate.
+
+        :param _where: A predicate, as a string or a Predicate object. Can be
+        None to count every result.
+        :return: The number of matching results.
+        """
+        return self.aggregate([INDEX_COUNT], _where)[0][INDEX_COUNT]
+
+    def commit(self):
+        """
+        Writes the pending changes to the database.
+        :return: None
+        """
+        self.__db.commit()
+        self.__pending = 0
+
+    def close(self):
+        """
+        Writes the pending changes and closes the database.
+        :return: None
+        """
+        if self.__db is not None:
+            self.commit()
+            self.__db.close()
+            self.__db = None
+
+    def __add_column(self, _name, _type):
+        """
+        Adds the column of a parameter and indexes it, unless it holds JSON.
+
+        :param _name: The name of the parameter.
+        :param _type: The type of the column.
+        :return: None
+        """
+        column = INDEX_COLUMN_PREFIX + _name
+        # JSON is stored as text, without the numeric affinity SQLite gives
+        # to unknown types.
+        self.__db.execute("ALTER TABLE results ADD COLUMN {c:s} {t:s}".format(
+            c=quote(column), t=INDEX_TEXT if _type == INDEX_JSON else _type))
+        if _type != INDEX_JSON:
+            self.__db.execute("CREATE INDEX IF NOT EXISTS {i:s} ON results ({c:s})".format(
+                i=quote(INDEX_NAME.format(c=column)), c=quote(column)))
+        self.__db.execute("INSERT INTO columns VALUES (?, ?)", (_name, _type))
+        self.__columns[_name] = _type
+
+    def __column(self, _field):
+        """
+        Returns the quoted column of a field. Metadata fields are prefixed
+        with "meta.", e.g. "meta.sha1".
+
+        :param _field: The name of a parameter or of a metadata field.
+        :return: The quoted name of the column.
+        """
+        if _field in self.__columns:
+            return quote(INDEX_COLUMN_PREFIX + _field)
+        prefix = PARAM_METADATA + "."
+        if _field.startswith(prefix) and _field[len(prefix):] in INDEX_META_FIELDS:
+            return quote(_field[len(prefix):])
+        if _field == PARAM_ERROR:
+            return quote(PARAM_ERROR)
+        raise Exception(MSG_ERROR_INDEX_FIELD.format(f=_field))
+
+    def __where(self, _where):
+        """
+        Translates a predicate into a WHERE clause.
+
+        :param _where: A predicate, as a string or a Predicate object. Can be
+        None.
+        :return: A (WHERE clause, list of parameters) tuple.
+        """
+        if _where is NO_VALUE:
+            return EMPTY_STRING, []
+        if isinstance(_where, str):
+            _where = predicate.parse(_where)
+        sql, parameters = _where.to_sql(self.__column)
+        return " WHERE " + sql, parameters
+
+    def __load(self, _name, _value):
+        """
+        Converts the value of a column back to the value of a parameter.
+
+        :param _name: The name of the parameter.
+        :param _value: The value of the column.
+        :return: The value of the parameter.
+        """
+        if self.__columns[_name] == INDEX_JSON and isinstance(_value, str):
+            return json.loads(_value)
+        return _value
+
+    @staticmethod
+    def __store(_type, _value, _name, _target):
+        """
+        Converts the value of a parameter to the value of its column.
+
+        :param _type: The type of the column.
+        :param _value: The value of the parameter.
+        :param _name: The name of the parameter.
+        :param _target: The path of the target file.
+        :return: The value of the column.
+        """
+        if _value is NO_VALUE or (isinstance(_value, str) and _value == ERROR_VALUE):
+            return NO_VALUE
+        if _type == INDEX_JSON or isinstance(_value, (list, tuple, dict)):
+            return writers.dumps(_value)
+        if isinstance(_value, int) and not -INDEX_MAX_INTEGER - 1 <= _value <= INDEX_MAX_INTEGER:
+            # SQLite integers are signed 64-bit values. Storing them as REAL
+            # would lose precision, and as TEXT would not compare as numbers.
+            logger.warning(MSG_WARNING_INDEX_INTEGER.format(p=_name, f=_target, v=_value))
+            return NO_VALUE
+        return _value
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.lazy
+    ~~~~~~~~~~~~~
+
+    The lazy module contains the read-only mapping returned by
+    Extractor.lazy_values(). The values of the parameters are only read and
+    decoded when they are first accessed, and then kept, so tools looking at
+    a few parameters of large definitions do not pay for the others.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import collections.abc
+import logging
+
+from bindex.const import *
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+logger = logging.getLogger(__name__)
+
+
+class LazyValues(collections.abc.Mapping):
+    """
+    The LazyValues object maps the names of the parameters to their values,
+    reading and decoding each value on its first access.
+
+    The target file stays open until the object is closed, either explicitly,
+    at the end of a with statement or when the object is garbage collected.
+    Values which were already decoded remain available once it is closed.
+    """
+
+    def __init__(self, _names, _load, _close):
+        """
+        Initializes the LazyValues object.
+
+        :param _names: The names of the parameters of the mapping, in the
+        order of the definition file.
+        :param _load: A function reading and decoding a parameter, given its
+        name and a function returning the value of another parameter.
+        :param _close: A function releasing the target file.
+        """
+        self.__close = _close
+        self.__names = list(_names)
+        self.__keys = frozenset(self.__names)
+        self.__load = _load
+        self.__values = {}
+
+    def __repr__(self):
+        """
+        Returns a string representation of the LazyValues object.
+        :return: A string representation of the LazyValues object.
+        """
+        return LAZY_VALUES_REPR.format(
+            np=len(self.__names),
+            nd=len([n for n in self.__names if n in self.__values]),
+            c=str(self.closed)
+        )
+
+    def __getitem__(self, _name):
+        if _name not in self.__keys:
+            raise KeyError(_name)
+        return self.resolve(_name)
+
+    def __iter__(self):
+        return iter(self.__names)
+
+    def __len__(self):
+        return len(self.__names)
+
+    def __contains__(self, _name):
+        return _name in self.__keys
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    @property
+    def closed(self):
+        """
+        Indicates if the target file was released.
+        :return: True if the object is closed, False otherwise.
+        """
+        return self.__close is None
+
+    @property
+    def decoded(self):
+        """
+        Returns the values decoded so far.
+        :return: A dictionary of values indexed by the name of the parameters.
+        """
+        return {n: self.__values[n] for n in self.__names if n in self.__values}
+
+    def close(self):
+        """
+        Releases the target file. Closing the object more than once does
+        nothing.
+
+        :return: None
+        """
+        close = self.__close
+        if close is not None:
+            self.__close = None
+            close()
+
+    def resolve(self, _name):
+        """
+        Returns the value of a parameter of the definition file, reading and
+        decoding it first if needed. The parameter does not have to be part
+        of the mapping, e.g. the count of an array or a parameter compared
+        by a filter predicate.
+
+        :param _name: The name of the parameter.
+        :return: The value of the parameter, or bindex.const.ERROR_VALUE if
+        it could not be decoded.
+        """
+        if _name not in self.__values:
+            if self.__close is None:
+                raise Exception(MSG_ERROR_LAZY_CLOSED.format(param=_name))
+            self.__values[_name] = self.__load(_name, self.resolve)
+        return self.__values[_name]
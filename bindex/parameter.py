@@ -13,6 +13,7 @@
 """
 import json
 
+from bindex import codec
 from bindex.const import *
 
 __author__ = metadata.authors[0]
@@ -32,30 +33,49 @@ class Parameter(object):
     from the given file.
     """
 
-    def __init__(self, _name, _offset, _size, _type, _relative_to=NO_VALUE, _value=NO_VALUE):
+    def __init__(self, _name, _offset, _size, _type, _relative_to=NO_VALUE, _value=NO_VALUE,
+                 _byte_order=NO_VALUE, _count=NO_VALUE):
         """
         Initializes a new Parameter object using the provided parameters.
 
         :param _name: The name of the parameter.
         :param _offset: The absolute or relative address of the parameter in the
         targeted file.
-        :param _size: The number of bytes to read in the target file.
+        :param _size: The number of bytes to read in the target file. For an
+        array, the number of bytes of each element.
         :param _relative_to: The name of the parameter from which the given offset
         is calculated. Can be None.
         :param _value: The initial value of the parameter. Can be None.
         :param _type: The string encoding or struct format to use when unpacking
         the bytes of the parameter.
+        :param _byte_order: The byte order applied to the struct format if it
+        does not specify one. Can be None.
+        :param _count: The number of elements of an array parameter, or the
+        name of the parameter holding it. Can be None.
         """
         assert _name is not None and len(_name.strip()) > 0
         assert _size > 0
         assert isinstance(_offset, int) and _offset >= 0
 
+        if _count is not NO_VALUE:
+            if isinstance(_count, bool) or \
+                    not isinstance(_count, (int, str)) or \
+                    (isinstance(_count, int) and _count < 0) or \
+                    (isinstance(_count, str) and len(_count.strip()) == 0):
+                raise Exception(MSG_ERROR_INVALID_COUNT.format(
+                    param=_name,
+                    c=str(_count)))
+
         self.__name = _name
         self.__offset = _offset
         self.__relative_to = _relative_to
         self.__size = _size
+        self.__count = _count
         self.update(_value)
         self.__type = _type
+        self.__byte_order = _byte_order
+        # Validate the byte order, even for string parameters.
+        codec.byte_order_prefix(_byte_order)
 
     def __repr__(self):
         """
@@ -84,7 +104,7 @@ class Parameter(object):
             sz=self.size,
             off=self.offset,
             type=self.type,
-            rn=self.relative_to
+            rn=str(self.relative_to)
         )
         return s
 
@@ -100,10 +120,54 @@ class Parameter(object):
     def size(self):
         """
         Returns the size in bytes of the parameter.
+
+        The size of an array with a fixed number of elements covers all of
+        its elements. The size of an array whose number of elements is read
+        from another parameter is only known when extracting, so the size of
+        a single element is returned instead.
+
         :return: The size in bytes of the parameter.
         """
+        if isinstance(self.__count, int):
+            return self.__size * self.__count
         return self.__size
 
+    @property
+    def element_size(self):
+        """
+        Returns the size in bytes of each element of an array parameter, or
+        the size of the parameter if it is not an array.
+        :return: The size in bytes of an element.
+        """
+        return self.__size
+
+    @property
+    def count(self):
+        """
+        Returns the number of elements of an array parameter.
+        :return: The number of elements, the name of the parameter holding
+        it, or None if the parameter is not an array.
+        """
+        return self.__count
+
+    @property
+    def is_array(self):
+        """
+        Indicates if the parameter is an array, whose value is a list.
+        :return: True if the parameter is an array, False otherwise.
+        """
+        return self.__count is not NO_VALUE
+
+    @property
+    def has_dynamic_count(self):
+        """
+        Indicates if the number of elements of the array is read from
+        another parameter of the target file.
+        :return: True if the number of elements is only known when
+        extracting, False otherwise.
+        """
+        return isinstance(self.__count, str)
+
     @property
     def offset(self):
         """
@@ -127,6 +191,37 @@ class Parameter(object):
         """
         return self.__type
 
+    @property
+    def byte_order(self):
+        """
+        Returns the byte order applied to the struct format of the parameter
+        if the format does not specify its own.
+        :return: The byte order of the parameter, or None.
+        """
+        return self.__byte_order
+
+    @property
+    def is_string(self):
+        """
+        Indicates if the parameter is decoded as a string.
+        :return: True if the type of the parameter is a string encoding,
+        False if it is a struct format.
+        """
+        return self.__type in TYPE_STRING
+
+    @property
+    def codec(self):
+        """
+        Returns the compiled struct.Struct used to unpack the parameter.
+
+        The Struct is compiled once per format for the whole process.
+
+        :return: A struct.Struct object, or None for string parameters.
+        """
+        if self.is_string:
+            return None
+        return codec.compile_format(self.__type, self.__byte_order)
+
     @property
     def relative_to(self):
         """
@@ -164,7 +259,8 @@ class CompatibilityParameter(Parameter):
     target file.
     """
 
-    def __init__(self, _name, _offset, _size, _type, _compatible_with, _relative_to=NO_VALUE, _value=NO_VALUE):
+    def __init__(self, _name, _offset, _size, _type, _compatible_with, _relative_to=NO_VALUE, _value=NO_VALUE,
+                 _byte_order=NO_VALUE):
         """
         Initializes a new Parameter object using the provided parameters.
 
@@ -178,6 +274,8 @@ class CompatibilityParameter(Parameter):
         :param _value: The initial value of the parameter. Can be None.
         :param _type: The string encoding or struct format to use when unpacking
         the bytes of the parameter.
+        :param _byte_order: The byte order applied to the struct format if it
+        does not specify one. Can be None.
         """
         super().__init__(
             _name=_name,
@@ -185,10 +283,18 @@ class CompatibilityParameter(Parameter):
             _size=_size,
             _type=_type,
             _relative_to=_relative_to,
-            _value=_value
+            _value=_value,
+            _byte_order=_byte_order
         )
         assert _compatible_with is not None
         self.__compatible_with = _compatible_with
+        # Compatible values are looked up in a hashed set. Lists of
+        # unhashable values fall back to a linear search.
+        try:
+            self.__compatible_set = frozenset(_compatible_with)
+        except TypeError:
+            self.__compatible_set = _compatible_with
+        self.__compatible_bytes = self.__encode_compatible_values()
 
     @property
     def compatible_with_list(self):
@@ -205,7 +311,72 @@ class CompatibilityParameter(Parameter):
         :return: True if the value is in the list of compatible values,
         False otherwise.
         """
-        return _value in self.__compatible_with
+        return _value in self.__compatible_set
+
+    @property
+    def compatible_bytes(self):
+        """
+        Returns the raw bytes of the compatible values, if the parameter can
+        be verified without decoding the bytes read from the target file.
+
+        :return: A frozenset of bytes objects of the size of the parameter,
+        or None if the raw bytes cannot be compared.
+        """
+        return self.__compatible_bytes
+
+    def is_compatible_raw(self, _buffer):
+        """
+        Verifies if the raw bytes of the parameter are compatible, without
+        decoding them. Only available if compatible_bytes is not None.
+
+        :param _buffer: The bytes of the parameter read from the target file.
+        :return: True if the bytes are the encoding of a compatible value,
+        False otherwise.
+        """
+        assert self.__compatible_bytes is not None
+        return bytes(_buffer) in self.__compatible_bytes
+
+    def __encode_compatible_values(self):
+        """
+        Encodes the compatible values into the raw bytes expected in the
+        target file.
+
+        Comparing raw bytes is equivalent to comparing the decoded values
+        only when every value has a single encoding of exactly the size of
+        the parameter: ASCII and UTF-8 strings which are not altered by the
+        cleanup of decoded strings, and integer formats.
+
+        :return: A frozenset of bytes objects, or None if the raw bytes
+        cannot be compared.
+        """
+        encoded = set()
+        if self.type in RAW_COMPATIBLE_ENCODINGS:
+            for value in self.__compatible_with:
+                if not isinstance(value, str):
+                    return None
+                raw = value.encode(self.type)
+                if len(raw) != self.size or codec.decode_string(raw, self.type) != value:
+                    return None
+                encoded.add(raw)
+        elif not self.is_string:
+            try:
+                compiled = self.codec
+            except Exception:
+                return None
+            if compiled.format[-1:] not in RAW_COMPATIBLE_FORMATS or \
+                    codec.value_count(compiled) != 1 or compiled.size != self.size:
+                return None
+            for value in self.__compatible_with:
+                if not isinstance(value, int) or isinstance(value, bool):
+                    return None
+                try:
+                    encoded.add(compiled.pack(value))
+                except Exception:
+                    # The value can never be read from the target file.
+                    continue
+        else:
+            return None
+        return frozenset(encoded)
 
 
 class ParameterJsonEncoder(json.JSONEncoder):
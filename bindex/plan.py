@@ -0,0 +1,454 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.plan
+    ~~~~~~~~~~~~~
+
+    The plan module compiles the parameters of a definition file into an
+    extraction plan. Every parameter is resolved once to its absolute offset
+    in the target file so the extractor never has to walk the 'relative_to'
+    chains again while reading.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+from bindex import codec
+from bindex.const import *
+from bindex.parameter import Parameter
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+
+class Span(object):
+    """
+    The Span object describes a contiguous range of bytes of the target file
+    covering one or more parameters, which can be read with a single call.
+    """
+
+    def __init__(self, _start, _end, _parameters):
+        """
+        Initializes a new Span object.
+
+        :param _start: The absolute offset of the first byte of the span.
+        :param _end: The absolute offset following the last byte of the span.
+        :param _parameters: A list of (parameter, absolute offset) tuples
+        covered by the span, sorted by offset.
+        """
+        assert 0 <= _start <= _end
+        self.__start = _start
+        self.__end = _end
+        self.__parameters = _parameters
+        self.__groups = None
+
+    def __repr__(self):
+        """
+        Returns a string representation of the Span object.
+        :return: A string representation of the Span object.
+        """
+        return SPAN_REPR.format(
+            start=self.start,
+            end=self.end,
+            np=len(self.parameters)
+        )
+
+    @property
+    def start(self):
+        """
+        Returns the absolute offset of the first byte of the span.
+        :return: The absolute offset of the first byte of the span.
+        """
+        return self.__start
+
+    @property
+    def end(self):
+        """
+        Returns the absolute offset following the last byte of the span.
+        :return: The absolute offset following the last byte of the span.
+        """
+        return self.__end
+
+    @property
+    def size(self):
+        """
+        Returns the number of bytes covered by the span.
+        :return: The number of bytes covered by the span.
+        """
+        return self.__end - self.__start
+
+    @property
+    def parameters(self):
+        """
+        Returns the parameters covered by the span.
+        :return: A list of (parameter, absolute offset) tuples sorted by offset.
+        """
+        return self.__parameters
+
+    @property
+    def groups(self):
+        """
+        Returns the parameters of the span split into groups decoded with a
+        single call. Runs of adjacent numeric parameters are fused into a
+        composite struct format, see bindex.codec.fuse.
+
+        The groups are computed on first access and then reused.
+
+        :return: A list of (format, parameters) tuples.
+        """
+        if self.__groups is None:
+            self.__groups = codec.fuse(self.__parameters)
+        return self.__groups
+
+
+def coalesce(_parameters, _gap=0):
+    """
+    Merges the byte ranges of the given parameters into spans.
+
+    The parameters are sorted by absolute offset and adjacent or overlapping
+    ranges are merged together. Ranges separated by at most _gap bytes are
+    also merged, in which case the bytes in between are read but ignored.
+
+    :param _parameters: A list of (parameter, absolute offset) tuples.
+    :param _gap: The maximum number of unused bytes allowed between two
+    parameters of the same span.
+    :return: A list of Span objects sorted by offset.
+    """
+    assert _gap >= 0
+    spans = []
+    ordered = sorted(_parameters, key=lambda item: item[1])
+
+    members = []
+    start = end = 0
+    for parameter, offset in ordered:
+        if members and offset <= end + _gap:
+            members.append((parameter, offset))
+            end = max(end, offset + parameter.size)
+        else:
+            if members:
+                spans.append(Span(start, end, members))
+            members = [(parameter, offset)]
+            start = offset
+            end = offset + parameter.size
+
+    if members:
+        spans.append(Span(start, end, members))
+
+    return spans
+
+
+class ExtractionPlan(object):
+    """
+    The ExtractionPlan object holds the parameters of a definition file along
+    with their absolute offsets in the target file.
+
+    Offsets are resolved in topological order: a parameter is always resolved
+    after the parameter it is relative to. Missing and cyclic references are
+    detected while the plan is built, i.e. when the definition is loaded.
+
+    Parameters located from an anchor are resolved to their distance from
+    the first byte of the anchor, which is only known once the anchor is
+    found in the target file.
+    """
+
+    def __init__(self, _definition):
+        """
+        Compiles the parameters of the given definition into a plan.
+
+        :param _definition: The DefinitionFile object to compile.
+        """
+        assert _definition is not None
+
+        self.__offsets = {}
+        self.__order = []
+        self.__compatibility = []
+        self.__parameters = []
+        self.__arrays = []
+        self.__anchors = []
+        self.__anchored = []
+        self.__spans = {}
+        self.__selections = {}
+        self.__header = []
+
+        self.__resolve(_definition)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the ExtractionPlan object.
+        :return: A string representation of the ExtractionPlan object.
+        """
+        return EXTRACTION_PLAN_REPR.format(
+            nc=len(self.__compatibility),
+            np=len(self.__parameters)
+        )
+
+    def __len__(self):
+        return len(self.__order)
+
+    @property
+    def compatibility(self):
+        """
+        Returns the compatibility parameters along with their absolute offsets.
+
+        The list contains (parameter, absolute offset) tuples in the order
+        in which the parameters were defined.
+
+        :return: A list of (CompatibilityParameter, int) tuples.
+        """
+        return self.__compatibility
+
+    @property
+    def parameters(self):
+        """
+        Returns the parameters to extract along with their absolute offsets.
+
+        The list contains (parameter, absolute offset) tuples in the order
+        in which the parameters were defined. Parameters located from an
+        anchor are listed by ExtractionPlan.anchored instead.
+
+        :return: A list of (Parameter, int) tuples.
+        """
+        return self.__parameters
+
+    @property
+    def arrays(self):
+        """
+        Returns the arrays whose number of elements is read from another
+        parameter, along with their absolute offsets.
+
+        The size of these arrays is only known when extracting, so they are
+        not part of the spans of the plan and must be read once the
+        parameters of the spans are decoded.
+
+        :return: A list of (Parameter, int) tuples.
+        """
+        return self.__arrays
+
+    @property
+    def anchors(self):
+        """
+        Returns the anchors to search for in the target file.
+        :return: A list of Anchor objects.
+        """
+        return self.__anchors
+
+    @property
+    def anchored(self):
+        """
+        Returns the parameters to extract which are located from an anchor.
+
+        The list contains (parameter, anchor name, distance) tuples in the
+        order in which the parameters were defined. The absolute offset of
+        a parameter is the offset of the anchor plus the distance.
+
+        :return: A list of (Parameter, str, int) tuples.
+        """
+        return self.__anchored
+
+    @property
+    def header(self):
+        """
+        Returns the compatibility parameters grouped into spans.
+
+        Compatibility parameters are usually located in the header of the
+        target file and are covered by a single span.
+
+        :return: A list of Span objects sorted by offset.
+        """
+        return self.__header
+
+    @property
+    def order(self):
+        """
+        Returns all the parameters of the plan in topological order, i.e.
+        every parameter appears after the parameter it is relative to.
+
+        :return: A list of Parameter objects.
+        """
+        return self.__order
+
+    def spans(self, _gap=0):
+        """
+        Returns the parameters to extract grouped into contiguous spans,
+        except the arrays listed by ExtractionPlan.arrays.
+
+        The spans are computed once for each gap tolerance and then reused.
+
+        :param _gap: The maximum number of unused bytes allowed between two
+        parameters of the same span.
+        :return: A list of Span objects sorted by offset.
+        """
+        if _gap not in self.__spans:
+            self.__spans[_gap] = coalesce(
+                [item for item in self.__parameters if not item[0].has_dynamic_count], _gap)
+        return self.__spans[_gap]
+
+    def closure(self, _names):
+        """
+        Returns the names of the parameters to read in order to extract the
+        given parameters.
+
+        The offsets of the parameters are resolved when the plan is built,
+        so the parameters a parameter is relative to are not read. Only the
+        parameter holding the number of elements of an array is needed to
+        read the array.
+
+        :param _names: The names of the requested parameters.
+        :return: A set of parameter names. Names which are not parameters of
+        the plan are kept as is.
+        """
+        names = set(_names)
+        for parameter, _ in self.__arrays:
+            if parameter.name in names:
+                names.add(parameter.count)
+        for parameter, _, _ in self.__anchored:
+            if parameter.name in names and parameter.has_dynamic_count:
+                names.add(parameter.count)
+        return names
+
+    def select(self, _names, _gap=0, _exclude=()):
+        """
+        Returns the part of the plan needed to extract the given parameters
+        only, e.g. the parameters compared by a filter predicate or those
+        requested by a projection.
+
+        The parameters of ExtractionPlan.closure are selected, and nothing
+        else is read. Names which are not parameters of the plan are
+        ignored. Selections are computed once for each set of names and gap
+        tolerance.
+
+        :param _names: The names of the parameters to extract.
+        :param _gap: The maximum number of unused bytes allowed between two
+        parameters of the same span.
+        :param _exclude: The names of the parameters which are already
+        decoded, e.g. by a filter predicate, and must not be selected.
+        :return: A (spans, arrays, anchored) tuple, holding the selected
+        parts of ExtractionPlan.spans, ExtractionPlan.arrays and
+        ExtractionPlan.anchored.
+        """
+        key = (frozenset(_names), _gap, frozenset(_exclude))
+        if key not in self.__selections:
+            names = self.closure(key[0]) - key[2]
+            self.__selections[key] = (
+                coalesce([(p, offset) for p, offset in self.__parameters
+                          if p.name in names and not p.has_dynamic_count], _gap),
+                [(p, offset) for p, offset in self.__arrays if p.name in names],
+                [(p, a, distance) for p, a, distance in self.__anchored if p.name in names]
+            )
+        return self.__selections[key]
+
+    def precompute(self, _gap=0):
+        """
+        Computes the spans of the plan and their groups ahead of time, e.g.
+        before the plan is stored in a cache.
+
+        :param _gap: The gap tolerance of the spans to compute.
+        :return: None
+        """
+        for span in self.spans(_gap) + self.__header:
+            span.groups
+
+    def offset(self, _parameter):
+        """
+        Returns the absolute offset of the given parameter.
+
+        :param _parameter: A Parameter object of the compiled definition.
+        :return: The absolute offset of the parameter in the target file, or
+        its distance from its anchor if it is located from an anchor.
+        """
+        assert isinstance(_parameter, Parameter)
+        return self.__offsets[_parameter]
+
+    def __resolve(self, _definition):
+        """
+        Resolves the absolute offset of every parameter of the definition.
+
+        The 'relative_to' chains are walked iteratively and each parameter
+        is resolved only once, so the cost is linear with the number of
+        parameters regardless of the depth of the chains.
+
+        :param _definition: The DefinitionFile object to compile.
+        :return: None
+        """
+        offsets = self.__offsets
+        compatibility = list(_definition.compatibility.values())
+        parameters = list(_definition.parameters.values())
+        anchors = _definition.anchors
+        # Name of the anchor each anchored parameter is located from.
+        bases = {}
+
+        for parameter in compatibility + parameters:
+            # Walk up the chain until we reach a parameter which is already
+            # resolved or which is not relative to anything.
+            chain = []
+            visiting = set()
+            current = parameter
+            while current is not None and current not in offsets:
+                if current in visiting:
+                    raise Exception(MSG_ERROR_CYCLIC_REFERENCE.format(
+                        param=current.name))
+                visiting.add(current)
+                chain.append(current)
+
+                if current.relative_to is NO_VALUE or current.relative_to in anchors:
+                    current = None
+                else:
+                    related = _definition.related(current)
+                    if related is None:
+                        raise Exception(MSG_ERROR_MISSING_REFERENCE.format(
+                            param=current.name,
+                            rn=str(current.relative_to)))
+                    current = related
+
+            # Resolve the chain from its root down to the parameter.
+            for item in reversed(chain):
+                if item.relative_to is NO_VALUE:
+                    offsets[item] = item.offset
+                elif item.relative_to in anchors:
+                    offsets[item] = item.offset
+                    bases[item] = item.relative_to
+                else:
+                    related = _definition.related(item)
+                    if related.has_dynamic_count:
+                        raise Exception(MSG_ERROR_RELATIVE_TO_ARRAY.format(
+                            param=item.name,
+                            rn=related.name))
+                    offsets[item] = item.offset + offsets[related] + related.size
+                    if related in bases:
+                        bases[item] = bases[related]
+                self.__order.append(item)
+
+        # Compatibility parameters are verified before the anchors are
+        # searched for.
+        for parameter in compatibility:
+            if parameter in bases:
+                raise Exception(MSG_ERROR_ANCHORED_COMPATIBILITY.format(
+                    param=parameter.name,
+                    a=bases[parameter]))
+
+        # The element count of an array must be read from a numeric
+        # parameter extracted before it.
+        for parameter in parameters:
+            if not parameter.has_dynamic_count:
+                continue
+            counter = _definition.parameters.get(parameter.count)
+            if counter is None:
+                raise Exception(MSG_ERROR_MISSING_REFERENCE.format(
+                    param=parameter.name,
+                    rn=parameter.count))
+            if counter.is_string or counter.is_array:
+                raise Exception(MSG_ERROR_COUNT_REFERENCE.format(
+                    param=parameter.name,
+                    rn=parameter.count))
+
+        self.__compatibility = [(p, offsets[p]) for p in compatibility]
+        self.__parameters = [(p, offsets[p]) for p in parameters if p not in bases]
+        self.__arrays = [(p, offset) for p, offset in self.__parameters if p.has_dynamic_count]
+        self.__anchors = list(anchors.values())
+        self.__anchored = [(p, bases[p], offsets[p]) for p in parameters if p in bases]
+        self.__header = coalesce(self.__compatibility, COMPATIBILITY_GAP)
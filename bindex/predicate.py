@@ -0,0 +1,435 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.predicate
+    ~~~~~~~~~~~~~
+
+    The predicate module parses the conditions used to filter results on
+    the values of their parameters, such as:
+
+        version == "1.09.145" and TestParam1 > 0xFFFF
+
+    Comparisons of a field with a literal value can be combined with 'and',
+    'or', 'not' and parentheses. A predicate can either be evaluated over
+    the values of a result or translated to the WHERE clause of a SQL query,
+    and both select the same results. A comparison involving a missing value
+    or a value which could not be decoded is unknown, as in SQL, and only
+    results for which the predicate is true are kept. Numbers, text and
+    bytes are never equal nor ordered with each other: a comparison of
+    values of different types is false, rather than following the ordering
+    and the type conversions of SQLite.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import ast
+import operator
+import re
+
+from bindex.const import *
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+
+class Predicate(object):
+    """
+    The Predicate object is the base of the nodes of a parsed predicate.
+    """
+
+    def __repr__(self):
+        """
+        Returns a string representation of the Predicate object.
+        :return: A string representation of the Predicate object.
+        """
+        return PREDICATE_REPR.format(p=self.to_sql(lambda f: f)[0])
+
+    @property
+    def fields(self):
+        """
+        Returns the names of the fields compared by the predicate.
+        :return: A set of field names.
+        """
+        raise NotImplementedError
+
+    def evaluate(self, _values):
+        """
+        Evaluates the predicate over the given values.
+
+        :param _values: A dictionary of values indexed by field name.
+        :return: True or False, or None if the result is unknown.
+        """
+        raise NotImplementedError
+
+    def matches(self, _values):
+        """
+        Indicates if the given values satisfy the predicate.
+
+        :param _values: A dictionary of values indexed by field name.
+        :return: True if the predicate is true, False if it is false or
+        unknown.
+        """
+        return self.evaluate(_values) is True
+
+    def to_sql(self, _column):
+        """
+        Translates the predicate into a SQL expression.
+
+        :param _column: A function returning the SQL expression of the
+        column holding a field, given the name of the field.
+        :return: A (SQL expression, list of parameters) tuple. The literal
+        values are bound as parameters.
+        """
+        raise NotImplementedError
+
+
+class Comparison(Predicate):
+    """
+    The Comparison object compares a field with a literal value, or with a
+    list of values when the operator is 'in'.
+    """
+
+    # Storage classes of the values of SQLite, i.e. the results of its
+    # typeof() function, indexed by the Python types of the literals.
+    __storage_classes = [
+        ((bool, int, float), ("integer", "real")),
+        (str, ("text",)),
+        (bytes, ("blob",))
+    ]
+
+    # Functions comparing a value with a literal, indexed by operator. '='
+    # is a synonym of '=='.
+    __operators = {
+        "==": operator.eq,
+        "=": operator.eq,
+        "!=": operator.ne,
+        "<": operator.lt,
+        "<=": operator.le,
+        ">": operator.gt,
+        ">=": operator.ge
+    }
+
+    def __init__(self, _field, _operator, _value):
+        assert _operator == PREDICATE_IN or _operator in self.__operators
+        if _value is NO_VALUE and _operator != PREDICATE_IN and \
+                self.__operators[_operator] not in (operator.eq, operator.ne):
+            raise Exception(MSG_ERROR_PREDICATE_NULL.format(f=_field))
+        if _operator == PREDICATE_IN and NO_VALUE in _value:
+            raise Exception(MSG_ERROR_PREDICATE_NULL.format(f=_field))
+        self.__field = _field
+        self.__operator = _operator
+        self.__value = _value
+
+    @property
+    def field(self):
+        """
+        Returns the name of the compared field.
+        :return: The name of the field.
+        """
+        return self.__field
+
+    @property
+    def operator(self):
+        """
+        Returns the comparison operator.
+        :return: One of the comparison operators, or 'in'.
+        """
+        return self.__operator
+
+    @property
+    def value(self):
+        """
+        Returns the literal value compared with the field.
+        :return: The value, a tuple of values for 'in', or None for null.
+        """
+        return self.__value
+
+    @property
+    def fields(self):
+        return {self.__field}
+
+    def evaluate(self, _values):
+        value = _values.get(self.__field, NO_VALUE)
+        if value == ERROR_VALUE:
+            value = NO_VALUE
+        if self.__value is NO_VALUE and self.__operator != PREDICATE_IN:
+            return (value is NO_VALUE) == (self.__operators[self.__operator] is not operator.ne)
+        if value is NO_VALUE:
+            return NO_VALUE
+        classes = self.__storage_class(value)
+        if self.__operator == PREDICATE_IN:
+            return any(value == v for v in self.__value if self.__storage_class(v) == classes)
+        if classes != self.__storage_class(self.__value):
+            return False
+        return bool(self.__operators[self.__operator](value, self.__value))
+
+    def to_sql(self, _column):
+        column = _column(self.__field)
+        if self.__value is NO_VALUE:
+            negated = self.__operators[self.__operator] is operator.ne
+            return "{c:s} IS {n:s}NULL".format(c=column, n="NOT " if negated else ""), []
+        # The storage class of the column is compared along with its value,
+        # so the comparison can still use the index of the column. NULL
+        # values keep the comparison unknown.
+        if self.__operator != PREDICATE_IN:
+            return "{c:s} {o:s} ? AND {t:s}".format(
+                c=column, o=self.__operator, t=self.__typeof(column, self.__value)), [self.__value]
+        groups = {}
+        for value in self.__value:
+            groups.setdefault(self.__storage_class(value), []).append(value)
+        parts = []
+        parameters = []
+        for values in groups.values():
+            parts.append("{c:s} IN ({p:s}) AND {t:s}".format(
+                c=column, p=", ".join("?" for _ in values), t=self.__typeof(column, values[0])))
+            parameters.extend(values)
+        if len(parts) == 1:
+            return parts[0], parameters
+        return " OR ".join("({s:s})".format(s=p) for p in parts), parameters
+
+    @classmethod
+    def __storage_class(cls, _value):
+        """
+        Returns the storage classes of SQLite holding a value.
+
+        :param _value: A value of a result or a literal.
+        :return: A tuple of the names of the storage classes, or None for
+        the values stored as JSON text.
+        """
+        for types, classes in cls.__storage_classes:
+            if isinstance(_value, types):
+                return classes
+        return NO_VALUE
+
+    @classmethod
+    def __typeof(cls, _column, _value):
+        """
+        Returns the SQL expression checking that a column holds a value of
+        the storage class of a literal, or NULL.
+
+        :param _column: The SQL expression of the column.
+        :param _value: The literal.
+        :return: The SQL expression.
+        """
+        classes = cls.__storage_class(_value) + ("null",)
+        return "typeof({c:s}) IN ({t:s})".format(c=_column, t=", ".join("'{n:s}'".format(n=n) for n in classes))
+
+
+class Negation(Predicate):
+    """
+    The Negation object is true when its operand is false.
+    """
+
+    def __init__(self, _operand):
+        self.__operand = _operand
+
+    @property
+    def fields(self):
+        return self.__operand.fields
+
+    def evaluate(self, _values):
+        value = self.__operand.evaluate(_values)
+        return NO_VALUE if value is NO_VALUE else not value
+
+    def to_sql(self, _column):
+        sql, parameters = self.__operand.to_sql(_column)
+        return "NOT ({s:s})".format(s=sql), parameters
+
+
+class Connective(Predicate):
+    """
+    The Connective object combines its operands with 'and' or 'or'. Its
+    operands are evaluated in order and the evaluation stops as soon as the
+    result is known.
+    """
+
+    def __init__(self, _connective, _operands):
+        assert _connective in (PREDICATE_AND, PREDICATE_OR)
+        self.__connective = _connective
+        self.__operands = list(_operands)
+
+    @property
+    def operands(self):
+        """
+        Returns the predicates combined by the connective.
+        :return: A list of Predicate objects.
+        """
+        return list(self.__operands)
+
+    @property
+    def fields(self):
+        return set().union(*(o.fields for o in self.__operands))
+
+    def evaluate(self, _values):
+        # The value deciding the result as soon as an operand has it.
+        decisive = self.__connective == PREDICATE_OR
+        result = not decisive
+        for operand in self.__operands:
+            value = operand.evaluate(_values)
+            if value is decisive:
+                return decisive
+            if value is NO_VALUE:
+                result = NO_VALUE
+        return result
+
+    def to_sql(self, _column):
+        parts = []
+        parameters = []
+        for operand in self.__operands:
+            sql, values = operand.to_sql(_column)
+            parts.append("({s:s})".format(s=sql))
+            parameters.extend(values)
+        return " {c:s} ".format(c=self.__connective.upper()).join(parts), parameters
+
+
+class __Parser(object):
+    """
+    Recursive descent parser of predicates:
+
+        disjunction := conjunction ('or' conjunction)*
+        conjunction := negation ('and' negation)*
+        negation    := 'not' negation | '(' disjunction ')' | comparison
+        comparison  := field operator literal | field 'in' '(' literal (',' literal)* ')'
+    """
+
+    # Tokens of a predicate. Names may contain dots, e.g. "meta.sha1", and
+    # names containing other characters are written between backquotes.
+    __token = re.compile(r"""(?:
+        (?P<number>[-+]?(?:0[xX][0-9a-fA-F]+|0[bB][01]+|0[oO][0-7]+|
+            (?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?))
+        |(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+        |(?P<operator>==|!=|<=|>=|<|>|=)
+        |(?P<punctuation>[(),])
+        |(?P<name>`[^`]+`|[A-Za-z_][\w.]*)
+        )""", re.VERBOSE)
+
+    def __init__(self, _expression):
+        self.__expression = _expression
+        self.__tokens = self.__tokenize(_expression)
+        self.__index = 0
+
+    def parse(self):
+        predicate = self.__disjunction()
+        self.__expect("end")
+        return predicate
+
+    def __tokenize(self, _expression):
+        """
+        Splits a predicate into tokens.
+
+        :param _expression: The text of the predicate.
+        :return: A list of (kind, text, position) tuples, ending with an
+        'end' token.
+        """
+        tokens = []
+        position = 0
+        while True:
+            while position < len(_expression) and _expression[position].isspace():
+                position += 1
+            if position >= len(_expression):
+                break
+            match = self.__token.match(_expression, position)
+            if match is None:
+                raise Exception(MSG_ERROR_PREDICATE_SYNTAX.format(
+                    e=_expression, t=repr(_expression[position]), p=position))
+            kind = match.lastgroup
+            text = match.group(kind)
+            if kind == "name" and text.lower() in PREDICATE_KEYWORDS:
+                kind, text = "keyword", text.lower()
+            tokens.append((kind, text, position))
+            position = match.end()
+        tokens.append(("end", PREDICATE_END, len(_expression)))
+        return tokens
+
+    def __peek(self, _kind, _text=NO_VALUE):
+        kind, text, _ = self.__tokens[self.__index]
+        return kind == _kind and (_text is NO_VALUE or text == _text)
+
+    def __next(self):
+        token = self.__tokens[self.__index]
+        if token[0] != "end":
+            self.__index += 1
+        return token
+
+    def __expect(self, _kind, _text=NO_VALUE):
+        if not self.__peek(_kind, _text):
+            self.__fail()
+        return self.__next()
+
+    def __fail(self):
+        kind, text, position = self.__tokens[self.__index]
+        raise Exception(MSG_ERROR_PREDICATE_SYNTAX.format(
+            e=self.__expression, t=text if kind == "end" else repr(text), p=position))
+
+    def __disjunction(self):
+        operands = [self.__conjunction()]
+        while self.__peek("keyword", PREDICATE_OR):
+            self.__next()
+            operands.append(self.__conjunction())
+        return operands[0] if len(operands) == 1 else Connective(PREDICATE_OR, operands)
+
+    def __conjunction(self):
+        operands = [self.__negation()]
+        while self.__peek("keyword", PREDICATE_AND):
+            self.__next()
+            operands.append(self.__negation())
+        return operands[0] if len(operands) == 1 else Connective(PREDICATE_AND, operands)
+
+    def __negation(self):
+        if self.__peek("keyword", PREDICATE_NOT):
+            self.__next()
+            return Negation(self.__negation())
+        if self.__peek("punctuation", "("):
+            self.__next()
+            predicate = self.__disjunction()
+            self.__expect("punctuation", ")")
+            return predicate
+        return self.__comparison()
+
+    def __comparison(self):
+        field = self.__expect("name")[1].strip("`")
+        if self.__peek("keyword", PREDICATE_IN):
+            self.__next()
+            self.__expect("punctuation", "(")
+            values = [self.__literal()]
+            while self.__peek("punctuation", ","):
+                self.__next()
+                values.append(self.__literal())
+            self.__expect("punctuation", ")")
+            return Comparison(field, PREDICATE_IN, tuple(values))
+        symbol = self.__expect("operator")[1]
+        return Comparison(field, symbol, self.__literal())
+
+    def __literal(self):
+        kind, text, _ = self.__tokens[self.__index]
+        if kind == "number":
+            self.__next()
+            try:
+                return int(text, 0)
+            except ValueError:
+                # Decimal integers with leading zeros and floats.
+                return float(text) if any(c in text for c in ".eE") else int(text, 10)
+        if kind == "string":
+            self.__next()
+            return ast.literal_eval(text)
+        if kind == "keyword" and text in (PREDICATE_NULL, PREDICATE_TRUE, PREDICATE_FALSE):
+            self.__next()
+            return {PREDICATE_NULL: NO_VALUE, PREDICATE_TRUE: True, PREDICATE_FALSE: False}[text]
+        self.__fail()
+
+
+def parse(_expression):
+    """
+    Parses a predicate.
+
+    :param _expression: The text of the predicate, e.g.
+    'TestParam1 > 0xFFFF and not TestParam2 in ("a", "b")'.
+    :return: A Predicate object.
+    """
+    return __Parser(_expression).parse()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.records
+    ~~~~~~~~~~~~~
+
+    The records module decodes target files made of many repeated records
+    with NumPy. The parameters of a definition file are compiled into a
+    structured dtype describing one record, so that millions of records are
+    decoded at once by np.frombuffer instead of one value at a time. NumPy is
+    an optional dependency, only required by this module.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import logging
+import mmap
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from bindex import codec
+from bindex.const import *
+from bindex.files import DefinitionFile
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+logger = logging.getLogger(__name__)
+
+# NumPy kinds of the struct format codes producing a single value.
+__kinds = {}
+__kinds.update(dict.fromkeys("bhilqn", "i"))
+__kinds.update(dict.fromkeys("BHILQN", "u"))
+__kinds.update(dict.fromkeys("efd", "f"))
+__kinds.update(dict.fromkeys("?", "b"))
+__kinds.update(dict.fromkeys("cs", "S"))
+
+
+def field_format(_parameter):
+    """
+    Returns the NumPy format of the given parameter.
+
+    String parameters are kept as raw bytes ("S" format) and decoded when
+    the records are converted to values. Numeric parameters must produce a
+    single value. Arrays with a fixed number of elements are described by a
+    sub-array of their elements.
+
+    :param _parameter: A Parameter object.
+    :return: A format accepted by np.dtype, e.g. "<u4" or ("<u2", (8,)).
+    """
+    size = _parameter.element_size
+    if _parameter.is_string:
+        fmt = "S{n:d}".format(n=size)
+    else:
+        compiled = _parameter.codec
+        code = compiled.format.lstrip("@=<>!").lstrip("0123456789")
+        prefix = compiled.format[:1]
+        if len(code) != 1 or code not in __kinds or compiled.size != size:
+            raise Exception(MSG_ERROR_RECORD_FORMAT.format(
+                param=_parameter.name,
+                type=_parameter.type))
+        if __kinds[code] == "S":
+            fmt = "S{n:d}".format(n=size)
+        else:
+            order = {BYTE_ORDER_LITTLE: "<", BYTE_ORDER_BIG: ">", BYTE_ORDER_NETWORK: ">"}
+            fmt = "{o:s}{k:s}{n:d}".format(o=order.get(prefix, "="), k=__kinds[code], n=size)
+
+    if _parameter.is_array:
+        return fmt, (_parameter.count,)
+    return fmt
+
+
+class RecordLayout(object):
+    """
+    The RecordLayout object holds the NumPy structured dtype compiled from
+    the parameters of a definition file.
+
+    The fields of the dtype are located at the offsets resolved by the plan,
+    relative to the first parameter of the definition, which is the first
+    byte of a record. Consecutive records are separated by the stride of the
+    layout, by default the number of bytes covered by the parameters.
+    """
+
+    def __init__(self, _definition_file, _stride=NO_VALUE):
+        """
+        Compiles the parameters of the given definition into a dtype.
+
+        :param _definition_file: The path to the definition file, or an
+        already loaded DefinitionFile object.
+        :param _stride: The number of bytes from the start of a record to the
+        start of the next one. Can be None.
+        """
+        if np is None:
+            raise Exception(MSG_ERROR_NUMPY_MISSING)
+        if isinstance(_definition_file, DefinitionFile):
+            self.__definition = _definition_file
+        else:
+            self.__definition = DefinitionFile(_definition_file)
+
+        if len(self.__definition.plan.anchored) > 0:
+            raise Exception(MSG_ERROR_RECORD_ANCHORS)
+        parameters = self.__definition.plan.parameters
+        if len(parameters) == 0:
+            raise Exception(MSG_ERROR_RECORD_EMPTY.format(df=str(self.__definition)))
+        for parameter, _ in parameters:
+            if parameter.has_dynamic_count:
+                raise Exception(MSG_ERROR_RECORD_FORMAT.format(
+                    param=parameter.name,
+                    type=parameter.type))
+
+        self.__base = min(offset for _, offset in parameters)
+        extent = max(offset + p.size for p, offset in parameters) - self.__base
+        self.__stride = extent if _stride is NO_VALUE else _stride
+        if self.__stride < extent:
+            raise Exception(MSG_ERROR_RECORD_STRIDE.format(s=self.__stride, n=extent))
+
+        self.__parameters = [p for p, _ in parameters]
+        self.__dtype = np.dtype({
+            "names": [p.name for p in self.__parameters],
+            "formats": [field_format(p) for p in self.__parameters],
+            "offsets": [offset - self.__base for _, offset in parameters],
+            "itemsize": self.__stride
+        })
+
+    def __repr__(self):
+        """
+        Returns a string representation of the RecordLayout object.
+        :return: A string representation of the RecordLayout object.
+        """
+        return RECORD_LAYOUT_REPR.format(
+            df=str(self.__definition),
+            nf=len(self.__parameters),
+            s=self.__stride
+        )
+
+    @property
+    def dtype(self):
+        """
+        Returns the structured dtype describing a record.
+        :return: A numpy.dtype object.
+        """
+        return self.__dtype
+
+    @property
+    def base(self):
+        """
+        Returns the offset of the first record in the target file, i.e. the
+        lowest offset of the parameters of the definition.
+        :return: The absolute offset of the first record.
+        """
+        return self.__base
+
+    @property
+    def stride(self):
+        """
+        Returns the number of bytes from the start of a record to the start
+        of the next one.
+        :return: The size of a record in bytes.
+        """
+        return self.__stride
+
+    def decode(self, _buffer, _offset=NO_VALUE, _count=NO_VALUE):
+        """
+        Decodes the records of the given buffer without copying it.
+
+        :param _buffer: An object supporting the buffer protocol, such as the
+        bytes of the target file or a mapping of it.
+        :param _offset: The offset of the first record within the buffer.
+        Defaults to the offset of the first parameter of the definition.
+        :param _count: The number of records to decode. Defaults to every
+        complete record following the offset.
+        :return: A read-only structured numpy.ndarray.
+        """
+        offset = self.__base if _offset is NO_VALUE else _offset
+        count = _count
+        if count is NO_VALUE:
+            count = max(0, (len(memoryview(_buffer)) - offset) // self.__stride)
+        return np.frombuffer(_buffer, dtype=self.__dtype, count=count, offset=offset)
+
+    def read(self, _target_file, _offset=NO_VALUE, _count=NO_VALUE):
+        """
+        Decodes the records of the given target file.
+
+        The target file is mapped into memory and the array returned is a
+        view of the mapping, so only the records accessed are read from the
+        disk. The mapping is released with the last reference to the array.
+
+        :param _target_file: The path of the target file.
+        :param _offset: The offset of the first record in the target file.
+        :param _count: The number of records to decode.
+        :return: A read-only structured numpy.ndarray.
+        """
+        assert os.path.isfile(_target_file)
+        if os.path.getsize(_target_file) == 0:
+            return np.empty(0, dtype=self.__dtype)
+        with open(_target_file, "rb") as fp:
+            mapping = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.decode(mapping, _offset, _count)
+
+    def values(self, _records, _index=0):
+        """
+        Converts one record to the dictionary of values produced by the
+        Extractor, i.e. the "parameters" field of the results.
+
+        :param _records: A structured array returned by decode or read.
+        :param _index: The index of the record to convert.
+        :return: A dictionary of the values indexed by parameter name.
+        """
+        return self.__convert(_records[_index])
+
+    def iter_values(self, _records):
+        """
+        Converts the records to dictionaries of values, one at a time.
+
+        :param _records: A structured array returned by decode or read.
+        :return: A generator of dictionaries of values indexed by parameter
+        name.
+        """
+        for record in _records:
+            yield self.__convert(record)
+
+    def __convert(self, _record):
+        """
+        Converts a record to Python values.
+
+        :param _record: A numpy.void record.
+        :return: A dictionary of the values indexed by parameter name.
+        """
+        values = {}
+        for parameter in self.__parameters:
+            value = _record[parameter.name]
+            if parameter.is_string:
+                raw = bytes(value) if not parameter.is_array else [bytes(v) for v in value]
+                try:
+                    if parameter.is_array:
+                        value = [codec.decode_string(v.ljust(parameter.element_size, b"\x00"),
+                                                     parameter.type) for v in raw]
+                    else:
+                        value = codec.decode_string(
+                            raw.ljust(parameter.element_size, b"\x00"), parameter.type)
+                except Exception as e:
+                    logger.error(MSG_ERROR_FAILED_READ_PARAM.format(
+                        param=str(parameter),
+                        err=str(e)))
+                    value = ERROR_VALUE
+            else:
+                value = value.tolist()
+            values[parameter.name] = value
+        return values
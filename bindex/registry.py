@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.registry
+    ~~~~~~~~~~~~~
+
+    The registry module loads a directory of definition files and indexes
+    their compatibility parameters. Given a target file, the registry finds
+    the compatible definitions by reading each distinct compatibility field
+    only once, instead of checking every definition in turn.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import logging
+import os
+
+from bindex.const import *
+from bindex.files import DefinitionFile
+from bindex.files import TargetFile
+from bindex.plan import coalesce
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+logger = logging.getLogger(__name__)
+
+
+class DefinitionRegistry(object):
+    """
+    The DefinitionRegistry object holds a set of definition files and an
+    index of their compatibility parameters.
+
+    Compatibility parameters reading the same bytes the same way, i.e. with
+    the same absolute offset, size, type and byte order, form a probe. The
+    index maps each probe to a hash table associating every accepted value
+    with the definitions accepting it. Definitions without compatibility
+    parameters cannot be selected by the registry. Unhashable accepted
+    values, e.g. lists, are not indexed and are compared one by one.
+    """
+
+    def __init__(self, _directory=None, _cache=None):
+        """
+        Creates a registry and loads the definition files of the given
+        directory, if any.
+
+        :param _directory: The path of a directory containing definition files.
+        Can be None.
+        :param _cache: A DefinitionCache object used to load the definition
+        files. Can be None.
+        """
+        self.__directory = _directory
+        self.__cache = _cache
+        self.__definitions = []
+        # Probe -> {accepted value -> set of definition indexes}
+        self.__index = {}
+        # Probe -> representative (parameter, absolute offset) tuple
+        self.__probes = {}
+        # Probe -> list of (definition index, parameters) compared linearly
+        self.__linear = {}
+        # Number of distinct probes of each definition
+        self.__probe_counts = []
+
+        if _directory is not None:
+            self.load(_directory)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the DefinitionRegistry object.
+        :return: A string representation of the DefinitionRegistry object.
+        """
+        return DEFINITION_REGISTRY_REPR.format(
+            nd=len(self.__definitions),
+            np=len(self.__probes)
+        )
+
+    def __str__(self):
+        """
+        Returns the directory from which the definition files were loaded.
+        :return: The path of the directory, or the representation of the
+        object if no directory was given.
+        """
+        if self.__directory is None:
+            return self.__repr__()
+        return self.__directory
+
+    def __len__(self):
+        return len(self.__definitions)
+
+    @property
+    def definitions(self):
+        """
+        Returns the definition files of the registry in the order they were
+        added.
+        :return: A list of DefinitionFile objects.
+        """
+        return self.__definitions
+
+    def load(self, _directory):
+        """
+        Loads every definition file found in the given directory.
+
+        Files are loaded in alphabetical order. Files which cannot be loaded
+        are logged and skipped.
+
+        :param _directory: The path of a directory containing definition files.
+        :return: None
+        """
+        assert os.path.isdir(_directory)
+        for name in sorted(os.listdir(_directory)):
+            path = os.path.join(_directory, name)
+            if not os.path.isfile(path) or \
+                    os.path.splitext(name)[1].lower() not in DEFINITION_EXTENSIONS:
+                continue
+            try:
+                if self.__cache is not None:
+                    self.add(self.__cache.load(path))
+                else:
+                    self.add(DefinitionFile(path))
+            except Exception as e:
+                logger.error(MSG_ERROR_LOAD_DEFINITION.format(f=path, err=str(e)))
+
+    def add(self, _definition):
+        """
+        Adds a definition file to the registry and indexes its compatibility
+        parameters.
+
+        :param _definition: A DefinitionFile object.
+        :return: None
+        """
+        assert isinstance(_definition, DefinitionFile)
+        index = len(self.__definitions)
+        self.__definitions.append(_definition)
+
+        # Several parameters of the same definition may read the same
+        # probe, in which case a value must be accepted by all of them.
+        accepted = {}
+        linear = {}
+        for parameter, offset in _definition.plan.compatibility:
+            probe = (offset, parameter.size, parameter.type, parameter.byte_order)
+            self.__probes.setdefault(probe, (parameter, offset))
+            try:
+                values = set(parameter.compatible_with_list)
+            except TypeError:
+                linear.setdefault(probe, []).append(parameter)
+                continue
+            if probe in accepted:
+                accepted[probe] &= values
+            else:
+                accepted[probe] = values
+
+        for probe, parameters in linear.items():
+            if probe in accepted:
+                accepted[probe] = {v for v in accepted[probe]
+                                   if all(p.is_compatible(v) for p in parameters)}
+            else:
+                self.__linear.setdefault(probe, []).append((index, parameters))
+
+        for probe, values in accepted.items():
+            table = self.__index.setdefault(probe, {})
+            for value in values:
+                table.setdefault(value, set()).add(index)
+
+        self.__probe_counts.append(len(accepted) + len(linear.keys() - accepted.keys()))
+
+    def match(self, _target_file):
+        """
+        Finds the definitions compatible with the given target file.
+
+        Every probe of the index is read and decoded once, then looked up in
+        its hash table. A definition matches when all of its probes accepted
+        the values read. Matches are sorted by decreasing number of probes,
+        i.e. the most specific definitions first.
+
+        :param _target_file: The path of the target file.
+        :return: A list of compatible DefinitionFile objects.
+        """
+        if len(self.__probes) == 0:
+            return []
+
+        hits = [0] * len(self.__definitions)
+        target = TargetFile(_target_file)
+        try:
+            target.open()
+            for span in coalesce(list(self.__probes.values())):
+                buffer = target.read_span(span.start, span.size)
+                for parameter, offset in span.parameters:
+                    position = offset - span.start
+                    if position + parameter.size > len(buffer):
+                        continue
+                    try:
+                        value = target.decode(parameter, buffer, position)
+                    except Exception:
+                        continue
+                    probe = (offset, parameter.size, parameter.type, parameter.byte_order)
+                    try:
+                        indexes = self.__index.get(probe, {}).get(value, ())
+                    except TypeError:
+                        indexes = ()
+                    for index in indexes:
+                        hits[index] += 1
+                    for index, parameters in self.__linear.get(probe, ()):
+                        if all(p.is_compatible(value) for p in parameters):
+                            hits[index] += 1
+                buffer = None
+        finally:
+            target.close()
+
+        matches = [i for i, count in enumerate(self.__probe_counts)
+                   if count > 0 and hits[i] == count]
+        matches.sort(key=lambda i: -self.__probe_counts[i])
+        return [self.__definitions[i] for i in matches]
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.stats
+    ~~~~~~~~~~~~~
+
+    The stats module collects the time spent in each phase of an extraction
+    along with I/O counters, such as the number of bytes read. Collection is
+    disabled by default: the extractor then uses a NullStats object whose
+    methods do nothing, so the instrumented code does not measure anything.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import time
+
+from bindex.const import *
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+
+class Phase(object):
+    """
+    Context manager adding the time spent in its block to a phase.
+    """
+
+    __slots__ = ("__stats", "__name", "__start")
+
+    def __init__(self, _stats, _name):
+        self.__stats = _stats
+        self.__name = _name
+        self.__start = 0.0
+
+    def __enter__(self):
+        self.__start = time.perf_counter()
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        self.__stats.add_time(self.__name, time.perf_counter() - self.__start)
+
+
+class NullPhase(object):
+    """
+    Context manager measuring nothing, used when stats are disabled.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        pass
+
+
+NULL_PHASE = NullPhase()
+
+
+class Stats(object):
+    """
+    The Stats object holds the durations of the phases of one or more
+    extractions, in seconds, and a set of counters.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.__timings = {}
+        self.__counters = {}
+
+    def __repr__(self):
+        """
+        Returns a string representation of the Stats object.
+        :return: A string representation of the Stats object.
+        """
+        return STATS_REPR.format(nt=len(self.__timings), nc=len(self.__counters))
+
+    @property
+    def timings(self):
+        """
+        Returns the time spent in each phase.
+        :return: A dictionary of durations in seconds indexed by phase.
+        """
+        return self.__timings
+
+    @property
+    def counters(self):
+        """
+        Returns the counters.
+        :return: A dictionary of counts indexed by counter name.
+        """
+        return self.__counters
+
+    def phase(self, _name):
+        """
+        Returns a context manager measuring the time spent in a phase.
+
+        :param _name: The name of the phase, e.g. bindex.const.PHASE_READ.
+        :return: A context manager.
+        """
+        return Phase(self, _name)
+
+    def add_time(self, _name, _seconds):
+        """
+        Adds a duration to a phase.
+
+        :param _name: The name of the phase.
+        :param _seconds: The duration to add, in seconds.
+        :return: None
+        """
+        self.__timings[_name] = self.__timings.get(_name, 0.0) + _seconds
+
+    def count(self, _name, _value=1):
+        """
+        Increments a counter.
+
+        :param _name: The name of the counter, e.g. bindex.const.COUNTER_BYTES_READ.
+        :param _value: The value to add to the counter.
+        :return: None
+        """
+        self.__counters[_name] = self.__counters.get(_name, 0) + _value
+
+    def merge(self, _stats):
+        """
+        Adds the timings and counters of other stats to these stats.
+
+        :param _stats: A Stats object, or a dictionary as returned by to_dict,
+        e.g. read from the metadata of a result.
+        :return: None
+        """
+        if isinstance(_stats, Stats):
+            _stats = _stats.to_dict()
+        for name, seconds in _stats.get(STATS_TIMINGS, {}).items():
+            self.add_time(name, seconds)
+        for name, value in _stats.get(STATS_COUNTERS, {}).items():
+            self.count(name, value)
+
+    def to_dict(self):
+        """
+        Returns the stats as a dictionary which can be serialized.
+        :return: A dictionary holding the timings and the counters.
+        """
+        return {
+            STATS_TIMINGS: dict(self.__timings),
+            STATS_COUNTERS: dict(self.__counters)
+        }
+
+
+class NullStats(Stats):
+    """
+    The NullStats object is used when stats are disabled. It does not
+    record anything.
+    """
+
+    enabled = False
+
+    def phase(self, _name):
+        return NULL_PHASE
+
+    def add_time(self, _name, _seconds):
+        pass
+
+    def count(self, _name, _value=1):
+        pass
+
+    def merge(self, _stats):
+        pass
+
+
+NULL_STATS = NullStats()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.stream
+    ~~~~~~~~~~~~~
+
+    The stream module extracts the parameters of a definition file from a
+    non-seekable byte stream, such as the standard input or a pipe. The
+    stream is consumed front to back: the parameters are read in the order of
+    their absolute offsets, gaps are skipped without being kept in memory and
+    only the bytes of the current span are held at any time.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import datetime
+import logging
+
+from bindex import codec
+from bindex.const import *
+from bindex.files import DefinitionFile
+from bindex.files import StreamFile
+from bindex.parameter import CompatibilityParameter
+from bindex.plan import coalesce
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+logger = logging.getLogger(__name__)
+
+
+class StreamExtractor(object):
+    """
+    The StreamExtractor object extracts the parameters of a definition file
+    from a binary stream in a single forward pass.
+
+    Compatibility parameters are verified as soon as their bytes are read,
+    so the extraction stops at the first incompatible value rather than
+    after reading the whole stream. Since the stream cannot be read twice,
+    its hashes are computed over the bytes as they are consumed, and the
+    remainder of the stream is drained only if a hash is requested.
+    """
+
+    def __init__(self, _stream, _definition_file, _gap_tolerance=0,
+                 _hashes=DEFAULT_HASHES, _name=STANDARD_STREAM, _fields=NO_VALUE):
+        """
+        Initiates a StreamExtractor object using the given stream and
+        definition file.
+
+        :param _stream: A binary file object open for reading. It is never
+        seeked nor closed by the extractor.
+        :param _definition_file: The path to the definition file, or an already
+        loaded DefinitionFile object.
+        :param _gap_tolerance: The maximum number of unused bytes between two
+        parameters for them to be read with the same read call.
+        :param _hashes: The hash algorithms to compute over the stream.
+        :param _name: The name of the stream reported in the results.
+        :param _fields: The names of the parameters to extract. The bytes of
+        the other parameters are skipped. Can be None to extract every
+        parameter.
+        """
+        if isinstance(_definition_file, DefinitionFile):
+            self.__definition = _definition_file
+        else:
+            self.__definition = DefinitionFile(_definition_file)
+        if len(self.__definition.plan.anchored) > 0:
+            raise Exception(MSG_ERROR_STREAM_ANCHORS)
+        self.__stream = _stream
+        self.__gap_tolerance = _gap_tolerance
+        self.__hashes = list(_hashes or [])
+        self.__name = _name
+        self.__fields = NO_VALUE if _fields is NO_VALUE else frozenset(_fields)
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return EXTRACTOR_REPR.format(
+            df=self.definition,
+            tf=self.target
+        )
+
+    @property
+    def definition(self):
+        """
+        Returns the path of the definition file used by the extractor.
+        :return: The path of the definition file used by the extractor.
+        """
+        return str(self.__definition)
+
+    @property
+    def target(self):
+        """
+        Returns the name of the stream being analyzed by the extractor.
+        :return: The name of the stream being analyzed by the extractor.
+        """
+        return self.__name
+
+    def extract(self):
+        """
+        Extracts the parameters defined in the definition file from the
+        stream.
+
+        :return: A dictionary containing metadata and the values extracted.
+        """
+        now_date = datetime.date.today().strftime(RESULT_DATE_FMT)
+        now_time = datetime.time().strftime(RESULT_TIME_FMT)
+        result = {
+            PARAM_METADATA: {
+                PARAM_DEF_FILE: self.definition,
+                PARAM_ORIGINAL_FILE: self.target,
+                PARAM_ANALYSIS_DATE: DATETIME_STAMP.format(
+                    cdate=now_date,
+                    ctime=now_time
+                )
+            }
+        }
+
+        stream = StreamFile(self.__stream, self.__name, self.__hashes)
+        plan = self.__definition.plan
+        values = {}
+        compatibility = {}
+
+        parameters = plan.parameters
+        arrays = plan.arrays
+        if self.__fields is not NO_VALUE:
+            names = plan.closure(self.__fields)
+            parameters = [item for item in parameters if item[0].name in names]
+            arrays = [item for item in arrays if item[0].name in names]
+        spans = coalesce(
+            [item for item in plan.compatibility + parameters
+             if not item[0].has_dynamic_count],
+            self.__gap_tolerance)
+        # Arrays whose size depends on other parameters are read when the
+        # stream reaches them. Their count must be located before them.
+        ranges = [(span.start, 0, span) for span in spans]
+        ranges.extend((offset, 1, parameter) for parameter, offset in arrays)
+        ranges.sort(key=lambda item: item[:2])
+
+        for offset, is_array, item in ranges:
+            if is_array:
+                values[item.name] = self.__decode_array(stream, item, offset, values)
+                continue
+            buffer = stream.read_at(item.start, item.size)
+            for parameter, absolute_offset in item.parameters:
+                position = absolute_offset - item.start
+                if isinstance(parameter, CompatibilityParameter):
+                    compatibility[parameter.name] = self.__verify(parameter, buffer, position)
+                else:
+                    values[parameter.name] = self.__decode(parameter, buffer, position)
+
+        stream.drain()
+        result[PARAM_METADATA].update(stream.hexdigests())
+
+        logger.debug(MSG_INFO_COALESCED_READS.format(
+            np=len(parameters),
+            ns=len(spans)))
+        # Keep the values in the order of the definition file.
+        result[PARAM_COMPATIBILITY_PARAMS] = {p.name: compatibility[p.name] for p, _ in plan.compatibility}
+        result[PARAM_OTHER_PARAMS] = {p.name: values[p.name] for p, _ in parameters
+                                      if self.__fields is NO_VALUE or p.name in self.__fields}
+        return result
+
+    def __verify(self, _parameter, _buffer, _position):
+        """
+        Verifies that the value of a compatibility parameter is accepted.
+
+        :param _parameter: The CompatibilityParameter object to verify.
+        :param _buffer: The bytes read for the span.
+        :param _position: The position of the parameter within the buffer.
+        :return: The value of the parameter.
+        """
+        if _position + _parameter.size > len(_buffer):
+            logger.error(MSG_ERROR_READ_PARAM.format(param=str(_parameter)))
+            raise Exception(MSG_ERROR_NOT_COMPATIBLE)
+
+        # The raw bytes decide if they can be compared. Either way, the value
+        # is decoded once, for the result or the log.
+        if _parameter.compatible_bytes is not None:
+            compatible = _parameter.is_compatible_raw(_buffer[_position:_position + _parameter.size])
+            value = codec.decode(_parameter, _buffer, _position)
+        else:
+            value = codec.decode(_parameter, _buffer, _position)
+            compatible = _parameter.is_compatible(value)
+        if not compatible:
+            logger.error(MSG_ERROR_PARAM_NOT_COMPATIBLE.format(param=_parameter.name))
+            logger.error("\tValue from target: {vt:s}.".format(vt=str(value)))
+            raise Exception(MSG_ERROR_NOT_COMPATIBLE)
+        return value
+
+    def __decode_array(self, _stream, _parameter, _offset, _values):
+        """
+        Reads and decodes an array whose count is read from another parameter.
+
+        :param _stream: The StreamFile object being read.
+        :param _parameter: The Parameter object of the array.
+        :param _offset: The absolute offset of the array.
+        :param _values: The values decoded so far, indexed by name.
+        :return: The list of the values of the elements or
+        bindex.const.ERROR_VALUE if the array could not be decoded.
+        """
+        count = _values.get(_parameter.count, ERROR_VALUE)
+        if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+            logger.error(MSG_ERROR_INVALID_COUNT.format(
+                param=_parameter.name,
+                c=str(count)))
+            return ERROR_VALUE
+        buffer = _stream.read_at(_offset, _parameter.element_size * count)
+        return self.__decode(_parameter, buffer, 0, count)
+
+    def __decode(self, _parameter, _buffer, _position, _count=NO_VALUE):
+        """
+        Decodes the value of a parameter from the buffer of a span.
+
+        :param _parameter: The Parameter object to decode.
+        :param _buffer: The bytes read for the span.
+        :param _position: The position of the parameter within the buffer.
+        :param _count: The number of elements of an array whose count is read
+        from another parameter. Can be None.
+        :return: The value of the parameter or bindex.const.ERROR_VALUE if
+        it could not be decoded, e.g. because the stream ended before it.
+        """
+        size = _parameter.size
+        if _count is not NO_VALUE:
+            size = _parameter.element_size * _count
+        try:
+            if _position + size > len(_buffer):
+                raise Exception(MSG_ERROR_READ_PARAM.format(
+                    param=str(_parameter)))
+            return codec.decode(_parameter, _buffer, _position, _count=_count)
+        except Exception as e:
+            logger.error(MSG_ERROR_FAILED_READ_PARAM.format(
+                param=str(_parameter),
+                err=str(e)))
+            return ERROR_VALUE
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.writers
+    ~~~~~~~~~~~~~
+
+    The writers module serializes the results of extractions. Every writer
+    streams the results to its file as they are given, so results never
+    accumulate in memory. Compact JSON is produced with orjson or ujson when
+    one of them is installed, and MessagePack requires the msgpack package.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import contextlib
+import csv
+import json
+import logging
+import sys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from bindex.const import *
+
+__author__ = metadata.authors[0]
+__copyright__ = metadata.copyright
+__version__ = metadata.version
+__license__ = metadata.license
+__credits__ = metadata.authors
+__maintainer__ = metadata.authors[0]
+__email__ = metadata.emails[0]
+__status__ = metadata.status
+
+logger = logging.getLogger(__name__)
+
+
+def dumps(_obj):
+    """
+    Serializes an object into compact JSON using the fastest encoder
+    available.
+
+    Keys are not sorted and no whitespace is added. Objects which the fast
+    encoders cannot serialize are given to the json module instead.
+
+    :param _obj: The object to serialize.
+    :return: The JSON document as a string.
+    """
+    try:
+        if orjson is not None:
+            return orjson.dumps(_obj).decode("utf-8")
+        if ujson is not None:
+            return ujson.dumps(_obj)
+    except (TypeError, ValueError, OverflowError):
+        pass
+    return json.dumps(_obj, separators=(",", ":"))
+
+
+class ResultWriter(object):
+    """
+    The ResultWriter object is the base of the writers. It writes results
+    one at a time to a file object and finishes the output when closed.
+    The file object itself is never closed by the writer.
+    """
+
+    def __init__(self, _fp):
+        """
+        Initializes the writer.
+        :param _fp: The file object receiving the results.
+        """
+        assert _fp is not None
+        self._fp = _fp
+        self.__count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        self.close()
+
+    @property
+    def count(self):
+        """
+        Returns the number of results written so far.
+        :return: The number of results written.
+        """
+        return self.__count
+
+    def write(self, _result):
+        """
+        Writes a result to the file.
+        :param _result: The result dictionary of an extraction.
+        :return: None
+        """
+        self._write(_result, self.__count)
+        self.__count += 1
+
+    def close(self):
+        """
+        Finishes the output and flushes the file object.
+        :return: None
+        """
+        self._fp.flush()
+
+    def _write(self, _result, _index):
+        raise NotImplementedError
+
+
+class JsonWriter(ResultWriter):
+    """
+    Writes the results as compact JSON. A single result is written as an
+    object, several results as an array whose items are written as they
+    are received.
+    """
+
+    def __init__(self, _fp, _pretty=False, _array=True):
+        """
+        Initializes the writer.
+
+        :param _fp: The text file object receiving the results.
+        :param _pretty: If True, the results are indented and their keys
+        sorted, which is slower.
+        :param _array: If True, the results are written as a JSON array,
+        otherwise a single result is expected.
+        """
+        super().__init__(_fp)
+        self.__pretty = _pretty
+        self.__array = _array
+
+    def _write(self, _result, _index):
+        assert self.__array or _index == 0
+        if self.__pretty:
+            document = json.dumps(_result, indent=4, sort_keys=True)
+        else:
+            document = dumps(_result)
+        if self.__array:
+            self._fp.write("[\n" if _index == 0 else ",\n")
+        self._fp.write(document)
+
+    def close(self):
+        if self.__array:
+            self._fp.write("[]\n" if self.count == 0 else "\n]\n")
+        elif self.count > 0:
+            self._fp.write("\n")
+        super().close()
+
+
+class JsonLinesWriter(ResultWriter):
+    """
+    Writes one compact JSON document per line.
+    """
+
+    def _write(self, _result, _index):
+        self._fp.write(dumps(_result))
+        self._fp.write("\n")
+
+
+class CsvWriter(ResultWriter):
+    """
+    Writes one row per result. The columns are the metadata fields, prefixed
+    with "meta.", the parameters and the error message, in the order of the
+    first result. Fields missing from the first result are not written.
+    Lists and other composite values are written as JSON. Rows which are not
+    results, such as the aggregates of a query, are written with their own
+    keys as columns.
+    """
+
+    def __init__(self, _fp):
+        super().__init__(_fp)
+        self.__writer = None
+        self.__columns = None
+        self.__warned = False
+
+    def _write(self, _result, _index):
+        row = {}
+        is_result = any(k in _result for k in (PARAM_METADATA, PARAM_OTHER_PARAMS, PARAM_ERROR))
+        for key, value in _result.get(PARAM_METADATA, {}).items():
+            row[CSV_META_COLUMN.format(k=key)] = value
+        for key, value in (_result.get(PARAM_OTHER_PARAMS, {}) if is_result else _result).items():
+            if isinstance(value, (list, tuple, dict)):
+                value = dumps(value)
+            row[key] = value
+        if PARAM_ERROR in _result:
+            row[PARAM_ERROR] = _result[PARAM_ERROR]
+
+        if self.__writer is None:
+            self.__columns = list(row)
+            if is_result and PARAM_ERROR not in row:
+                self.__columns.append(PARAM_ERROR)
+            self.__writer = csv.DictWriter(
+                self._fp, fieldnames=self.__columns, extrasaction="ignore")
+            self.__writer.writeheader()
+        elif not self.__warned and not set(row).issubset(self.__columns):
+            logger.warning(MSG_WARNING_CSV_COLUMNS)
+            self.__warned = True
+        self.__writer.writerow(row)
+
+
+class MsgpackWriter(ResultWriter):
+    """
+    Writes the results as a sequence of MessagePack objects.
+    """
+
+    def __init__(self, _fp):
+        if msgpack is None:
+            raise Exception(MSG_ERROR_MODULE_MISSING.format(m="msgpack", f=FORMAT_MSGPACK))
+        super().__init__(_fp)
+        self.__packer = msgpack.Packer()
+
+    def _write(self, _result, _index):
+        self._fp.write(self.__packer.pack(_result))
+
+
+def new_writer(_format, _fp, _single=False):
+    """
+    Creates the writer of the given output format.
+
+    :param _format: One of bindex.const.OUTPUT_FORMATS.
+    :param _fp: The file object receiving the results. It must be opened in
+    binary mode if the writer is binary, see is_binary.
+    :param _single: True if a single result will be written, in which case
+    JSON formats write an object instead of an array.
+    :return: A ResultWriter object.
+    """
+    if _format == FORMAT_JSON:
+        return JsonWriter(_fp, _array=not _single)
+    if _format == FORMAT_PRETTY:
+        return JsonWriter(_fp, _pretty=True, _array=not _single)
+    if _format == FORMAT_JSONL:
+        return JsonLinesWriter(_fp)
+    if _format == FORMAT_CSV:
+        return CsvWriter(_fp)
+    if _format == FORMAT_MSGPACK:
+        return MsgpackWriter(_fp)
+    raise Exception(MSG_ERROR_UNKNOWN_FORMAT.format(f=str(_format)))
+
+
+def is_binary(_format):
+    """
+    Indicates if the output of the given format is binary.
+    :param _format: One of bindex.const.OUTPUT_FORMATS.
+    :return: True if the file receiving the results must be opened in binary
+    mode, False otherwise.
+    """
+    return _format == FORMAT_MSGPACK
+
+
+@contextlib.contextmanager
+def open_output(_path, _format):
+    """
+    Opens the file receiving the results in the mode required by the format.
+
+    :param _path: The path of the output file, or "-" for the standard
+    output, which is not closed.
+    :param _format: One of bindex.const.OUTPUT_FORMATS.
+    :return: A context manager giving the file object.
+    """
+    if _path == STANDARD_STREAM:
+        yield sys.stdout.buffer if is_binary(_format) else sys.stdout
+    elif is_binary(_format):
+        with open(_path, "wb") as fp:
+            yield fp
+    else:
+        with open(_path, "w", encoding="utf-8", newline="") as fp:
+            yield fp
@@ -245,9 +245,13 @@ setup_dict = dict(
         'License :: OSI Approved :: MIT License',
         'Natural Language :: English',
         'Operating System :: OS Independent',
-        'Programming Language :: Python :: 2.6',
-        'Programming Language :: Python :: 2.7',
-        'Programming Language :: Python :: 3.3',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'Programming Language :: Python :: Implementation :: PyPy',
         'Topic :: Documentation',
         'Topic :: Software Development :: Libraries :: Python Modules',
@@ -255,9 +259,17 @@ setup_dict = dict(
         'Topic :: System :: Software Distribution',
     ],
     packages=find_packages(exclude=(TESTS_DIRECTORY,)),
+    # bytes.isascii() and asyncio.get_running_loop() need Python 3.7.
+    python_requires='>=3.7',
     install_requires=[
                          # your module dependencies
                      ] + python_version_specific_requires,
+    # Optional dependencies, e.g. `pip install bindex[numpy]'.
+    extras_require={
+        'numpy': ['numpy'],
+        'msgpack': ['msgpack'],
+        'orjson': ['orjson'],
+    },
     # Allow tests to be run with `python setup.py test'.
     tests_require=[
         'pytest==2.5.1',
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    Helpers shared by the tests, writing the temporary definition and target
+    files they extract and loading the bindex.py program.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import importlib.util
+import json
+import os
+import tempfile
+
+
+def write_definition(_data, _directory=None, _name=None):
+    """
+    Writes a definition file.
+
+    :param _data: The content of the definition file, as a dictionary.
+    :param _directory: The directory of the file. If None, a temporary file
+    is created and must be removed by the caller.
+    :param _name: The name of the file in the directory.
+    :return: The path of the definition file.
+    """
+    if _directory is None:
+        fd, path = tempfile.mkstemp(suffix=".json")
+        fp = os.fdopen(fd, "w")
+    else:
+        path = os.path.join(_directory, _name)
+        fp = open(path, "w")
+    with fp:
+        json.dump(_data, fp)
+    return path
+
+
+def write_target(_content, _directory=None, _name=None):
+    """
+    Writes a target file.
+
+    :param _content: The bytes of the target file.
+    :param _directory: The directory of the file. If None, a temporary file
+    is created and must be removed by the caller.
+    :param _name: The name of the file in the directory.
+    :return: The path of the target file.
+    """
+    if _directory is None:
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        fp = os.fdopen(fd, "wb")
+    else:
+        path = os.path.join(_directory, _name)
+        fp = open(path, "wb")
+    with fp:
+        fp.write(_content)
+    return path
+
+
+def load_program():
+    """
+    Loads the bindex.py program, whose name is shadowed by the bindex
+    package.
+
+    :return: The module of the program.
+    """
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bindex.py")
+    spec = importlib.util.spec_from_file_location("bindex_program", path)
+    program = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(program)
+    return program
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    A description which can be long and explain the complete
+    functionality of this module even with indented code examples.
+    Class/Function however should not be documented here.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import asyncio
+import os
+import unittest
+
+from bindex import aio
+from bindex.const import *
+from bindex.extractor import Extractor
+from bindex.files import DefinitionFile
+
+
+class TestMain(unittest.TestCase):
+    def test_extract_async(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        def_file = os.path.join(basedir, "tests", "test.config")
+
+        extractor = Extractor(test_file, def_file)
+        result = asyncio.run(extractor.extract_async())
+        assert result[PARAM_OTHER_PARAMS]["TestParam1"] == 0xFFFFAA
+
+    def test_extract_many_async(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        def_file = os.path.join(basedir, "tests", "test.config")
+        missing_file = os.path.join(basedir, "tests", "missing.bin")
+
+        definition = DefinitionFile(def_file)
+        targets = [test_file] * 5 + [missing_file, test_file]
+        results = asyncio.run(aio.extract_many_async(definition, targets, _concurrency=2))
+
+        assert len(results) == len(targets)
+        assert PARAM_ERROR in results[5]
+        for i in (0, 1, 2, 3, 4, 6):
+            assert results[i][PARAM_OTHER_PARAMS]["TestParam1"] == 0xFFFFAA
+
+    def test_iter_extract_async_bounded(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        def_file = os.path.join(basedir, "tests", "test.config")
+        definition = DefinitionFile(def_file)
+
+        async def collect():
+            targets = []
+            async for target, result in aio.iter_extract_async(
+                    definition, (test_file for _ in range(10)), _concurrency=3):
+                assert PARAM_ERROR not in result
+                targets.append(target)
+            return targets
+
+        assert asyncio.run(collect()) == [test_file] * 10
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    A description which can be long and explain the complete
+    functionality of this module even with indented code examples.
+    Class/Function however should not be documented here.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import json
+import os
+import struct
+import unittest
+
+from bindex import anchor
+from bindex.const import *
+from bindex.extractor import Extractor
+from bindex.files import DefinitionFile
+
+from helpers import write_definition
+from helpers import write_target
+
+
+class TestMain(unittest.TestCase):
+    def test_anchor_create(self):
+        assert anchor.Anchor("mz", _pattern="4D 5A 90 00").pattern == b"MZ\x90\x00"
+        assert anchor.Anchor("pe", _regex="PE\\x00\\x00").regex is not None
+        for kwargs in [{}, {"_pattern": "4D5A", "_regex": "MZ"}, {"_pattern": "XY"},
+                       {"_pattern": ""}, {"_regex": "("}, {"_pattern": "4D", "_start": -1},
+                       {"_pattern": "4D", "_start": 10, "_end": 5}]:
+            self.assertRaises(Exception, anchor.Anchor, "bad", **kwargs)
+
+    def test_anchor_scan(self):
+        buffer = bytes(100) + b"HEAD" + bytes(50) + b"TAIL" + bytes(10) + b"HEAD"
+        anchors = [
+            anchor.Anchor("head", _pattern=b"HEAD".hex()),
+            anchor.Anchor("tail", _regex="T.IL"),
+            anchor.Anchor("second", _pattern=b"HEAD".hex(), _start=101),
+            anchor.Anchor("bounded", _pattern=b"TAIL".hex(), _end=157),
+            anchor.Anchor("missing", _pattern=b"NONE".hex())
+        ]
+        # Windows smaller than the patterns find matches across windows.
+        for window in [1, 3, 7, 1024]:
+            positions = anchor.scan(buffer, anchors, window)
+            assert positions == {"head": 100, "tail": 154, "second": 168,
+                                 "bounded": NO_VALUE, "missing": NO_VALUE}
+        assert anchor.scan(b"", anchors) == dict.fromkeys(positions)
+
+    def test_anchored_parameters(self):
+        data = {
+            "byte_order": "little",
+            "anchors": [
+                {"name": "record", "pattern": b"REC!".hex()},
+                {"name": "trailer", "regex": "END[0-9]"}
+            ],
+            "parameters": [
+                {"name": "magic", "offset": 0, "size": 4, "type": "ascii"},
+                {"name": "id", "offset": 4, "size": 4, "type": "I", "relative_to": "record"},
+                {"name": "count", "offset": 0, "size": 2, "type": "H", "relative_to": "id"},
+                {"name": "items", "offset": 0, "size": 2, "type": "H", "count": "count",
+                 "relative_to": "count"},
+                {"name": "end", "offset": 0, "size": 4, "type": "ascii", "relative_to": "trailer"}
+            ]
+        }
+        content = b"FILE" + bytes(37) + b"REC!" + struct.pack("<IH3H", 7, 3, 1, 2, 3) + b"END1"
+        tf = write_target(content)
+        df = write_definition(data)
+        try:
+            definition = DefinitionFile(df)
+            assert [(p.name, a, d) for p, a, d in definition.plan.anchored] == \
+                [("id", "record", 4), ("count", "record", 8), ("items", "record", 10),
+                 ("end", "trailer", 0)]
+            for use_mmap in (False, True):
+                result = Extractor(tf, definition, _use_mmap=use_mmap).extract()
+                assert result[PARAM_METADATA][PARAM_ANCHORS] == {"record": 41, "trailer": 57}
+                assert result[PARAM_OTHER_PARAMS] == {
+                    "magic": "FILE", "id": 7, "count": 3, "items": [1, 2, 3], "end": "END1"}
+
+            # Only the anchors of the requested parameters are searched for,
+            # and the count of an array is read without being returned.
+            extractor = Extractor(tf, definition, _stats=True, _hashes=[], _fields=["items"])
+            result = extractor.extract()
+            assert result[PARAM_METADATA][PARAM_ANCHORS] == {"record": 41}
+            assert result[PARAM_OTHER_PARAMS] == {"items": [1, 2, 3]}
+            assert extractor.stats.counters[COUNTER_PARAMETERS] == 2
+
+            # The filter only searches for the anchors of its own fields.
+            extractor = Extractor(tf, definition, _stats=True, _hashes=[],
+                                  _fields=["magic"], _where="id == 7")
+            result = extractor.extract()
+            assert result[PARAM_METADATA][PARAM_ANCHORS] == {"record": 41}
+            assert result[PARAM_OTHER_PARAMS] == {"magic": "FILE"}
+            assert extractor.stats.counters[COUNTER_PARAMETERS] == 2
+            result = Extractor(tf, definition, _where="id == 7").extract()
+            assert result[PARAM_METADATA][PARAM_ANCHORS] == {"record": 41, "trailer": 57}
+            assert result[PARAM_OTHER_PARAMS]["items"] == [1, 2, 3]
+
+            # The lazy values are decoded on access, the generator yields
+            # them in the order of their offsets.
+            data["parameters"].reverse()
+            with open(df, "w") as fp:
+                json.dump(data, fp)
+            definition = DefinitionFile(df)
+            for use_mmap in (False, True):
+                extractor = Extractor(tf, definition, _use_mmap=use_mmap, _fields=["items", "end"])
+                with extractor.lazy_values() as values:
+                    assert list(values) == ["end", "items"]
+                    assert values["items"] == [1, 2, 3]
+                    assert values.decoded == {"items": [1, 2, 3]}
+                    self.assertRaises(KeyError, values.__getitem__, "count")
+                assert values.closed
+                self.assertRaises(Exception, values.__getitem__, "end")
+                assert list(Extractor(tf, definition, _use_mmap=use_mmap).iter_values()) == [
+                    ("magic", "FILE"), ("id", 7), ("count", 3), ("items", [1, 2, 3]), ("end", "END1")]
+            assert Extractor(tf, definition, _fields=["end"], _where="id == 8").lazy_values() is None
+            assert list(Extractor(tf, definition, _where="id == 8").iter_values()) == []
+
+            # Parameters of an anchor missing from the target file are errors.
+            with open(tf, "wb") as fp:
+                fp.write(content[:-4])
+            result = Extractor(tf, definition).extract()
+            assert result[PARAM_METADATA][PARAM_ANCHORS]["trailer"] is NO_VALUE
+            assert result[PARAM_OTHER_PARAMS]["end"] == ERROR_VALUE
+            assert result[PARAM_OTHER_PARAMS]["id"] == 7
+        finally:
+            os.remove(tf)
+            os.remove(df)
+
+    def test_anchored_compatibility(self):
+        data = {
+            "anchors": [{"name": "record", "pattern": "00"}],
+            "compatibility": [
+                {"name": "magic", "offset": 0, "size": 1, "type": "B", "relative_to": "record",
+                 "compatible_with": [0]}
+            ]
+        }
+        df = write_definition(data)
+        try:
+            self.assertRaises(Exception, DefinitionFile, df)
+            data["compatibility"][0]["name"] = "record"
+            del data["compatibility"][0]["relative_to"]
+            with open(df, "w") as fp:
+                json.dump(data, fp)
+            self.assertRaises(Exception, DefinitionFile, df)
+        finally:
+            os.remove(df)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    Tests of the extraction of many target files in batch mode.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from bindex import batch
+from bindex.const import *
+from bindex.files import DefinitionFile
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        basedir = os.getcwd()
+        self.input_file = os.path.join(basedir, "tests", "input.bin")
+        self.definition = DefinitionFile(os.path.join(basedir, "tests", "test.config"))
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, "sub"))
+        shutil.copy(self.input_file, os.path.join(self.directory, "b.bin"))
+        shutil.copy(self.input_file, os.path.join(self.directory, "sub", "a.bin"))
+        with open(os.path.join(self.directory, "c.bin"), "wb") as fp:
+            fp.write(b"not compatible")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_expand_targets(self):
+        pattern = os.path.join(self.directory, "**", "*.bin")
+        targets = batch.expand_targets([self.directory, pattern, self.input_file])
+        assert targets == [
+            os.path.join(self.directory, "b.bin"),
+            os.path.join(self.directory, "c.bin"),
+            os.path.join(self.directory, "sub", "a.bin"),
+            self.input_file
+        ]
+
+    def test_expand_targets_file_list(self):
+        file_list = os.path.join(self.directory, "targets.txt")
+        with open(file_list, "w") as fp:
+            fp.write(self.input_file + "\n\n" + os.path.join(self.directory, "missing.bin") + "\n")
+        assert batch.expand_targets([], file_list) == [self.input_file]
+
+    def test_run_batch_with_pool(self):
+        targets = batch.expand_targets([self.directory])
+        output = io.StringIO()
+        count, failures = batch.run(self.definition, targets, output, _jobs=2,
+                                    _options={"_hashes": []})
+        assert count == 3
+        assert failures == 1
+
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [r[PARAM_METADATA][PARAM_ORIGINAL_FILE] for r in results] == targets
+        assert results[0][PARAM_OTHER_PARAMS]["TestParam1"] == 0xFFFFAA
+        assert PARAM_ERROR in results[1]
+        assert results[2][PARAM_OTHER_PARAMS]["TestParam2"] == "Test Comment Parameter"
+
+    def test_run_batch_where(self):
+        targets = batch.expand_targets([self.directory])
+        with open(targets[0], "r+b") as fp:
+            # TestParam1 is the little-endian integer at offset 28.
+            fp.seek(28)
+            fp.write((5).to_bytes(4, "little"))
+        output = io.StringIO()
+        count, failures = batch.run(self.definition, targets, output,
+                                    _options={"_hashes": [], "_where": "TestParam1 > 0xFFFF"})
+        assert count == 2
+        assert failures == 1
+
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [r[PARAM_METADATA][PARAM_ORIGINAL_FILE] for r in results] == targets[1:]
+        assert PARAM_ERROR in results[0]
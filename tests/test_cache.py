@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    Tests of the caches of compiled definition files and of results.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from bindex import batch
+from bindex.cache import DefinitionCache
+from bindex.cache import ResultCache
+from bindex.const import *
+from bindex.extractor import Extractor
+
+from helpers import load_program
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        basedir = os.getcwd()
+        self.input_file = os.path.join(basedir, "tests", "input.bin")
+        self.directory = tempfile.mkdtemp()
+        self.definition_file = os.path.join(self.directory, "test.config")
+        shutil.copy(os.path.join(basedir, "tests", "test.config"), self.definition_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_definition_cache_reuse(self):
+        cache_dir = os.path.join(self.directory, "cache")
+        first = DefinitionCache(cache_dir).load(self.definition_file)
+        assert len(os.listdir(os.path.join(cache_dir, DEFINITION_CACHE_SUBDIR))) == 1
+
+        cache = DefinitionCache(cache_dir)
+        second = cache.load(self.definition_file)
+        assert cache.hits == 1 and cache.misses == 0
+        assert second.content_hash == first.content_hash
+        assert second.file == self.definition_file
+        assert [p.name for p, _ in second.plan.parameters] == ["TestParam1", "TestParam2"]
+
+        extractor = Extractor(
+            _definition_file=second,
+            _target_file=self.input_file
+        )
+        result = extractor.extract()
+        assert result[PARAM_OTHER_PARAMS]["TestParam1"] == 0xFFFFAA
+
+    def test_definition_cache_invalidation(self):
+        cache_dir = os.path.join(self.directory, "cache")
+        DefinitionCache(cache_dir).load(self.definition_file)
+
+        with open(self.definition_file, "r") as fp:
+            data = json.load(fp)
+        data["parameters"] = data["parameters"][:1]
+        with open(self.definition_file, "w") as fp:
+            json.dump(data, fp)
+
+        cache = DefinitionCache(cache_dir)
+        definition = cache.load(self.definition_file)
+        assert cache.hits == 0 and cache.misses == 1
+        assert list(definition.parameters.keys()) == ["TestParam1"]
+
+    def test_definition_cache_corrupted_entry(self):
+        cache_dir = os.path.join(self.directory, "cache")
+        DefinitionCache(cache_dir).load(self.definition_file)
+        entries = os.path.join(cache_dir, DEFINITION_CACHE_SUBDIR)
+        for name in os.listdir(entries):
+            with open(os.path.join(entries, name), "wb") as fp:
+                fp.write(b"garbage")
+
+        cache = DefinitionCache(cache_dir)
+        definition = cache.load(self.definition_file)
+        assert cache.misses == 1
+        assert "TestParam2" in definition.parameters
+
+    def __target(self, _name="target.bin"):
+        target = os.path.join(self.directory, _name)
+        shutil.copy(self.input_file, target)
+        return target
+
+    def __extract(self, _definition, _target):
+        return Extractor(_definition_file=_definition, _target_file=_target).extract()
+
+    def test_result_cache_reuse(self):
+        definition = DefinitionCache(os.path.join(self.directory, "cache")).load(self.definition_file)
+        target = self.__target()
+        with ResultCache(self.directory) as results:
+            assert results.get(target, definition) is None
+            results.put(target, definition, {}, self.__extract(definition, target))
+
+        with ResultCache(self.directory) as results:
+            result = results.get(target, definition, {})
+            assert results.hits == 1 and results.misses == 0
+            assert result[PARAM_OTHER_PARAMS]["TestParam1"] == 0xFFFFAA
+
+            # Touched but unchanged: the digest of the content decides.
+            stat = os.stat(target)
+            os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            assert results.contains(target, definition, {})
+
+            # Other options may produce another result.
+            assert not results.contains(target, definition, {"_hashes": []})
+
+            # Without the digest of the extraction, the file is not hashed
+            # and a touched file is extracted again.
+            options = {"_hashes": []}
+            results.put(target, definition, options, Extractor(target, definition, **options).extract())
+            assert results.contains(target, definition, options)
+            stat = os.stat(target)
+            os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            assert not results.contains(target, definition, options)
+
+            with open(target, "r+b") as fp:
+                fp.write(b"\x01")
+            assert results.get(target, definition, {}) is None
+            assert results.misses == 3
+
+    def test_result_cache_definition_change(self):
+        target = self.__target()
+        definition = DefinitionCache(os.path.join(self.directory, "cache")).load(self.definition_file)
+        with ResultCache(self.directory) as results:
+            results.put(target, definition, {}, self.__extract(definition, target))
+
+            with open(self.definition_file, "r") as fp:
+                data = json.load(fp)
+            data["parameters"] = data["parameters"][:1]
+            with open(self.definition_file, "w") as fp:
+                json.dump(data, fp)
+            changed = DefinitionCache(os.path.join(self.directory, "cache")).load(self.definition_file)
+            assert not results.contains(target, changed, {})
+
+    def test_result_cache_eviction(self):
+        definition = DefinitionCache(os.path.join(self.directory, "cache")).load(self.definition_file)
+        targets = [self.__target("target{n:d}.bin".format(n=n)) for n in range(4)]
+        result = self.__extract(definition, targets[0])
+        with ResultCache(self.directory) as results:
+            results.put(targets[0], definition, {}, result)
+            length = results.size
+        with ResultCache(self.directory, _max_size=length * 2) as results:
+            for target in targets[1:]:
+                results.put(target, definition, {}, result)
+            assert results.size <= length * 2
+            assert not results.contains(targets[0], definition, {})
+            assert results.contains(targets[-1], definition, {})
+
+    def test_result_cache_batch(self):
+        definition = DefinitionCache(os.path.join(self.directory, "cache")).load(self.definition_file)
+        targets = [self.__target("target{n:d}.bin".format(n=n)) for n in range(3)]
+        with ResultCache(self.directory) as results:
+            first = list(batch.extract_many(definition, targets, _cache=results))
+            assert results.misses == 3
+            second = list(batch.extract_many(definition, targets, _cache=results))
+            assert results.hits == 3
+            # The predicate is applied to the stored results.
+            options = {"_where": "TestParam1 != 0xFFFFAA"}
+            assert list(batch.extract_many(definition, targets, _options=options, _cache=results)) == []
+            assert results.hits == 6
+        assert [r[PARAM_OTHER_PARAMS] for r in first] == [r[PARAM_OTHER_PARAMS] for r in second]
+
+    def test_result_cache_filtered(self):
+        definition = DefinitionCache(os.path.join(self.directory, "cache")).load(self.definition_file)
+        targets = [self.__target("target{n:d}.bin".format(n=n)) for n in range(3)]
+        options = {"_where": "TestParam1 < 10", "_hashes": []}
+        with ResultCache(self.directory) as results:
+            assert list(batch.extract_many(definition, targets, _options=options, _cache=results)) == []
+            assert results.misses == 3
+            # The target files which do not match are not extracted again,
+            # unless the predicate or the target file changes.
+            assert list(batch.extract_many(definition, targets, _options=options, _cache=results)) == []
+            assert results.hits == 3 and results.misses == 3
+            assert results.is_filtered(targets[0], definition, {"_where": "TestParam1 < 10", "_hashes": []})
+            assert not results.is_filtered(targets[0], definition, {"_where": "TestParam1 < 11", "_hashes": []})
+            with open(targets[0], "ab") as fp:
+                fp.write(b"\x00")
+            assert not results.is_filtered(targets[0], definition, options)
+
+    def test_result_cache_where_fields(self):
+        program = load_program()
+        target = self.__target()
+        output = os.path.join(self.directory, "output.json")
+        argv = ["bindex.py", "-i", target, "-d", self.definition_file, "-o", output, "-f",
+                "--format", "json", "--cache-dir", os.path.join(self.directory, "cache"),
+                "--fields", "TestParam2"]
+        # The cached result does not hold TestParam1, read by the predicate.
+        for _ in range(2):
+            assert program.main(argv + ["--where", "TestParam1 > 5"]) == 0
+            with open(output, "r") as fp:
+                assert json.load(fp)[PARAM_OTHER_PARAMS] == {"TestParam2": "Test Comment Parameter"}
+            os.remove(output)
+        for _ in range(2):
+            assert program.main(argv + ["--where", "TestParam1 < 5"]) == 0
+            assert not os.path.exists(output)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    A description which can be long and explain the complete
+    functionality of this module even with indented code examples.
+    Class/Function however should not be documented here.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import io
+import json
+import logging
+import os
+import struct
+import unittest
+
+from bindex import carve
+from bindex.const import *
+from bindex.files import DefinitionFile
+from bindex.files import TargetFile
+
+from helpers import write_definition
+from helpers import write_target
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        data = {
+            "byte_order": "little",
+            "compatibility": [
+                {"name": "magic", "offset": 0, "size": 4, "type": "ascii", "compatible_with": ["CFG!"]},
+                {"name": "version", "offset": 0, "size": 1, "type": "B", "relative_to": "magic",
+                 "compatible_with": [1, 2]}
+            ],
+            "parameters": [
+                {"name": "id", "offset": 0, "size": 4, "type": "I", "relative_to": "version"}
+            ]
+        }
+        # Occurrences at 10, 60 and 97, which spans two chunks of 100 bytes,
+        # and a candidate with an incompatible version at 30.
+        content = bytearray(200)
+        for offset, version, ident in [(10, 1, 111), (30, 9, 222), (60, 2, 333), (97, 1, 444)]:
+            content[offset:offset + 9] = b"CFG!" + struct.pack("<BI", version, ident)
+        self.data = data
+        self.target = write_target(bytes(content))
+        self.definition = write_definition(data)
+
+    def tearDown(self):
+        os.remove(self.target)
+        os.remove(self.definition)
+
+    def test_target_base(self):
+        target = TargetFile(self.target, _base=60)
+        with target:
+            assert bytes(target.read_span(0, 4)) == b"CFG!"
+            assert bytes(target.read_span(139, 10)) == b"\x00"
+
+    def test_signature(self):
+        definition = DefinitionFile(self.definition)
+        parameter, offset = carve.signature(definition)
+        assert parameter.name == "magic" and offset == 0
+
+    def test_carve(self):
+        definition = DefinitionFile(self.definition)
+        for jobs, chunk_size in [(1, 1 << 20), (1, 100), (2, 100), (2, 7)]:
+            results = list(carve.carve(definition, self.target, jobs, _chunk_size=chunk_size))
+            assert [r[PARAM_METADATA][PARAM_BASE_OFFSET] for r in results] == [10, 60, 97]
+            assert [r[PARAM_OTHER_PARAMS]["id"] for r in results] == [111, 333, 444]
+
+    def test_carve_incompatible_candidate(self):
+        # A version which cannot be compared as raw bytes is decoded, and the
+        # incompatible candidate is skipped without logging an error.
+        self.data["compatibility"][1]["compatible_with"] = [1.0, 2]
+        path = write_definition(self.data)
+        try:
+            definition = DefinitionFile(path)
+            assert definition.compatibility["version"].compatible_bytes is None
+            with self.assertLogs("bindex", "DEBUG") as logs:
+                results = list(carve.carve(definition, self.target, _chunk_size=50))
+            assert [r[PARAM_METADATA][PARAM_BASE_OFFSET] for r in results] == [10, 60, 97]
+            assert [r.levelno for r in logs.records if "offset 30" in r.getMessage()] == [logging.DEBUG]
+            assert all(r.levelno < logging.WARNING for r in logs.records)
+        finally:
+            os.remove(path)
+
+    def test_carve_run(self):
+        output = io.StringIO()
+        count = carve.run(DefinitionFile(self.definition), self.target, output, _chunk_size=50)
+        assert count == 3
+        lines = output.getvalue().splitlines()
+        assert json.loads(lines[2])[PARAM_METADATA][PARAM_BASE_OFFSET] == 97
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    Tests of the compiled struct formats and of the fusion of adjacent
+    numeric parameters.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import struct
+import unicodedata
+import unittest
+
+from bindex import codec
+from bindex.parameter import Parameter
+
+
+class TestMain(unittest.TestCase):
+    def test_compile_format_cached(self):
+        s1 = codec.compile_format("I")
+        s2 = codec.compile_format("I")
+        assert s1 is s2
+        assert s1.size == 4
+
+    def test_compile_format_byte_order(self):
+        assert codec.compile_format("H", "big").format == ">H"
+        assert codec.compile_format("H", "<").format == "<H"
+        # A byte order in the format has precedence over the default.
+        assert codec.compile_format(">H", "little").format == ">H"
+
+    def test_invalid_byte_order(self):
+        with self.assertRaises(Exception):
+            codec.byte_order_prefix("middle")
+        with self.assertRaises(Exception):
+            Parameter(_name="p", _offset=0, _size=2, _type="H", _byte_order="middle")
+
+    def test_fuse_adjacent_parameters(self):
+        params = [
+            (Parameter(_name="a", _offset=0, _size=2, _type="H", _byte_order="big"), 0),
+            (Parameter(_name="b", _offset=0, _size=4, _type="I", _byte_order="big"), 2),
+            (Parameter(_name="c", _offset=0, _size=4, _type="ascii"), 6),
+            (Parameter(_name="d", _offset=0, _size=2, _type="<H"), 10),
+            (Parameter(_name="e", _offset=0, _size=2, _type="<h"), 12),
+            (Parameter(_name="f", _offset=0, _size=2, _type=">H"), 14)
+        ]
+        groups = codec.fuse(params)
+        assert [(fmt, [p.name for p, _ in group]) for fmt, group in groups] == [
+            (">HI", ["a", "b"]),
+            (None, ["c"]),
+            ("<Hh", ["d", "e"]),
+            (None, ["f"])
+        ]
+
+        buffer = struct.pack(">HI", 1, 2) + b"abcd" + struct.pack("<Hh", 3, -4) + struct.pack(">H", 5)
+        assert codec.compile_format(groups[0][0]).unpack_from(buffer, 0) == (1, 2)
+        assert codec.compile_format(groups[2][0]).unpack_from(buffer, 10) == (3, -4)
+
+    def test_fuse_skips_gaps_and_multiple_values(self):
+        params = [
+            (Parameter(_name="a", _offset=0, _size=2, _type="<H"), 0),
+            (Parameter(_name="b", _offset=0, _size=2, _type="<H"), 4),
+            (Parameter(_name="c", _offset=0, _size=4, _type="<2H"), 6)
+        ]
+        groups = codec.fuse(params)
+        assert [fmt for fmt, _ in groups] == [None, None, None]
+
+    def test_control_code_points_match_unicode(self):
+        control = [i for i in range(0x110000) if unicodedata.category(chr(i)) == "Cc"]
+        assert list(codec.CONTROL_CODE_POINTS) == control
+
+    def test_decode_string_removes_control_characters(self):
+        assert codec.decode_string(b"Test Comment Parameter\x00\x00", "utf-8") == "Test Comment Parameter"
+        assert codec.decode_string(b"  DeepCode\x07 ", "ascii") == "DeepCode"
+        assert codec.decode_string(b"ab \x00", "ascii") == "ab "
+        assert codec.decode_string("\x85café\x00".encode("utf-8"), "utf-8") == "café"
+        assert codec.decode_string("1.09\x01".encode("utf-16"), "utf-16") == "1.09"
+        assert codec.decode_string(memoryview(b"Deep\x00Code"), "ascii") == "DeepCode"
+        assert codec.decode_string(b"ab\x00", "ascii", False) == "ab\x00"
+
+    def test_decode_string_invalid_ascii(self):
+        with self.assertRaises(UnicodeDecodeError):
+            codec.decode_string(b"ab\xff", "ascii")
+
+    def test_decode_array(self):
+        buffer = b"\xff" + struct.pack("<4I", 1, 2, 3, 4)
+        param = Parameter("a", 0, 4, "I", _byte_order="little", _count=4)
+        assert param.size == 16
+        assert codec.decode(param, buffer, 1) == [1, 2, 3, 4]
+        assert codec.decode(param, buffer, 1, _count=2) == [1, 2]
+
+        padded = Parameter("b", 0, 8, "<I", _count=2)
+        buffer = struct.pack("<IIII", 1, 0, 2, 0)
+        assert codec.decode(padded, buffer) == [1, 2]
+
+        records = Parameter("c", 0, 4, "<HH", _count=2)
+        buffer = struct.pack("<HHHH", 1, 2, 3, 4)
+        assert codec.decode(records, buffer) == [(1, 2), (3, 4)]
+
+        # The count of a "s" code is a length, the elements are decoded one
+        # by one.
+        chars = Parameter("d", 0, 1, "s", _count=4)
+        assert codec.decode(chars, bytes(range(4))) == [b"\x00", b"\x01", b"\x02", b"\x03"]
+        letters = Parameter("e", 0, 1, "c", _count=2)
+        assert codec.decode(letters, b"AB") == [b"A", b"B"]
+
+    def test_fuse_skips_arrays(self):
+        a = Parameter("a", 0, 2, "<H")
+        b = Parameter("b", 0, 2, "<H", _count=1)
+        groups = codec.fuse([(a, 0), (b, 2)])
+        assert [fmt for fmt, _ in groups] == [None, None]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    Tests of the chunked hashing of target files.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import hashlib
+import os
+import unittest
+
+from bindex import digest
+from bindex.const import *
+from bindex.extractor import Extractor
+from bindex.files import TargetFile
+
+INPUT_SHA1 = "7ed585388d7446778cd267b0330595c987de0302"
+
+
+class TestMain(unittest.TestCase):
+    def test_hash_file_multiple_digests(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        with open(test_file, "rb") as fp:
+            data = fp.read()
+
+        hashes = digest.hash_file(test_file, ["sha1", "sha256", "md5", "blake2"], _chunk_size=7)
+        assert hashes["sha1"] == INPUT_SHA1
+        assert hashes["sha256"] == hashlib.sha256(data).hexdigest()
+        assert hashes["md5"] == hashlib.md5(data).hexdigest()
+        assert hashes["blake2"] == hashlib.blake2b(data).hexdigest()
+
+    def test_hash_unknown_algorithm(self):
+        with self.assertRaises(Exception):
+            digest.new_digests(["sha1", "nohash"])
+
+    def test_target_file_digest_mapped(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        tf = TargetFile(test_file, _use_mmap=True)
+        assert tf.sha1() == INPUT_SHA1
+        tf.open()
+        assert tf.digest(["sha1"], _chunk_size=5) == {"sha1": INPUT_SHA1}
+        tf.close()
+
+    def test_extractor_hashes(self):
+        basedir = os.getcwd()
+        tf = os.path.join(basedir, "tests", "input.bin")
+        df = os.path.join(basedir, "tests", "test.config")
+        extractor = Extractor(
+            _definition_file=df,
+            _target_file=tf,
+            _use_mmap=True,
+            _hashes=["sha1", "sha256"]
+        )
+        result = extractor.extract()
+        assert result[PARAM_METADATA][PARAM_ORIGINAL_FILE_HASH] == INPUT_SHA1
+        assert "sha256" in result[PARAM_METADATA]
+        assert result[PARAM_OTHER_PARAMS]["TestParam1"] == 0xFFFFAA
+
+    def test_extractor_no_hash(self):
+        basedir = os.getcwd()
+        tf = os.path.join(basedir, "tests", "input.bin")
+        df = os.path.join(basedir, "tests", "test.config")
+        extractor = Extractor(
+            _definition_file=df,
+            _target_file=tf,
+            _hashes=[]
+        )
+        result = extractor.extract()
+        assert PARAM_ORIGINAL_FILE_HASH not in result[PARAM_METADATA]
@@ -12,11 +12,15 @@
     :license: MIT, see LICENSE for more details
 """
 import os
+import struct
 import unittest
 
 from bindex.const import *
 from bindex.extractor import Extractor
 
+from helpers import write_definition
+from helpers import write_target
+
 
 class TestMain(unittest.TestCase):
     def test_extractor_create(self):
@@ -55,3 +59,182 @@ class TestMain(unittest.TestCase):
         assert "TestParam2" in result[PARAM_OTHER_PARAMS].keys()
         assert result[PARAM_OTHER_PARAMS]["TestParam1"] == 0xFFFFAA
         assert result[PARAM_OTHER_PARAMS]["TestParam2"] == "Test Comment Parameter"
+
+    def test_extractor_parameters_mmap(self):
+        basedir = os.getcwd()
+        tf = os.path.join(basedir, "tests", "input.bin")
+        df = os.path.join(basedir, "tests", "test.config")
+        extractor = Extractor(
+            _definition_file=df,
+            _target_file=tf,
+            _use_mmap=True
+        )
+        result = extractor.extract()
+        assert result[PARAM_OTHER_PARAMS]["TestParam1"] == 0xFFFFAA
+        assert result[PARAM_OTHER_PARAMS]["TestParam2"] == "Test Comment Parameter"
+
+    def test_extractor_parameters_gap_tolerance(self):
+        basedir = os.getcwd()
+        tf = os.path.join(basedir, "tests", "input.bin")
+        df = os.path.join(basedir, "tests", "test.config")
+        extractor = Extractor(
+            _definition_file=df,
+            _target_file=tf,
+            _gap_tolerance=64
+        )
+        result = extractor.extract()
+        assert list(result[PARAM_OTHER_PARAMS].keys()) == ["TestParam1", "TestParam2"]
+        assert result[PARAM_OTHER_PARAMS]["TestParam1"] == 0xFFFFAA
+        assert result[PARAM_OTHER_PARAMS]["TestParam2"] == "Test Comment Parameter"
+
+    def test_extractor_fused_parameters_byte_order(self):
+        basedir = os.getcwd()
+        tf = os.path.join(basedir, "tests", "input.bin")
+        data = {
+            "byte_order": "big",
+            "parameters": [
+                {"name": "high", "offset": 28, "size": 2, "type": "H"},
+                {"name": "low", "offset": 0, "size": 2, "type": "H", "relative_to": "high"},
+                {"name": "raw", "offset": 28, "size": 4, "type": "<I"}
+            ]
+        }
+        df = write_definition(data)
+        try:
+            extractor = Extractor(
+                _definition_file=df,
+                _target_file=tf
+            )
+            result = extractor.extract()
+            assert result[PARAM_OTHER_PARAMS]["high"] == 0xAAFF
+            assert result[PARAM_OTHER_PARAMS]["low"] == 0xFF00
+            assert result[PARAM_OTHER_PARAMS]["raw"] == 0xFFFFAA
+        finally:
+            os.remove(df)
+
+    def test_extractor_format_size_mismatch(self):
+        data = {
+            "byte_order": "little",
+            "parameters": [
+                {"name": "short", "offset": 0, "size": 2, "type": "I"},
+                {"name": "long", "offset": 2, "size": 4, "type": "H"},
+                {"name": "exact", "offset": 6, "size": 2, "type": "H"}
+            ]
+        }
+        tf = write_target(bytes(range(8)))
+        df = write_definition(data)
+        try:
+            # Parameters whose format does not match their size are errors,
+            # even when their neighbours are read with the same span.
+            values = Extractor(tf, df, _hashes=[]).extract()[PARAM_OTHER_PARAMS]
+            assert values == {"short": ERROR_VALUE, "long": ERROR_VALUE, "exact": 0x0706}
+        finally:
+            os.remove(tf)
+            os.remove(df)
+
+    def test_extractor_is_compatible_raw_bytes(self):
+        basedir = os.getcwd()
+        tf = os.path.join(basedir, "tests", "input.bin")
+        for accepted, expected in (([0xFFFFAA, 0x10], True), ([0x10], False)):
+            data = {
+                "compatibility": [
+                    {"name": "manufacturer", "offset": 0, "size": 8, "type": "ascii",
+                     "compatible_with": ["DeepCode"]},
+                    {"name": "number", "offset": 28, "size": 4, "type": "<I",
+                     "compatible_with": accepted}
+                ],
+                "parameters": []
+            }
+            df = write_definition(data)
+            try:
+                extractor = Extractor(
+                    _definition_file=df,
+                    _target_file=tf,
+                    _use_mmap=True
+                )
+                assert extractor.is_compatible() == expected
+            finally:
+                os.remove(df)
+
+    def test_extractor_arrays(self):
+        data = {
+            "byte_order": "little",
+            "parameters": [
+                {"name": "count", "offset": 0, "size": 2, "type": "H"},
+                {"name": "table", "offset": 0, "size": 4, "type": "I", "count": "count",
+                 "relative_to": "count"},
+                {"name": "pairs", "offset": 14, "size": 4, "type": "HH", "count": 2},
+                {"name": "tags", "offset": 10, "size": 2, "type": "ascii", "count": 2,
+                 "relative_to": "pairs"}
+            ]
+        }
+        content = struct.pack("<H3I", 3, 10, 20, 30)
+        tf = write_target(content + struct.pack("<4H", 1, 2, 3, 4) + bytes(10) + b"ABCD")
+        df = write_definition(data)
+        try:
+            for use_mmap in (False, True):
+                result = Extractor(tf, df, _use_mmap=use_mmap).extract()
+                values = result[PARAM_OTHER_PARAMS]
+                assert values["table"] == [10, 20, 30]
+                assert values["pairs"] == [(1, 2), (3, 4)]
+                assert values["tags"] == ["AB", "CD"]
+        finally:
+            os.remove(tf)
+            os.remove(df)
+
+    def test_extractor_where(self):
+        basedir = os.getcwd()
+        tf = os.path.join(basedir, "tests", "input.bin")
+        df = os.path.join(basedir, "tests", "test.config")
+
+        extractor = Extractor(tf, df, _stats=True, _where="TestParam1 == 0xFFFFAA")
+        result = extractor.extract()
+        assert result[PARAM_OTHER_PARAMS]["TestParam2"] == "Test Comment Parameter"
+        assert PARAM_ORIGINAL_FILE_HASH in result[PARAM_METADATA]
+        # TestParam1 is decoded once, by the filter.
+        assert extractor.stats.counters[COUNTER_PARAMETERS] == 2
+
+        # Only the compatibility parameters and TestParam1 are read before
+        # the extraction stops, and the target file is not hashed.
+        extractor = Extractor(tf, df, _stats=True, _where="TestParam1 < 10 or TestParam1 == null")
+        assert extractor.extract() is None
+        assert extractor.stats.counters[COUNTER_PARAMETERS] == 1
+        assert PHASE_HASHING not in extractor.stats.timings
+        assert PHASE_FILTER in extractor.stats.timings
+
+    def test_extractor_fields(self):
+        basedir = os.getcwd()
+        tf = os.path.join(basedir, "tests", "input.bin")
+        df = os.path.join(basedir, "tests", "test.config")
+
+        # TestParam2 is relative to TestParam1, whose offset is resolved
+        # when the definition is loaded, so TestParam1 is not read.
+        extractor = Extractor(tf, df, _stats=True, _hashes=[], _fields=["TestParam2", "Unknown"])
+        result = extractor.extract()
+        assert result[PARAM_OTHER_PARAMS] == {"TestParam2": "Test Comment Parameter"}
+        assert extractor.stats.counters[COUNTER_PARAMETERS] == 1
+        assert extractor.stats.counters[COUNTER_READ_CALLS] == 2
+
+    def test_extractor_iter_values(self):
+        # The count of the array is stored after the array.
+        data = {
+            "byte_order": "little",
+            "parameters": [
+                {"name": "count", "offset": 12, "size": 1, "type": "B"},
+                {"name": "table", "offset": 0, "size": 4, "type": "I", "count": "count"},
+                {"name": "name", "offset": 13, "size": 3, "type": "ascii"}
+            ]
+        }
+        tf = write_target(struct.pack("<3IB", 10, 20, 30, 3) + b"ABC")
+        df = write_definition(data)
+        try:
+            for use_mmap in (False, True):
+                extractor = Extractor(tf, df, _use_mmap=use_mmap, _hashes=[])
+                assert list(extractor.iter_values()) == [
+                    ("table", [10, 20, 30]), ("count", 3), ("name", "ABC")]
+                with extractor.lazy_values() as values:
+                    assert values["table"] == [10, 20, 30]
+                    assert values.decoded == {"count": 3, "table": [10, 20, 30]}
+                    assert dict(values) == extractor.extract()[PARAM_OTHER_PARAMS]
+        finally:
+            os.remove(tf)
+            os.remove(df)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    Tests of the index of the values extracted from many target files.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from bindex import batch
+from bindex.const import *
+from bindex.files import DefinitionFile
+from bindex.index import ResultIndex
+
+from helpers import load_program
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        basedir = os.getcwd()
+        self.input_file = os.path.join(basedir, "tests", "input.bin")
+        self.definition_file = os.path.join(basedir, "tests", "test.config")
+        self.directory = tempfile.mkdtemp()
+        self.index_file = os.path.join(self.directory, "index.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def __targets(self, _count=3):
+        targets = []
+        for n in range(_count):
+            target = os.path.join(self.directory, "target{n:d}.bin".format(n=n))
+            with open(self.input_file, "rb") as fp:
+                data = bytearray(fp.read())
+            # TestParam1 is the little-endian integer at offset 28.
+            data[28:32] = (0xFFFFAA + n).to_bytes(4, "little")
+            with open(target, "wb") as fp:
+                fp.write(data)
+            targets.append(target)
+        return targets
+
+    def __index(self, _count=3):
+        definition = DefinitionFile(self.definition_file)
+        targets = self.__targets(_count)
+        with ResultIndex(self.index_file) as index:
+            index.add_definition(definition)
+            for result in batch.extract_many(definition, targets, _options={"_hashes": []}):
+                index.add(result)
+        return targets
+
+    def test_index_query(self):
+        targets = self.__index()
+        with ResultIndex(self.index_file) as index:
+            assert len(index) == 3
+            assert index.columns == {"manufacturer": INDEX_TEXT, "version": INDEX_TEXT,
+                                     "TestParam1": INDEX_INTEGER, "TestParam2": INDEX_TEXT}
+
+            # The values of the compatibility parameters are indexed too.
+            results = list(index.query('version == "1.09.145" and TestParam1 > 0xFFFFAA'))
+            assert [r[PARAM_METADATA][PARAM_ORIGINAL_FILE] for r in results] == targets[1:]
+            assert results[0][PARAM_OTHER_PARAMS]["manufacturer"] == "DeepCode"
+
+            results = list(index.query("TestParam1 > 0xFFFFAA", _fields=["TestParam1"]))
+            assert [r[PARAM_METADATA][PARAM_ORIGINAL_FILE] for r in results] == targets[1:]
+            assert [r[PARAM_OTHER_PARAMS] for r in results] == \
+                [{"TestParam1": 0xFFFFAB}, {"TestParam1": 0xFFFFAC}]
+
+            assert index.count("TestParam2 == 'Test Comment Parameter'") == 3
+            assert index.aggregate(["count", "max(TestParam1)"], _group_by="TestParam2") == [
+                {"TestParam2": "Test Comment Parameter", "count": 3, "max(TestParam1)": 0xFFFFAC}]
+            with self.assertRaises(Exception):
+                index.count("Unknown == 1")
+            with self.assertRaises(Exception):
+                index.aggregate(["median(TestParam1)"])
+
+    def test_index_program(self):
+        program = load_program()
+        targets = self.__targets()
+        assert program.main(["bindex.py", "index", "-b"] + targets + [
+            "-d", self.definition_file, "-x", self.index_file,
+            "--cache-dir", os.path.join(self.directory, "cache")]) == 0
+
+        output = os.path.join(self.directory, "output.jsonl")
+        query = ["bindex.py", "query", "-x", self.index_file, "-o", output]
+        assert program.main(query + ["-w", "TestParam1 > 0xFFFFAA and version == '1.09.145'",
+                                     "-s", "TestParam1"]) == 0
+        with open(output, "r") as fp:
+            results = [json.loads(line) for line in fp]
+        assert [r[PARAM_METADATA][PARAM_ORIGINAL_FILE] for r in results] == targets[1:]
+        assert [r[PARAM_OTHER_PARAMS] for r in results] == [{"TestParam1": 0xFFFFAB}, {"TestParam1": 0xFFFFAC}]
+
+        assert program.main(query + ["-w", "TestParam1 < 0xFFFFAC", "-a", "count", "max(TestParam1)",
+                                     "-g", "TestParam2"]) == 0
+        with open(output, "r") as fp:
+            assert [json.loads(line) for line in fp] == [
+                {"TestParam2": "Test Comment Parameter", "count": 2, "max(TestParam1)": 0xFFFFAB}]
+
+    def test_index_replace(self):
+        targets = self.__index()
+        with ResultIndex(self.index_file) as index:
+            index.add({
+                PARAM_METADATA: {PARAM_ORIGINAL_FILE: targets[0]},
+                PARAM_ERROR: MSG_ERROR_NOT_COMPATIBLE
+            })
+            index.add({
+                PARAM_METADATA: {PARAM_ORIGINAL_FILE: targets[1]},
+                PARAM_OTHER_PARAMS: {"TestParam1": ERROR_VALUE, "Table": [1, 2]}
+            })
+            assert len(index) == 3
+            assert index.columns["Table"] == INDEX_JSON
+            results = list(index.query())
+            assert results[0][PARAM_ERROR] == MSG_ERROR_NOT_COMPATIBLE
+            assert results[1][PARAM_OTHER_PARAMS] == {"Table": [1, 2]}
+            assert index.count("TestParam1 == null") == 2
+
+            # Integers which do not fit in 64 bits are not indexed.
+            with self.assertLogs("bindex.index", "WARNING"):
+                index.add({
+                    PARAM_METADATA: {PARAM_ORIGINAL_FILE: targets[2]},
+                    PARAM_OTHER_PARAMS: {"TestParam1": 2 ** 64 - 1}
+                })
+            assert index.count("TestParam1 == null") == 3
@@ -156,3 +156,58 @@ class TestMain(unittest.TestCase):
         )
 
         assert not param.is_compatible(cvalue)
+
+    def test_compatible_bytes_exact_size_string(self):
+        param = CompatibilityParameter(
+            _name="magicId",
+            _offset=0,
+            _size=2,
+            _type="ascii",
+            _compatible_with=["MZ", "ZM"]
+        )
+        assert param.compatible_bytes == frozenset([b"MZ", b"ZM"])
+        assert param.is_compatible_raw(memoryview(b"MZ"))
+        assert not param.is_compatible_raw(b"PE")
+
+    def test_compatible_bytes_padded_string(self):
+        param = CompatibilityParameter(
+            _name="manufacturer",
+            _offset=0,
+            _size=10,
+            _type="ascii",
+            _compatible_with=["ShallwCode", "DeepCode"]
+        )
+        # "DeepCode" is padded in the target file, the value must be decoded.
+        assert param.compatible_bytes is None
+        assert param.is_compatible("DeepCode")
+
+    def test_compatible_bytes_integer(self):
+        param = CompatibilityParameter(
+            _name="signature",
+            _offset=0,
+            _size=4,
+            _type="<I",
+            _compatible_with=[0x4550, 0x1FFFFFFFF]
+        )
+        assert param.compatible_bytes == frozenset([b"PE\x00\x00"])
+        assert param.is_compatible(0x4550)
+        assert not param.is_compatible(0x4551)
+
+    def test_compatible_bytes_float(self):
+        param = CompatibilityParameter(
+            _name="ratio",
+            _offset=0,
+            _size=4,
+            _type="f",
+            _compatible_with=[0.0]
+        )
+        assert param.compatible_bytes is None
+
+    def test_str_without_relative_parameter(self):
+        param = Parameter(
+            _name="param",
+            _offset=4,
+            _size=4,
+            _type="I"
+        )
+        assert "'param'" in str(param)
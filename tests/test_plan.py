@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    Tests of the extraction plan compiled from the definition files.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import os
+import unittest
+
+from bindex.files import DefinitionFile
+
+from helpers import write_definition
+
+
+class TestMain(unittest.TestCase):
+    def test_plan_absolute_offsets(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "test.config")
+        definition_file = DefinitionFile(test_file)
+        plan = definition_file.plan
+
+        offsets = {p.name: o for p, o in plan.compatibility + plan.parameters}
+        assert offsets["manufacturer"] == 0
+        assert offsets["version"] == 12
+        assert offsets["TestParam1"] == 28
+        assert offsets["TestParam2"] == 32
+
+    def test_plan_topological_order(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "test.config")
+        definition_file = DefinitionFile(test_file)
+        names = [p.name for p in definition_file.plan.order]
+        assert names.index("manufacturer") < names.index("version")
+        assert names.index("version") < names.index("TestParam1")
+        assert names.index("TestParam1") < names.index("TestParam2")
+
+    def test_plan_long_chain(self):
+        count = 20000
+        params = [{"name": "p0", "offset": 0, "size": 2, "type": "H"}]
+        for i in range(1, count):
+            params.append({
+                "name": "p{:d}".format(i),
+                "offset": 0,
+                "size": 2,
+                "type": "H",
+                "relative_to": "p{:d}".format(i - 1)
+            })
+        path = write_definition({"parameters": params})
+        try:
+            plan = DefinitionFile(path).plan
+            assert len(plan) == count
+            last, offset = plan.parameters[-1]
+            assert last.name == "p{:d}".format(count - 1)
+            assert offset == 2 * (count - 1)
+        finally:
+            os.remove(path)
+
+    def test_plan_missing_reference(self):
+        params = [
+            {"name": "a", "offset": 0, "size": 2, "type": "H", "relative_to": "nowhere"}
+        ]
+        path = write_definition({"parameters": params})
+        try:
+            with self.assertRaises(Exception) as ctx:
+                DefinitionFile(path)
+            assert "nowhere" in str(ctx.exception)
+        finally:
+            os.remove(path)
+
+    def test_plan_cyclic_reference(self):
+        params = [
+            {"name": "a", "offset": 0, "size": 2, "type": "H", "relative_to": "c"},
+            {"name": "b", "offset": 0, "size": 2, "type": "H", "relative_to": "a"},
+            {"name": "c", "offset": 0, "size": 2, "type": "H", "relative_to": "b"}
+        ]
+        path = write_definition({"parameters": params})
+        try:
+            with self.assertRaises(Exception) as ctx:
+                DefinitionFile(path)
+            assert "cycle" in str(ctx.exception)
+        finally:
+            os.remove(path)
+
+    def test_plan_spans_merge_adjacent(self):
+        params = [
+            {"name": "a", "offset": 0, "size": 2, "type": "H"},
+            {"name": "b", "offset": 0, "size": 2, "type": "H", "relative_to": "a"},
+            {"name": "c", "offset": 4, "size": 2, "type": "H", "relative_to": "b"},
+            {"name": "d", "offset": 1, "size": 4, "type": "I"}
+        ]
+        path = write_definition({"parameters": params})
+        try:
+            plan = DefinitionFile(path).plan
+            spans = plan.spans()
+            assert len(spans) == 2
+            assert (spans[0].start, spans[0].end) == (0, 5)
+            assert [p.name for p, _ in spans[0].parameters] == ["a", "d", "b"]
+            assert (spans[1].start, spans[1].end) == (8, 10)
+
+            spans = plan.spans(4)
+            assert len(spans) == 1
+            assert spans[0].size == 10
+        finally:
+            os.remove(path)
+
+    def test_plan_arrays(self):
+        params = [
+            {"name": "n", "offset": 0, "size": 4, "type": "I"},
+            {"name": "fixed", "offset": 4, "size": 2, "type": "H", "count": 3},
+            {"name": "after", "offset": 0, "size": 2, "type": "H", "relative_to": "fixed"},
+            {"name": "dynamic", "offset": 16, "size": 4, "type": "I", "count": "n"}
+        ]
+        path = write_definition({"parameters": params})
+        try:
+            plan = DefinitionFile(path).plan
+            assert plan.offset(plan.parameters[2][0]) == 10
+            assert [p.name for p, _ in plan.arrays] == ["dynamic"]
+            names = [p.name for span in plan.spans() for p, _ in span.parameters]
+            assert "dynamic" not in names
+        finally:
+            os.remove(path)
+
+    def test_plan_invalid_arrays(self):
+        invalid = [
+            # Relative to an array whose size is not known.
+            [{"name": "n", "offset": 0, "size": 4, "type": "I"},
+             {"name": "a", "offset": 4, "size": 4, "type": "I", "count": "n"},
+             {"name": "b", "offset": 0, "size": 4, "type": "I", "relative_to": "a"}],
+            # Count read from a missing parameter.
+            [{"name": "a", "offset": 4, "size": 4, "type": "I", "count": "n"}],
+            # Count read from a string.
+            [{"name": "n", "offset": 0, "size": 4, "type": "ascii"},
+             {"name": "a", "offset": 4, "size": 4, "type": "I", "count": "n"}],
+            # Negative count.
+            [{"name": "a", "offset": 4, "size": 4, "type": "I", "count": -1}]
+        ]
+        for params in invalid:
+            path = write_definition({"parameters": params})
+            try:
+                self.assertRaises(Exception, DefinitionFile, path)
+            finally:
+                os.remove(path)
+
+    def test_plan_select(self):
+        params = [
+            {"name": "n", "offset": 0, "size": 4, "type": "I"},
+            {"name": "flags", "offset": 4, "size": 4, "type": "I"},
+            {"name": "dynamic", "offset": 16, "size": 4, "type": "I", "count": "n"},
+            {"name": "name", "offset": 64, "size": 8, "type": "ascii"}
+        ]
+        path = write_definition({"parameters": params})
+        try:
+            plan = DefinitionFile(path).plan
+            spans, arrays, anchored = plan.select(["dynamic", "unknown"])
+            # The count of the array is selected with it.
+            assert [p.name for span in spans for p, _ in span.parameters] == ["n"]
+            assert [p.name for p, _ in arrays] == ["dynamic"]
+            assert anchored == []
+
+            spans, arrays, _ = plan.select(["name", "flags"], 8)
+            assert [(s.start, s.end) for s in spans] == [(4, 8), (64, 72)]
+            assert arrays == []
+            assert plan.select(["flags", "name"], 8)[0] is spans
+        finally:
+            os.remove(path)
+
+    def test_plan_closure(self):
+        params = [
+            {"name": "n", "offset": 0, "size": 4, "type": "I"},
+            {"name": "flags", "offset": 4, "size": 4, "type": "I"},
+            {"name": "dynamic", "offset": 16, "size": 4, "type": "I", "count": "n"},
+            {"name": "inner", "offset": 4, "size": 2, "type": "H", "relative_to": "flags"}
+        ]
+        path = write_definition({"parameters": params})
+        try:
+            plan = DefinitionFile(path).plan
+            assert plan.closure(["dynamic", "unknown"]) == {"dynamic", "n", "unknown"}
+            # Offsets relative to other parameters are resolved beforehand.
+            assert plan.closure(["inner"]) == {"inner"}
+        finally:
+            os.remove(path)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    Tests of the parser and the evaluation of filter predicates.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import sqlite3
+import unittest
+
+from bindex import predicate
+from bindex.const import *
+
+
+class TestMain(unittest.TestCase):
+    def test_parse(self):
+        p = predicate.parse('version == "1.09.145" and (TestParam1 > 0xFFFF or not `odd name` in (1, 2.5))')
+        assert p.fields == {"version", "TestParam1", "odd name"}
+        sql, parameters = p.to_sql(lambda f: '"{f:s}"'.format(f=f))
+        assert sql == \
+            '("version" == ? AND typeof("version") IN (\'text\', \'null\')) AND ' \
+            '(("TestParam1" > ? AND typeof("TestParam1") IN (\'integer\', \'real\', \'null\')) OR ' \
+            '(NOT ("odd name" IN (?, ?) AND typeof("odd name") IN (\'integer\', \'real\', \'null\'))))'
+        assert parameters == ["1.09.145", 0xFFFF, 1, 2.5]
+
+        for invalid in ["TestParam1 >", "TestParam1 > 1 and", "(a == 1", "a # 1", "a < null", "== 1",
+                        "a in (1, null)"]:
+            with self.assertRaises(Exception):
+                predicate.parse(invalid)
+
+    def test_evaluate(self):
+        p = predicate.parse("a > 1 or b == 'x'")
+        assert p.matches({"a": 2})
+        assert p.matches({"a": 0, "b": "x"})
+        assert not p.matches({"a": 0, "b": "y"})
+        # Missing values and values which could not be decoded make a
+        # comparison unknown, as in SQL, values of another type make it false.
+        assert p.evaluate({"a": 0}) is None
+        assert p.evaluate({"a": ERROR_VALUE, "b": "y"}) is None
+        assert p.evaluate({"a": "text", "b": "y"}) is False
+        assert predicate.parse("not a == 'text'").matches({"a": 5})
+        assert not predicate.parse("not a > 1").matches({})
+        assert predicate.parse("a == null").matches({"a": ERROR_VALUE})
+        assert predicate.parse("a != null and a in (3, 4)").matches({"a": 3})
+
+    def test_sql_agrees(self):
+        rows = [{"a": 1, "b": "x"}, {"a": 5, "b": None}, {"a": None, "b": "y"}, {"a": 3, "b": "x"},
+                {"a": "x", "b": "z"}]
+        db = sqlite3.connect(":memory:")
+        db.execute("CREATE TABLE t (id INTEGER, a INTEGER, b TEXT)")
+        db.executemany("INSERT INTO t VALUES (?, ?, ?)",
+                       [(i, r["a"], r["b"]) for i, r in enumerate(rows)])
+        for text in ["a > 2", "not a > 2", "a > 2 or b == 'x'", "not (a > 2 and b == 'x')",
+                     "b == null", "a in (1, 5)", "not b in ('y')", "a < 'z'",
+                     "not a == 'x'", "a in (1, 'x')", "not a in (1, 'x')", "b > 1"]:
+            p = predicate.parse(text)
+            sql, parameters = p.to_sql(lambda f: f)
+            expected = [i for i, r in enumerate(rows)
+                        if p.matches({k: v for k, v in r.items() if v is not None})]
+            found = [i for i, in db.execute("SELECT id FROM t WHERE " + sql + " ORDER BY id", parameters)]
+            assert found == expected, text
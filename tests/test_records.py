@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    A description which can be long and explain the complete
+    functionality of this module even with indented code examples.
+    Class/Function however should not be documented here.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import os
+import struct
+import unittest
+
+from bindex import records
+from bindex.const import *
+from bindex.extractor import Extractor
+
+from helpers import write_definition
+
+
+@unittest.skipIf(records.np is None, "NumPy is not installed")
+class TestMain(unittest.TestCase):
+    def test_record_layout_matches_extractor(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        def_file = os.path.join(basedir, "tests", "test.config")
+
+        layout = records.RecordLayout(def_file)
+        assert layout.base == 28
+        assert layout.stride == 28
+        array = layout.read(test_file, _count=1)
+        expected = Extractor(test_file, def_file).extract()[PARAM_OTHER_PARAMS]
+        assert layout.values(array) == expected
+
+    def test_record_layout_repeated_records(self):
+        data = {
+            "byte_order": "big",
+            "parameters": [
+                {"name": "id", "offset": 0, "size": 4, "type": "I"},
+                {"name": "temperature", "offset": 4, "size": 2, "type": "<h"},
+                {"name": "samples", "offset": 6, "size": 1, "type": "B", "count": 3},
+                {"name": "tag", "offset": 9, "size": 3, "type": "ascii"}
+            ]
+        }
+        df = write_definition(data)
+        try:
+            layout = records.RecordLayout(df, _stride=16)
+            content = b"".join(
+                struct.pack(">I", i) +
+                struct.pack("<h3B3s4x", -i, i % 250, i % 250 + 1, i % 250 + 2, b"T%02d" % (i % 100))
+                for i in range(1000))
+            array = layout.decode(content)
+            assert len(array) == 1000
+            assert array["id"][999] == 999
+            assert array["temperature"].sum() == -sum(range(1000))
+            assert list(layout.iter_values(array[10:12])) == [
+                {"id": 10, "temperature": -10, "samples": [10, 11, 12], "tag": "T10"},
+                {"id": 11, "temperature": -11, "samples": [11, 12, 13], "tag": "T11"}
+            ]
+        finally:
+            os.remove(df)
+
+    def test_record_layout_unsupported(self):
+        for param in ({"name": "a", "offset": 0, "size": 4, "type": "HH"},
+                      {"name": "a", "offset": 0, "size": 4, "type": "I", "count": "n"}):
+            params = [{"name": "n", "offset": 8, "size": 4, "type": "I"}, param]
+            df = write_definition({"parameters": params})
+            try:
+                self.assertRaises(Exception, records.RecordLayout, df)
+            finally:
+                os.remove(df)
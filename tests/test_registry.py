@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    Tests of the selection of definition files using the index of their
+    compatibility parameters.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from bindex.registry import DefinitionRegistry
+
+from helpers import write_definition
+from helpers import write_target
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        basedir = os.getcwd()
+        self.input_file = os.path.join(basedir, "tests", "input.bin")
+        self.directory = tempfile.mkdtemp()
+        shutil.copy(os.path.join(basedir, "tests", "test.config"),
+                    os.path.join(self.directory, "a01.config"))
+        shutil.copy(os.path.join(basedir, "examples", "win_pe", "win32pe.json"),
+                    os.path.join(self.directory, "win32pe.json"))
+        # Same manufacturer as test.config, but another version.
+        with open(os.path.join(basedir, "tests", "test.config"), "r") as fp:
+            data = json.load(fp)
+        data["compatibility"][1]["compatible_with"] = ["2.00.000"]
+        write_definition(data, self.directory, "a02.json")
+        with open(os.path.join(self.directory, "broken.json"), "w") as fp:
+            fp.write("{")
+        with open(os.path.join(self.directory, "notes.txt"), "w") as fp:
+            fp.write("not a definition")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_registry_load(self):
+        registry = DefinitionRegistry(self.directory)
+        assert len(registry) == 3
+        assert str(registry) == self.directory
+
+    def test_registry_match(self):
+        registry = DefinitionRegistry(self.directory)
+        matches = registry.match(self.input_file)
+        assert [os.path.basename(d.file) for d in matches] == ["a01.config"]
+
+    def test_registry_match_pe(self):
+        registry = DefinitionRegistry(self.directory)
+        target = write_target(b"MZ" + bytes(64), self.directory, "calc.exe")
+        matches = registry.match(target)
+        assert [os.path.basename(d.file) for d in matches] == ["win32pe.json"]
+
+    def test_registry_unhashable_values(self):
+        # Lists cannot be indexed, but are still accepted values.
+        data = {
+            "compatibility": [
+                {"name": "magic", "offset": 0, "size": 1, "type": "B",
+                 "compatible_with": [[0x4D, 0x5A], 0x4D]}
+            ],
+            "parameters": []
+        }
+        write_definition(data, self.directory, "lists.json")
+        registry = DefinitionRegistry(self.directory)
+        assert len(registry) == 4
+        target = write_target(b"MZ" + bytes(64), self.directory, "calc.exe")
+        matches = registry.match(target)
+        assert sorted(os.path.basename(d.file) for d in matches) == ["lists.json", "win32pe.json"]
+
+    def test_registry_no_match(self):
+        registry = DefinitionRegistry(self.directory)
+        target = os.path.join(self.directory, "notes.txt")
+        assert registry.match(target) == []
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    A description which can be long and explain the complete
+    functionality of this module even with indented code examples.
+    Class/Function however should not be documented here.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import io
+import json
+import os
+import unittest
+
+from bindex import batch
+from bindex.const import *
+from bindex.extractor import Extractor
+from bindex.files import DefinitionFile
+from bindex.stats import NULL_STATS
+from bindex.stats import Stats
+
+
+class TestMain(unittest.TestCase):
+    def test_stats(self):
+        stats = Stats()
+        with stats.phase(PHASE_READ):
+            pass
+        stats.add_time(PHASE_READ, 1.0)
+        stats.count(COUNTER_READ_CALLS)
+        stats.count(COUNTER_BYTES_READ, 10)
+        assert stats.timings[PHASE_READ] >= 1.0
+        assert stats.counters == {COUNTER_READ_CALLS: 1, COUNTER_BYTES_READ: 10}
+
+        total = Stats()
+        total.merge(stats)
+        total.merge(json.loads(json.dumps(stats.to_dict())))
+        assert total.counters[COUNTER_BYTES_READ] == 20
+        assert total.timings[PHASE_READ] >= 2.0
+
+    def test_null_stats(self):
+        with NULL_STATS.phase(PHASE_READ):
+            pass
+        NULL_STATS.add_time(PHASE_READ, 1.0)
+        NULL_STATS.count(COUNTER_READ_CALLS)
+        NULL_STATS.merge({STATS_COUNTERS: {COUNTER_READ_CALLS: 1}})
+        assert not NULL_STATS.enabled
+        assert NULL_STATS.to_dict() == {STATS_TIMINGS: {}, STATS_COUNTERS: {}}
+
+    def test_extractor_stats(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        def_file = os.path.join(basedir, "tests", "test.config")
+
+        extractor = Extractor(test_file, def_file)
+        result = extractor.extract()
+        assert PARAM_STATS not in result[PARAM_METADATA]
+        assert not extractor.stats.enabled
+
+        extractor = Extractor(test_file, def_file, _stats=True)
+        result = extractor.extract()
+        stats = result[PARAM_METADATA][PARAM_STATS]
+        assert stats == extractor.stats.to_dict()
+        counters = stats[STATS_COUNTERS]
+        assert counters[COUNTER_PARAMETERS] == 2
+        assert counters[COUNTER_READ_CALLS] >= 2
+        assert counters[COUNTER_BYTES_READ] > 0
+        assert COUNTER_DECODE_ERRORS not in counters
+        for phase in [PHASE_SETUP, PHASE_DEFINITION, PHASE_HASHING,
+                      PHASE_COMPATIBILITY, PHASE_READ, PHASE_DECODE]:
+            assert phase in stats[STATS_TIMINGS]
+
+    def test_batch_stats(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        def_file = os.path.join(basedir, "tests", "test.config")
+
+        stats = Stats()
+        output = io.StringIO()
+        count, failures = batch.run(DefinitionFile(def_file), [test_file, test_file], output,
+                                    _options={"_stats": True}, _stats=stats)
+        assert count == 2 and failures == 0
+        assert stats.counters[COUNTER_PARAMETERS] == 4
+        assert PHASE_SERIALIZATION in stats.timings
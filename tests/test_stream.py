@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    A description which can be long and explain the complete
+    functionality of this module even with indented code examples.
+    Class/Function however should not be documented here.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import io
+import os
+import struct
+import unittest
+
+from bindex.const import *
+from bindex.extractor import Extractor
+from bindex.files import DefinitionFile
+from bindex.files import StreamFile
+from bindex.stream import StreamExtractor
+
+from helpers import write_definition
+
+
+class PipeStream(io.RawIOBase):
+    """
+    Non-seekable stream returning at most a few bytes per read, like a pipe.
+    """
+
+    def __init__(self, _data, _max_read=7):
+        self.__data = _data
+        self.__position = 0
+        self.__max_read = _max_read
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def read(self, _size=-1):
+        if _size is None or _size < 0:
+            _size = len(self.__data) - self.__position
+        size = min(_size, self.__max_read)
+        chunk = self.__data[self.__position:self.__position + size]
+        self.__position += len(chunk)
+        return chunk
+
+
+class TestMain(unittest.TestCase):
+    def test_stream_file_skip_and_read(self):
+        stream = StreamFile(PipeStream(bytes(range(64))), _hashes=[HASH_SHA1])
+        assert stream.skip(10) == 10
+        assert stream.read(4) == bytes([10, 11, 12, 13])
+        assert stream.position == 14
+        assert stream.skip(100) == 50
+        assert stream.read(4) == b''
+
+    def test_stream_extraction_matches_file_extraction(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        def_file = os.path.join(basedir, "tests", "test.config")
+
+        expected = Extractor(test_file, def_file).extract()
+        with open(test_file, "rb") as fp:
+            data = fp.read()
+        result = StreamExtractor(PipeStream(data), def_file).extract()
+
+        assert result[PARAM_OTHER_PARAMS] == expected[PARAM_OTHER_PARAMS]
+        assert list(result[PARAM_OTHER_PARAMS]) == list(expected[PARAM_OTHER_PARAMS])
+        assert result[PARAM_METADATA][PARAM_ORIGINAL_FILE] == STANDARD_STREAM
+        assert result[PARAM_METADATA][HASH_SHA1] == expected[PARAM_METADATA][HASH_SHA1]
+
+    def test_stream_not_compatible(self):
+        basedir = os.getcwd()
+        def_file = os.path.join(basedir, "tests", "test.config")
+        extractor = StreamExtractor(PipeStream(b"NotDeep" + bytes(64)), def_file)
+        self.assertRaises(Exception, extractor.extract)
+
+    def test_stream_truncated(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        def_file = os.path.join(basedir, "tests", "test.config")
+        with open(test_file, "rb") as fp:
+            data = fp.read(30)
+        result = StreamExtractor(io.BytesIO(data), def_file, _hashes=[]).extract()
+        assert result[PARAM_OTHER_PARAMS]["TestParam2"] == ERROR_VALUE
+        assert HASH_SHA1 not in result[PARAM_METADATA]
+
+    def test_stream_file_read_at_overlapping(self):
+        stream = StreamFile(PipeStream(bytes(range(64))))
+        assert stream.read_at(4, 8) == bytes(range(4, 12))
+        assert stream.read_at(6, 2) == bytes([6, 7])
+        assert stream.read_at(10, 4) == bytes(range(10, 14))
+        assert stream.read_at(20, 2) == bytes([20, 21])
+
+    def test_stream_dynamic_array(self):
+        data = {
+            "parameters": [
+                {"name": "n", "offset": 0, "size": 2, "type": "<H"},
+                {"name": "table", "offset": 4, "size": 4, "type": "<I", "count": "n"},
+                {"name": "inside", "offset": 8, "size": 4, "type": "<I"}
+            ]
+        }
+        df = write_definition(data)
+        try:
+            content = struct.pack("<HH3I", 3, 0, 10, 20, 30)
+            result = StreamExtractor(PipeStream(content), DefinitionFile(df), _hashes=[]).extract()
+            assert result[PARAM_OTHER_PARAMS] == {"n": 3, "table": [10, 20, 30], "inside": 20}
+            result = StreamExtractor(PipeStream(content), DefinitionFile(df), _hashes=[],
+                                     _fields=["table"]).extract()
+            assert result[PARAM_OTHER_PARAMS] == {"table": [10, 20, 30]}
+        finally:
+            os.remove(df)
@@ -11,11 +11,15 @@
     :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
     :license: MIT, see LICENSE for more details
 """
+import concurrent.futures
 import os
 import unittest
 
+from bindex.const import *
+from bindex.extractor import Extractor
 from bindex.files import TargetFile
 from bindex.parameter import CompatibilityParameter
+from bindex.parameter import Parameter
 
 
 class TestMain(unittest.TestCase):
@@ -42,3 +46,81 @@ class TestMain(unittest.TestCase):
         pvalue = tf.read(param)
         assert cvalue == pvalue
         tf.close()
+
+    def test_read_parameter_mapped_target_file(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        tf = TargetFile(test_file, _use_mmap=True)
+        tf.open()
+        assert tf.is_mapped
+
+        manufacturer = CompatibilityParameter(
+            _name="manufacturer",
+            _offset=0,
+            _size=10,
+            _type="ascii",
+            _compatible_with=["ShallwCode", "DeepCode"]
+        )
+        number = Parameter(
+            _name="TestParam1",
+            _offset=28,
+            _size=4,
+            _type="I"
+        )
+        assert tf.read(manufacturer) == "DeepCode"
+        assert tf.read(number) == 0xFFFFAA
+        tf.close()
+        assert not tf.is_mapped
+
+    def test_target_file_open_is_reference_counted(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        with TargetFile(test_file, _use_mmap=True) as tf:
+            tf.open()
+            assert tf.is_open and tf.is_mapped
+            tf.close()
+            assert tf.is_open
+        assert not tf.is_open and not tf.is_mapped
+        tf.close()
+        assert not tf.is_open
+
+    def test_target_file_implicit_open_is_closed(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        for use_mmap in (False, True):
+            tf = TargetFile(test_file, _use_mmap=use_mmap)
+            # Reads and scans of a file which is not open do not leave it open.
+            assert tf.read_span(0, 4) == TargetFile(test_file).read_span(0, 4)
+            assert tf.scan([]) == {}
+            assert not tf.is_open and not tf.is_mapped
+        extractor = Extractor(test_file, os.path.join(basedir, "tests", "test.config"))
+        assert extractor.is_compatible()
+        extractor.extract()
+
+    def test_target_file_shared_between_threads(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        with open(test_file, "rb") as fp:
+            content = fp.read()
+
+        for use_mmap in (False, True):
+            with TargetFile(test_file, _use_mmap=use_mmap) as tf:
+                def read(offset):
+                    size = len(content) - offset
+                    return offset, bytes(tf.read_span(offset, size))
+
+                with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                    offsets = [i % len(content) for i in range(2000)]
+                    for offset, data in executor.map(read, offsets):
+                        assert data == content[offset:]
+
+    def test_extractor_shared_between_threads(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        def_file = os.path.join(basedir, "tests", "test.config")
+        for use_mmap in (False, True):
+            extractor = Extractor(test_file, def_file, _use_mmap=use_mmap)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(lambda _: extractor.extract(), range(64)))
+            for result in results:
+                assert result[PARAM_OTHER_PARAMS]["TestParam1"] == 0xFFFFAA
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    bindex.tests
+    ~~~~~~~~~~~~~
+
+    A description which can be long and explain the complete
+    functionality of this module even with indented code examples.
+    Class/Function however should not be documented here.
+
+    :copyright: 2017, Jonathan Racicot, see AUTHORS for more details
+    :license: MIT, see LICENSE for more details
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from bindex import writers
+from bindex.const import *
+from bindex.extractor import Extractor
+
+RESULTS = [
+    {
+        PARAM_METADATA: {PARAM_ORIGINAL_FILE: "a.bin"},
+        PARAM_OTHER_PARAMS: {"size": 10, "name": "a", "table": [1, 2]}
+    },
+    {
+        PARAM_METADATA: {PARAM_ORIGINAL_FILE: "b.bin"},
+        PARAM_ERROR: "Definition file is not compatible with target file."
+    }
+]
+
+
+class TestMain(unittest.TestCase):
+    def test_json_writer(self):
+        for fmt in (FORMAT_JSON, FORMAT_PRETTY):
+            output = io.StringIO()
+            with writers.new_writer(fmt, output) as writer:
+                for result in RESULTS:
+                    writer.write(result)
+            assert json.loads(output.getvalue()) == RESULTS
+
+            output = io.StringIO()
+            with writers.new_writer(fmt, output, _single=True) as writer:
+                writer.write(RESULTS[0])
+            assert json.loads(output.getvalue()) == RESULTS[0]
+
+        output = io.StringIO()
+        writers.new_writer(FORMAT_JSON, output).close()
+        assert json.loads(output.getvalue()) == []
+
+    def test_json_lines_writer(self):
+        output = io.StringIO()
+        with writers.new_writer(FORMAT_JSONL, output) as writer:
+            for result in RESULTS:
+                writer.write(result)
+        assert writer.count == 2
+        assert [json.loads(line) for line in output.getvalue().splitlines()] == RESULTS
+
+    def test_csv_writer(self):
+        output = io.StringIO()
+        with writers.new_writer(FORMAT_CSV, output) as writer:
+            for result in RESULTS:
+                writer.write(result)
+        rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+        assert rows[0]["meta.target"] == "a.bin"
+        assert rows[0]["size"] == "10"
+        assert json.loads(rows[0]["table"]) == [1, 2]
+        assert rows[0][PARAM_ERROR] == ""
+        assert rows[1]["size"] == ""
+        assert rows[1][PARAM_ERROR] == RESULTS[1][PARAM_ERROR]
+
+    @unittest.skipIf(writers.msgpack is None, "msgpack is not installed")
+    def test_msgpack_writer(self):
+        output = io.BytesIO()
+        with writers.new_writer(FORMAT_MSGPACK, output) as writer:
+            for result in RESULTS:
+                writer.write(result)
+        unpacker = writers.msgpack.Unpacker(io.BytesIO(output.getvalue()), raw=False)
+        assert list(unpacker) == RESULTS
+
+    def test_unknown_format(self):
+        self.assertRaises(Exception, writers.new_writer, "xml", io.StringIO())
+
+    def test_extract_to_file(self):
+        basedir = os.getcwd()
+        test_file = os.path.join(basedir, "tests", "input.bin")
+        def_file = os.path.join(basedir, "tests", "test.config")
+        fd, output = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            Extractor(test_file, def_file).extract_to_file(output)
+            with open(output, "r") as fp:
+                result = json.load(fp)
+            assert result[PARAM_OTHER_PARAMS]["TestParam1"] == 0xFFFFAA
+        finally:
+            os.remove(output)